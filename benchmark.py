@@ -0,0 +1,430 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin
+
+# Configuration
+BENCH_PAGES = 20              # Pages on the mock site
+BENCH_IMAGES_PER_PAGE = 12    # Images referenced from each page's HTML
+BENCH_IMAGE_SIZE = 64 * 1024  # Bytes per image
+BENCH_CSS_FILES = 3           # Stylesheets linked from every page
+BENCH_CSS_SIZE = 32 * 1024    # Bytes per stylesheet
+BENCH_CSS_IMAGES = 20         # url() references in each stylesheet
+BENCH_LATENCY_MS = 0          # Added to every response
+BENCH_ERROR_RATE = 0.0        # Fraction of image requests answered with 503 + Retry-After
+BENCH_SEED = 1234
+BENCH_OUTPUT = "benchmark_results.json"
+
+BENCHMARKS = ("static_scrape", "scrape_page_images", "download_image", "crawl_main", "download_main")
+
+
+class MockSite:
+    """Synthetic Laravel-template-like site, generated deterministically from its settings.
+
+    Pages reference their images through every form the scrapers read:
+    <img src>, lazy data-src, srcset, inline background styles, data-bg and
+    shared stylesheets full of url() references.
+    """
+
+    def __init__(self, pages=BENCH_PAGES, images_per_page=BENCH_IMAGES_PER_PAGE,
+                 image_size=BENCH_IMAGE_SIZE, css_files=BENCH_CSS_FILES, css_size=BENCH_CSS_SIZE,
+                 css_images=BENCH_CSS_IMAGES, latency_ms=BENCH_LATENCY_MS,
+                 error_rate=BENCH_ERROR_RATE, seed=BENCH_SEED):
+        self.pages = pages
+        self.images_per_page = images_per_page
+        self.image_size = image_size
+        self.css_files = css_files
+        self.css_size = css_size
+        self.css_images = css_images
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def settings(self):
+        return {
+            "pages": self.pages, "images_per_page": self.images_per_page,
+            "image_size": self.image_size, "css_files": self.css_files,
+            "css_size": self.css_size, "css_images": self.css_images,
+            "latency_ms": self.latency_ms, "error_rate": self.error_rate,
+        }
+
+    def page_paths(self):
+        return [f"/page-{n}" for n in range(1, self.pages + 1)]
+
+    def page_images(self, n):
+        return [f"/assets/images/page-{n}/photo-{k}.jpg" for k in range(self.images_per_page)]
+
+    def css_image_paths(self, k):
+        return [f"/assets/images/css-{k}/bg-{j}.png" for j in range(self.css_images)]
+
+    def image_paths(self):
+        """Every distinct image the site references."""
+        paths = []
+        for n in range(1, self.pages + 1):
+            paths.extend(self.page_images(n))
+        for k in range(self.css_files):
+            paths.extend(self.css_image_paths(k))
+        return paths
+
+    def render_page(self, n):
+        head = "".join(f'<link rel="stylesheet" href="/assets/css/style-{k}.css">'
+                       for k in range(self.css_files))
+        body = []
+        for k, src in enumerate(self.page_images(n)):
+            form = k % 5
+            if form == 0:
+                body.append(f'<img src="{src}" alt="">')
+            elif form == 1:
+                body.append(f'<img src="/assets/images/placeholder.gif" data-src="{src}" alt="">')
+            elif form == 2:
+                body.append(f'<picture><source srcset="{src} 1x, {src}?w=2 2x"><img alt=""></picture>')
+            elif form == 3:
+                body.append(f'<div class="hero" style="background-image: url(\'{src}\')"></div>')
+            else:
+                body.append(f'<div class="parallax" data-bg="{src}"></div>')
+        links = "".join(f'<a href="{path}">{path}</a>' for path in self.page_paths())
+        return (f"<!DOCTYPE html><html><head><title>Page {n}</title>{head}</head>"
+                f"<body><nav>{links}</nav>{''.join(body)}</body></html>").encode()
+
+    def render_css(self, k):
+        rules = [f".bg-{k}-{j} {{ background: url(../images/css-{k}/bg-{j}.png) no-repeat; }}\n"
+                 for j in range(self.css_images)]
+        text = "".join(rules)
+        filler = 0
+        while len(text) < self.css_size:
+            text += f".u-{k}-{filler} {{ margin: {filler % 17}px; padding: 0 {filler % 9}px; color: #333; }}\n"
+            filler += 1
+        return text.encode()
+
+    def render_image(self, path):
+        seed = hashlib.sha256(path.encode()).digest()
+        body = b"\x89PNG\r\n\x1a\n" + seed * (self.image_size // len(seed) + 1)
+        return body[:self.image_size]
+
+    def should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._random_lock:
+            return self._random.random() < self.error_rate
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    site = None  # Set on the per-server subclass
+    head_only = False
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.site.latency_ms:
+            time.sleep(self.site.latency_ms / 1000)
+
+        path = self.path.split("?", 1)[0]
+        if path.startswith("/page-") and path[6:].isdigit() and 1 <= int(path[6:]) <= self.site.pages:
+            self.send_body(200, "text/html; charset=utf-8", self.site.render_page(int(path[6:])))
+        elif path.startswith("/assets/css/style-") and path.endswith(".css"):
+            self.send_body(200, "text/css", self.site.render_css(path[len("/assets/css/style-"):-4]))
+        elif path.startswith("/assets/images/"):
+            if self.site.should_fail():
+                self.send_response(503)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                self.send_image(path)
+        else:
+            self.send_body(404, "text/plain", b"not found")
+
+    def do_HEAD(self):
+        self.head_only = True  # The handler lives as long as its keep-alive connection
+        try:
+            self.do_GET()
+        finally:
+            self.head_only = False
+
+    def send_image(self, path):
+        body = self.site.render_image(path)
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") in (None, etag):
+            first, _, last = range_header.split("=", 1)[1].partition("-")
+            start = int(first)
+            end = min(int(last), len(body) - 1) if last else len(body) - 1
+            if start >= len(body):
+                self.send_body(416, "text/plain", b"")
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+            body = body[start:end + 1]
+        else:
+            self.send_response(200)
+        content_type = "image/png" if path.endswith(".png") else "image/jpeg"
+        self.send_header("Content-Type", content_type)
+        self.send_header("ETag", etag)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not self.head_only:
+            self.wfile.write(body)
+
+    def send_body(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not self.head_only:
+            self.wfile.write(body)
+
+
+class MockSiteServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections (e.g. after a 503) are expected
+        pass
+
+
+def start_mock_site(site):
+    """Serve ``site`` on a free localhost port; return (server, base_url)."""
+    handler = type("BoundMockSiteHandler", (MockSiteHandler,), {"site": site})
+    server = MockSiteServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, name="mock-site", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB."""
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def rate(count, seconds):
+    return round(count / seconds, 2) if seconds > 0 else None
+
+
+def bench_static_scrape(base_url, site):
+    """h.scrape_page_static over every page (HTML + stylesheet analysis)."""
+    import h
+    import http_client
+    results = h.ResultSet()
+    session = http_client.client
+    started = time.perf_counter()
+    for path in site.page_paths():
+        h.scrape_page_static(urljoin(base_url, path), results, session)
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "pages": site.pages, "urls": len(results),
+            "pages_per_s": rate(site.pages, elapsed), "urls_per_s": rate(len(results), elapsed)}
+
+
+def bench_scrape_page_images(base_url, site):
+    """h.scrape_page_images on pages already loaded in headless Chromium."""
+    import h
+    from playwright.sync_api import sync_playwright
+    results = h.ResultSet()
+    scrape_seconds = 0.0
+    started = time.perf_counter()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        for path in site.page_paths():
+            url = urljoin(base_url, path)
+            page.goto(url, wait_until="load")
+            scrape_started = time.perf_counter()
+            h.scrape_page_images(page, url, results)
+            scrape_seconds += time.perf_counter() - scrape_started
+        browser.close()
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "scrape_seconds": scrape_seconds, "pages": site.pages,
+            "urls": len(results), "pages_per_s": rate(site.pages, scrape_seconds),
+            "urls_per_s": rate(len(results), scrape_seconds)}
+
+
+def bench_download_image(base_url, site):
+    """image_download_1.download_image for every image, one after another."""
+    import http_client
+    import image_download_1 as downloader
+    session = http_client.client
+    os.makedirs(downloader.DOWNLOAD_DIR, exist_ok=True)
+    counts = {}
+    started = time.perf_counter()
+    for n, path in enumerate(site.image_paths()):
+        target = os.path.join(downloader.DOWNLOAD_DIR, f"{n}.img")
+        status = downloader.download_image(urljoin(base_url, path), target, session)
+        counts[status] = counts.get(status, 0) + 1
+    elapsed = time.perf_counter() - started
+    return download_metrics(downloader.DOWNLOAD_DIR, elapsed, counts)
+
+
+def bench_crawl_main(base_url, site):
+    """h.main() in static mode against the mock site."""
+    import h
+    h.BASE_URL = base_url
+    h.PAGES = site.page_paths()
+    started = time.perf_counter()
+    h.main(["--mode", "static", "--no-css-cache"])
+    elapsed = time.perf_counter() - started
+    with open("image_files_url.txt", encoding="utf-8") as f:
+        urls = sum(1 for line in f if line.strip() and not line.startswith("#"))
+    return {"seconds": elapsed, "pages": site.pages, "urls": urls,
+            "pages_per_s": rate(site.pages, elapsed), "urls_per_s": rate(urls, elapsed)}
+
+
+def bench_download_main(base_url, site):
+    """image_download_1.main() (concurrent engine) on a list of every image URL."""
+    import image_download_1 as downloader
+    with open(downloader.INPUT_FILE, "w", encoding="utf-8") as f:
+        for path in site.image_paths():
+            f.write(urljoin(base_url, path) + "\n")
+    started = time.perf_counter()
+    downloader.main(["--no-manifest"])
+    elapsed = time.perf_counter() - started
+    return download_metrics(downloader.DOWNLOAD_DIR, elapsed)
+
+
+def download_metrics(folder, elapsed, counts=None):
+    files = 0
+    total = 0
+    for root, dirs, names in os.walk(folder):
+        for name in names:
+            files += 1
+            total += os.path.getsize(os.path.join(root, name))
+    metrics = {"seconds": elapsed, "files": files, "mb": round(total / (1024 * 1024), 3),
+               "mb_per_s": rate(total / (1024 * 1024), elapsed), "files_per_s": rate(files, elapsed)}
+    if counts is not None:
+        metrics["statuses"] = counts
+    return metrics
+
+
+def run_benchmark(name, base_url, settings, tuning, verbose):
+    """Run one benchmark in a scratch directory; called in a fresh process."""
+    import image_download_1 as downloader
+    for constant, value in tuning.items():
+        setattr(downloader, constant, value)
+    site = MockSite(**settings)
+
+    with tempfile.TemporaryDirectory(prefix=f"bench-{name}-") as workdir:
+        os.chdir(workdir)
+        cpu_started = time.process_time()
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(sys.stdout if verbose else devnull):
+                metrics = globals()[f"bench_{name}"](base_url, site)
+        cpu_seconds = time.process_time() - cpu_started
+
+    metrics["seconds"] = round(metrics["seconds"], 3)
+    metrics["cpu_seconds"] = round(cpu_seconds, 3)
+    if "mb" in metrics:
+        metrics["mb_per_cpu_s"] = rate(metrics["mb"], cpu_seconds)  # Throughput per core
+    metrics["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return metrics
+
+
+def run_suite(site, names, tuning, verbose=False):
+    """Run each benchmark in its own process (so peak RSS is per benchmark)."""
+    server, base_url = start_mock_site(site)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    try:
+        for name in names:
+            print(f"⏱ {name}...", flush=True)
+            with context.Pool(1) as pool:
+                try:
+                    results[name] = pool.apply(run_benchmark, (name, base_url, site.settings(), tuning, verbose))
+                except Exception as e:
+                    results[name] = {"error": f"{type(e).__name__}: {str(e).splitlines()[0][:200]}"}
+            summary = results[name]
+            if "error" in summary:
+                print(f"   ⚠ {summary['error']}")
+            else:
+                print("   " + ", ".join(f"{key}={value}" for key, value in summary.items()
+                                        if key != "statuses"))
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    import image_download_1 as downloader
+    parser = argparse.ArgumentParser(description="Measure crawl and download throughput against a local mock site.")
+    parser.add_argument('--pages', type=int, default=BENCH_PAGES)
+    parser.add_argument('--images-per-page', type=int, default=BENCH_IMAGES_PER_PAGE)
+    parser.add_argument('--image-size', type=int, default=BENCH_IMAGE_SIZE, metavar='BYTES')
+    parser.add_argument('--css-files', type=int, default=BENCH_CSS_FILES)
+    parser.add_argument('--css-size', type=int, default=BENCH_CSS_SIZE, metavar='BYTES')
+    parser.add_argument('--css-images', type=int, default=BENCH_CSS_IMAGES)
+    parser.add_argument('--latency', type=float, default=BENCH_LATENCY_MS, metavar='MS',
+                        help="delay added to every response")
+    parser.add_argument('--error-rate', type=float, default=BENCH_ERROR_RATE,
+                        help="fraction of image requests answered with 503 (Retry-After: 1)")
+    parser.add_argument('--only', action='append', choices=BENCHMARKS, metavar='NAME',
+                        help=f"run only this benchmark (repeatable; one of: {', '.join(BENCHMARKS)})")
+    parser.add_argument('--chunk-size', type=int, default=downloader.CHUNK_SIZE,
+                        help=f"image_download_1.CHUNK_SIZE (default: {downloader.CHUNK_SIZE})")
+    parser.add_argument('--timeout', type=float, default=downloader.TIMEOUT,
+                        help=f"image_download_1.TIMEOUT (default: {downloader.TIMEOUT})")
+    parser.add_argument('--delay-range', type=float, nargs=2, default=downloader.DELAY_RANGE,
+                        metavar=('MIN', 'MAX'),
+                        help=f"image_download_1.DELAY_RANGE (default: {downloader.DELAY_RANGE})")
+    parser.add_argument('--label', default="", help="free-form tag stored with the results")
+    parser.add_argument('--output', default=BENCH_OUTPUT, metavar='PATH',
+                        help=f"JSON results file (default: {BENCH_OUTPUT})")
+    parser.add_argument('--verbose', action='store_true', help="show the scripts' own output")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    site = MockSite(args.pages, args.images_per_page, args.image_size, args.css_files,
+                    args.css_size, args.css_images, args.latency, args.error_rate)
+    tuning = {
+        "CHUNK_SIZE": args.chunk_size,
+        "TIMEOUT": args.timeout,
+        "DELAY_RANGE": tuple(args.delay_range),
+    }
+
+    print("🏁 Benchmarking against a local mock site")
+    print(f"📄 {site.pages} pages, {len(site.image_paths())} images of {site.image_size / 1024:.0f}KB, "
+          f"{site.css_files} stylesheets")
+    print("=" * 50)
+
+    started = time.time()
+    results = run_suite(site, args.only or BENCHMARKS, tuning, args.verbose)
+
+    report = {
+        "label": args.label,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "site": site.settings(),
+        "tuning": tuning,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+
+# Configuration
+BLOB_STORE_DIR = ".blobs"
+
+FICLONE = 0x40049409  # Linux ioctl that makes a copy-on-write clone (reflink)
+
+
+def clone_file(src, dst):
+    """Copy ``src`` to ``dst``, as a reflink where the filesystem supports it."""
+    try:
+        import fcntl
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(src, dst)
+
+
+class BlobStore:
+    """Content-addressed store of downloaded files, keyed by SHA-256.
+
+    Every distinct file body is kept exactly once, under
+    ``<root>/ab/cd/abcd...``. Mirrored paths are hardlinks into the store
+    (or reflinks/copies where hardlinks are not possible), so identical
+    images served under different URLs cost their disk space only once.
+    Hardlinked mirror files share their bytes with the store: replace
+    them, never edit them in place.
+    """
+
+    def __init__(self, root=BLOB_STORE_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, digest):
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def has(self, digest):
+        return bool(digest) and os.path.exists(self.path_for(digest))
+
+    def ingest(self, temp_path, digest):
+        """Move a finished file into the store; drop it if the blob already exists.
+
+        Returns the blob path.
+        """
+        blob_path = self.path_for(digest)
+        if os.path.exists(blob_path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(temp_path, blob_path)
+        return blob_path
+
+    def adopt(self, path, digest):
+        """Bring a file that is already in the mirror under the store's management."""
+        blob_path = self.path_for(digest)
+        if os.path.exists(blob_path):
+            self.link(digest, path)
+            return
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        try:
+            os.link(path, blob_path)
+        except OSError:
+            clone_file(path, blob_path)
+
+    def link(self, digest, target_path):
+        """Atomically make ``target_path`` a link to (or copy of) a stored blob."""
+        blob_path = self.path_for(digest)
+        temp_path = target_path + ".link"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        try:
+            os.link(blob_path, temp_path)
+        except OSError:
+            # Different filesystem, or no hardlink support
+            clone_file(blob_path, temp_path)
+        os.replace(temp_path, target_path)
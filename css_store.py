@@ -0,0 +1,79 @@
+import json
+import time
+
+from sqlite_store import LRUStore
+
+# Configuration
+CSS_CACHE_FILE = ".css_cache.sqlite3"
+CSS_CACHE_TTL = 6 * 3600               # Entries younger than this are reused without any request
+CSS_CACHE_MAX_AGE = 30 * 24 * 3600     # Entries unused for this long are evicted
+CSS_CACHE_MAX_ENTRIES = 10000          # Least recently used entries beyond this are evicted
+
+
+class CSSCache(LRUStore):
+    """On-disk cache of analyzed stylesheets, keyed by CSS URL.
+
+    Each entry keeps the validators (ETag / Last-Modified) needed for a
+    conditional GET, a SHA-256 of the body, the image URLs extracted from
+    it and the stylesheets it @imports. Safe to share between threads.
+    """
+
+    TABLE = "css_entries"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS css_entries (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            image_urls TEXT NOT NULL,
+            imports TEXT NOT NULL DEFAULT '[]',
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path=CSS_CACHE_FILE, ttl=CSS_CACHE_TTL,
+                 max_age=CSS_CACHE_MAX_AGE, max_entries=CSS_CACHE_MAX_ENTRIES):
+        super().__init__(path, max_age, max_entries)
+        self.ttl = ttl
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(css_entries)")]
+        if "imports" not in columns:
+            # Cache files written before @import tracking existed
+            self._db.execute("ALTER TABLE css_entries ADD COLUMN imports TEXT NOT NULL DEFAULT '[]'")
+
+    def get(self, url):
+        """Return the cached entry for a stylesheet as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, content_hash, image_urls, imports, fetched_at "
+                "FROM css_entries WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE css_entries SET last_used = ? WHERE url = ?", (time.time(), url))
+
+        etag, last_modified, content_hash, image_urls, imports, fetched_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "image_urls": json.loads(image_urls),
+            "imports": json.loads(imports),
+            "fetched_at": fetched_at,
+        }
+
+    def is_fresh(self, entry):
+        """True if an entry is young enough to use without revalidating."""
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def put(self, url, image_urls, imports=(), etag=None, last_modified=None, content_hash=None):
+        """Store (or replace) the analysis of a stylesheet."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO css_entries "
+                "(url, etag, last_modified, content_hash, image_urls, imports, fetched_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, content_hash, json.dumps(image_urls),
+                 json.dumps(list(imports)), now, now)
+            )
@@ -0,0 +1,68 @@
+import time
+
+from sqlite_store import SQLiteStore
+
+# Configuration
+MANIFEST_FILE = ".download_manifest.sqlite3"
+
+# Per-URL download states
+STATE_PARTIAL = "partial"    # Bytes are sitting in a .part file waiting to be resumed
+STATE_COMPLETE = "complete"  # File is in place and matches size/sha256
+STATE_FAILED = "failed"      # Last attempt gave up
+
+
+class DownloadManifest(SQLiteStore):
+    """On-disk record of every download, keyed by URL.
+
+    Stores the final size, SHA-256, ETag/Last-Modified and state of each
+    file so later runs can resume partial files, revalidate complete
+    ones with a conditional GET, or trust them without any request.
+    Safe to share between threads.
+    """
+
+    TABLE = "downloads"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS downloads (
+            url TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            size INTEGER,
+            sha256 TEXT,
+            etag TEXT,
+            last_modified TEXT,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path=MANIFEST_FILE):
+        super().__init__(path)
+
+    def get(self, url):
+        """Return the manifest entry for a URL as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT path, size, sha256, etag, last_modified, status "
+                "FROM downloads WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        path, size, sha256, etag, last_modified, status = row
+        return {
+            "path": path,
+            "size": size,
+            "sha256": sha256,
+            "etag": etag,
+            "last_modified": last_modified,
+            "status": status,
+        }
+
+    def record(self, url, path, status, size=None, sha256=None, etag=None, last_modified=None):
+        """Store (or replace) the entry for a URL."""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO downloads "
+                "(url, path, size, sha256, etag, last_modified, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, path, size, sha256, etag, last_modified, status, time.time())
+            )
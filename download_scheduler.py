@@ -0,0 +1,118 @@
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import http_client
+import metrics
+import rate_limiter
+from download_manifest import STATE_COMPLETE
+
+# Configuration
+PROBE_WORKERS = 16                     # HEAD requests in flight while learning sizes
+PROBE_TIMEOUT = 15
+UNKNOWN_SIZE = 256 * 1024              # Files of unknown size are scheduled as if this big
+SEGMENT_THRESHOLD = 8 * 1024 * 1024    # Files at least this big are fetched in parallel Range segments...
+SEGMENTS = 4                           # ...this many at once...
+MIN_SEGMENT_SIZE = 1024 * 1024         # ...but never in pieces smaller than this
+
+# What is known about a file before downloading it; ``source`` is "manifest" or "head"
+SizeHint = namedtuple("SizeHint", "size accept_ranges etag last_modified content_type source")
+
+CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+
+def probe_size(url, headers=None):
+    """HEAD a URL; return its SizeHint, or None if the server gave no usable answer."""
+    headers = dict(headers or {})
+    headers['Accept-Encoding'] = 'identity'  # Content-Length must be the size on disk
+    rate_limiter.acquire(url)
+    started = time.perf_counter()
+    try:
+        response = http_client.client.head(url, headers=headers, timeout=PROBE_TIMEOUT)
+    except requests.exceptions.RequestException:
+        rate_limiter.report(url, None)
+        return None
+    rate_limiter.report(url, response.status_code, time.perf_counter() - started, response.headers)
+    response.close()
+    if response.status_code != 200:
+        return None
+
+    try:
+        size = int(response.headers.get('content-length'))
+    except (TypeError, ValueError):
+        size = None
+    return SizeHint(
+        size,
+        response.headers.get('accept-ranges', '').lower() == 'bytes',
+        response.headers.get('ETag'),
+        response.headers.get('Last-Modified'),
+        response.headers.get('content-type', '').lower(),
+        "head",
+    )
+
+
+def learn_sizes(urls, manifest=None, make_headers=None, workers=PROBE_WORKERS):
+    """Find out how big each file is before downloading anything.
+
+    Files the manifest records as complete (and still on disk) take their
+    size from it; they will mostly be revalidated, not downloaded. The
+    rest are asked with a HEAD request. Returns {url: SizeHint} for the
+    URLs whose size could be learned.
+    """
+    hints = {}
+    to_probe = []
+    for url in urls:
+        entry = manifest.get(url) if manifest is not None else None
+        if entry and entry['status'] == STATE_COMPLETE and entry['size'] and os.path.exists(entry['path']):
+            hints[url] = SizeHint(entry['size'], None, entry['etag'], entry['last_modified'], None, "manifest")
+        else:
+            to_probe.append(url)
+
+    def probe(url):
+        return url, probe_size(url, make_headers() if make_headers else None)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="probe") as executor:
+            for url, hint in executor.map(probe, to_probe):
+                if hint is not None and hint.size is not None:
+                    hints[url] = hint
+    metrics.inc("size_probes", len(to_probe))
+    return hints
+
+
+def order_by_size(urls, hints):
+    """Smallest files first, so many finish early and the slow large ones overlap the rest.
+
+    The sort is stable: files of equal (or unknown) size keep their order.
+    """
+    def size(url):
+        hint = hints.get(url)
+        return hint.size if hint is not None else UNKNOWN_SIZE
+    return sorted(urls, key=size)
+
+
+def should_segment(hint, threshold=SEGMENT_THRESHOLD, segments=SEGMENTS):
+    """True if a file is big enough, and its server able, to be fetched in Range segments."""
+    return (hint is not None and hint.source == "head" and hint.accept_ranges and segments > 1
+            and threshold > 0 and hint.size >= threshold
+            and any(t in hint.content_type for t in ('image/', 'application/octet-stream')))
+
+
+def plan_segments(size, segments=SEGMENTS, min_size=MIN_SEGMENT_SIZE):
+    """Split ``size`` bytes into inclusive (start, end) ranges of near-equal length."""
+    count = max(1, min(segments, size // max(min_size, 1)))
+    step = -(-size // count)  # Ceiling division
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def content_range_matches(value, start, end, size):
+    """True if a Content-Range header covers exactly bytes start-end of a file of ``size`` bytes."""
+    match = CONTENT_RANGE_RE.match(value or "")
+    if not match:
+        return False
+    first, last, total = match.groups()
+    return int(first) == start and int(last) == end and total in ("*", str(size))
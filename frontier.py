@@ -0,0 +1,282 @@
+import gzip
+import time
+import threading
+import posixpath
+import xml.etree.ElementTree as ET
+from urllib.parse import urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import requests
+
+import http_client
+import rate_limiter
+from url_set import CACHE_BUSTER_PARAMS, DEFAULT_PORTS, URLNormalizer, normalize_netloc
+from work_queue import KIND_PAGE, CLAIM_BATCH, LEASE_SECONDS
+
+# Configuration
+DISCOVER_MAX_DEPTH = 3     # Links followed away from the seeds
+DISCOVER_MAX_PAGES = 500   # Pages a site may contribute to the frontier in total
+MAX_SITEMAPS = 50          # Sitemap files read per site (index files included)
+ROBOTS_USER_AGENT = "*"
+
+# Links to these are files, not pages
+NON_PAGE_EXTENSIONS = (
+    ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".avif", ".bmp", ".ico",
+    ".css", ".js", ".json", ".xml", ".txt", ".pdf", ".zip", ".rar", ".gz",
+    ".mp4", ".webm", ".mp3", ".woff", ".woff2", ".ttf", ".eot",
+)
+# Query parameters that only track the visitor: ?utm_source=x is the same page
+TRACKING_PARAMS = ("utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "utm_id",
+                   "gclid", "dclid", "fbclid", "msclkid", "yclid", "mc_cid", "mc_eid", "_ga", "_gl")
+
+PAGE_URL_NORMALIZER = URLNormalizer(CACHE_BUSTER_PARAMS + TRACKING_PARAMS, sort_query=True)
+
+
+def normalize_page_url(url):
+    """Canonical form of a page URL, so each page is visited once.
+
+    Normalized like image URLs (url_set.URLNormalizer): lower-case scheme
+    and host, no default port or fragment, dot segments resolved. Query
+    parameters are kept in sorted order, except tracking and cache-buster
+    ones, so ``/blog?page=2`` stays its own page. Trailing and repeated
+    slashes are dropped from the path. Returns None for non-HTTP URLs.
+    """
+    try:
+        if normalize_netloc(urlsplit(url.strip())) is None:
+            return None
+    except ValueError:
+        return None
+    parts = urlsplit(PAGE_URL_NORMALIZER.normalize(url))
+
+    path = posixpath.normpath(parts.path)
+    if path.startswith("//"):
+        path = "/" + path.lstrip("/")
+    return urlunsplit((parts.scheme, parts.netloc, path, parts.query, ""))
+
+
+def origin_of(url):
+    """scheme://host[:port] of a URL, normalized like normalize_page_url."""
+    normalized = normalize_page_url(url)
+    if normalized is None:
+        return None
+    parts = urlsplit(normalized)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def is_page_url(url):
+    path = urlsplit(url).path.lower()
+    return not path.endswith(NON_PAGE_EXTENSIONS)
+
+
+class Frontier:
+    """Deduplicated set of same-origin pages still to crawl, with depth and size limits.
+
+    Pages are handed out a whole level at a time by take_batch(), so the
+    existing static/browser passes crawl each level and the links they
+    find form the next one. ``allow`` is an optional extra filter (e.g. a
+    site's include/exclude patterns); ``robots`` a RobotFileParser.
+    """
+
+    def __init__(self, base_url, max_depth=DISCOVER_MAX_DEPTH, max_pages=DISCOVER_MAX_PAGES,
+                 allow=None, robots=None):
+        self.origin = origin_of(base_url)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.allow = allow
+        self.robots = robots
+        self.depths = {}    # Normalized URL -> depth it was first found at
+        self.pending = []   # Normalized URLs not handed out yet
+        self.handed_out = 0
+        self.dropped = 0    # In scope but over max_pages
+        self._lock = threading.Lock()
+
+    def accept(self, url, depth=0):
+        """Normalized ``url`` if it is same-origin, in scope and within the depth limit, else None."""
+        url = normalize_page_url(url)
+        if url is None or depth > self.max_depth or not url.startswith(self.origin + "/"):
+            return None
+        if not is_page_url(url):
+            return None
+        if self.allow is not None and not self.allow(url):
+            return None
+        if self.robots is not None and not self.robots.can_fetch(ROBOTS_USER_AGENT, url):
+            return None
+        return url
+
+    def add(self, url, depth=0):
+        """Queue a page if it is new, same-origin, in scope and within the limits."""
+        url = self.accept(url, depth)
+        if url is None:
+            return False
+
+        with self._lock:
+            if url in self.depths:
+                return False
+            if len(self.depths) >= self.max_pages:
+                self.dropped += 1
+                return False
+            self.depths[url] = depth
+            self.pending.append(url)
+            return True
+
+    def add_links(self, links, page_url):
+        """Queue the links found on ``page_url`` one level deeper than it."""
+        depth = self.depths.get(normalize_page_url(page_url), 0) + 1
+        added = 0
+        for link in links:
+            if link and self.add(urljoin(page_url, link), depth):
+                added += 1
+        return added
+
+    def take_batch(self):
+        """Hand out every queued page as (index, path, url) entries."""
+        with self._lock:
+            urls, self.pending = self.pending, []
+            batch = []
+            for url in urls:
+                self.handed_out += 1
+                batch.append((self.handed_out, urlsplit(url).path, url))
+            return batch
+
+    def known(self):
+        """Pages found so far, crawled or not (what ``max_pages`` limits)."""
+        with self._lock:
+            return len(self.depths)
+
+    def __len__(self):
+        """Pages not crawled yet."""
+        with self._lock:
+            return len(self.pending)
+
+
+class QueueFrontier(Frontier):
+    """Frontier kept in a shared WorkQueue, so several crawler processes split one site.
+
+    add() enqueues pages (idempotently, so every worker may seed the same
+    ones), take_batch() leases up to ``batch_size`` of them to this worker
+    and complete_batch() marks the batch done once it has been crawled,
+    handing the pages that failed back to the queue.
+    """
+
+    def __init__(self, work_queue, worker_id, base_url, max_depth=DISCOVER_MAX_DEPTH,
+                 max_pages=DISCOVER_MAX_PAGES, allow=None, robots=None, batch_size=CLAIM_BATCH,
+                 lease=LEASE_SECONDS):
+        super().__init__(base_url, max_depth, max_pages, allow, robots)
+        self.work_queue = work_queue
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.lease = lease
+        self.claimed = []  # Task ids of the batch being crawled
+
+    def add(self, url, depth=0):
+        url = self.accept(url, depth)
+        if url is None:
+            return False
+        if self.known() >= self.max_pages:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return self.work_queue.enqueue(KIND_PAGE, url, {"depth": depth})
+
+    def take_batch(self):
+        tasks = self.work_queue.claim(KIND_PAGE, self.worker_id, self.batch_size, self.lease)
+        with self._lock:
+            self.claimed = [task.id for task in tasks]
+            batch = []
+            for task in tasks:
+                self.depths[task.key] = task.payload.get("depth", 0)
+                self.handed_out += 1
+                batch.append((task.id, urlsplit(task.key).path, task.key))
+            return batch
+
+    def complete_batch(self, failed=()):
+        """Mark the batch done, except the ``failed`` task ids, which go back for a retry."""
+        failed = set(failed)
+        with self._lock:
+            claimed, self.claimed = self.claimed, []
+        for task_id in claimed:
+            if task_id in failed:
+                self.work_queue.fail(task_id, self.worker_id, "all crawl attempts failed")
+            else:
+                self.work_queue.complete(task_id, self.worker_id)
+        return claimed
+
+    def known(self):
+        return sum(self.work_queue.counts(KIND_PAGE).values())
+
+    def __len__(self):
+        return self.work_queue.active(KIND_PAGE)
+
+
+def fetch_text(url, timeout=15):
+    """GET a small text resource; None unless the answer is a 200."""
+    rate_limiter.acquire(url)
+    started = time.perf_counter()
+    try:
+        response = http_client.client.get(url, timeout=timeout)
+    except requests.exceptions.RequestException:
+        rate_limiter.report(url, None)
+        return None
+    rate_limiter.report(url, response.status_code, time.perf_counter() - started, response.headers)
+    if response.status_code != 200:
+        return None
+    body = response.content
+    if body[:2] == b"\x1f\x8b":  # .xml.gz sitemaps are served as-is
+        try:
+            body = gzip.decompress(body)
+        except OSError:
+            return None
+    return body.decode("utf-8", errors="replace")
+
+
+def load_robots(base_url):
+    """Parse robots.txt for a site; None if it has none."""
+    text = fetch_text(urljoin(base_url, "/robots.txt"))
+    if text is None:
+        return None
+    robots = RobotFileParser()
+    robots.parse(text.splitlines())
+    return robots
+
+
+def iter_sitemap_urls(sitemap_urls):
+    """Yield page URLs from sitemaps, following sitemap index files."""
+    pending = list(sitemap_urls)
+    seen = set()
+    while pending and len(seen) < MAX_SITEMAPS:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+
+        text = fetch_text(sitemap_url)
+        if not text:
+            continue
+        try:
+            root = ET.fromstring(text)
+        except ET.ParseError:
+            continue
+        is_index = root.tag.endswith("sitemapindex")
+        for loc in root.iter():
+            if loc.tag.endswith("loc") and loc.text:
+                if is_index:
+                    pending.append(loc.text.strip())
+                else:
+                    yield loc.text.strip()
+
+
+def seed_frontier(frontier, base_url, paths=(), use_sitemap=True):
+    """Seed a frontier from the site root, listed paths, and robots.txt/sitemap.xml."""
+    frontier.add(base_url)
+    for path in paths:
+        frontier.add(urljoin(base_url, path))
+
+    if use_sitemap:
+        sitemaps = []
+        if frontier.robots is not None:
+            sitemaps = list(frontier.robots.site_maps() or [])
+        if not sitemaps:
+            sitemaps = [urljoin(base_url, "/sitemap.xml")]
+        for url in iter_sitemap_urls(sitemaps):
+            frontier.add(url)
+    return frontier.known()
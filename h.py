@@ -1,10 +1,33 @@
 import os
-import re
 import time
+import codecs
+import queue
 import random
+import argparse
+import threading
+import hashlib
 import requests
-from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count, islice
+from html.parser import HTMLParser
+from urllib.parse import urljoin
 from playwright.sync_api import sync_playwright
+import image_download_1 as downloader
+import metrics
+import rate_limiter
+import http_client
+import url_set
+import work_queue
+from css_store import CSSCache, CSS_CACHE_FILE
+from page_cache import PageCache, PAGE_CACHE_FILE, html_fingerprint, mode_covers
+from frontier import (
+    Frontier, QueueFrontier, DISCOVER_MAX_DEPTH, DISCOVER_MAX_PAGES, load_robots, origin_of, seed_frontier,
+)
+from work_queue import Heartbeat, KIND_PAGE, KIND_DOWNLOAD, LEASE_SECONDS, POLL_SECONDS
+from url_extractor import (
+    KIND_IMPORT, iter_css_urls, iter_image_candidates,
+    iter_srcset, scan_css, scan_css_chunks,
+)
 
 BASE_URL = "https://techguru-laravel.scriptfusions.com"
 
@@ -21,376 +44,1497 @@ PAGES = [
     "/contact"
 ]
 
-# Valid image extensions
-IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".avif", ".bmp", ".ico")
+# <img> attributes that can hold an image source (lazy loaders use data-*)
+IMG_SOURCE_ATTRS = ("src", "data-src", "data-lazy-src", "data-original")
+# Attributes holding a srcset candidate list (<img> and <picture><source>)
+SRCSET_ATTRS = ("srcset", "data-srcset")
 
-all_img_urls = set()  # store all unique image URLs here
-css_cache = {}  # Cache for analyzed CSS files: {url: [image_urls]}
-analyzed_css_count = 0  # Track how many CSS files we've analyzed
+WORKERS = 1  # Browser contexts crawling pages in parallel
 
+# Static mode: fetch server-rendered HTML over plain HTTP instead of Chromium
+STATIC_WORKERS = 8     # Parallel page fetches in static mode
+STATIC_MIN_IMAGES = 1  # Pages yielding fewer images from their HTML are re-crawled in the browser
+BROWSER_PAGES = []     # Paths that always need the browser (JS-rendered content)
 
-def is_image_url(url):
-    """Check if a URL ends with a known image extension."""
-    if not url:
-        return False
+# Stylesheets are streamed and scanned chunk by chunk, never held whole
+CSS_CHUNK_SIZE = 64 * 1024          # Bytes read from the response at a time
+MAX_CSS_BYTES = 20 * 1024 * 1024    # Stop reading a stylesheet past this size (0 = no limit)
+# Crawl profiles: "human" paces every action like a person would; "fast"
+# runs headless, blocks resources we never use and replaces fixed sleeps
+# with event-driven waits
+CRAWL_PROFILES = {
+    "human": {
+        "headless": False,        # Show browser window
+        "slow_mo": 300,           # Slow down actions for visibility
+        "block_resources": (),    # Playwright resource types to abort
+        "block_images": False,    # Abort image bodies too (their URLs are still recorded)
+        "human_scroll": True,     # Mouse move + scripted scroll + fixed 3 s wait
+        "networkidle_timeout": 15000,
+        "page_delay": (2, 4),     # Seconds between pages
+    },
+    "fast": {
+        "headless": True,
+        "slow_mo": 0,
+        "block_resources": ("font", "media"),
+        "block_images": False,
+        "human_scroll": False,    # Viewport-by-viewport scroll until the DOM goes quiet
+        "networkidle_timeout": 0,
+        "page_delay": None,
+    },
+}
+CRAWL_PROFILE = "human"
+SETTLE_QUIET_MS = 500   # "fast" profile: a page is settled after this long without DOM mutations...
+SETTLE_STEP_MS = 1500   # ...waiting at most this long per scrolled viewport...
+SETTLE_MAX_MS = 10000   # ...and this long in all; past it the rest of the page is scrolled without waiting
+BLOCK_IMAGES = False    # Abort image bodies whatever the profile says
+BROWSER_PROFILE_DIR = None  # Persistent user-data-dir, so the browser's HTTP cache survives between runs
+DEFAULT_BROWSER_PROFILE_DIR = ".browser_profile"
+BROWSER_ENDPOINT = None     # CDP or Playwright endpoint of a long-running browser to crawl with
+
+# Network capture: record images from the browser's own responses
+CAPTURE_NETWORK = False
+CAPTURE_SAVE = False  # Also write captured image bodies into the downloaded_images mirror
+
+STATIC_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+css_cache = {}  # Cache for analyzed CSS files: {url: [image_urls]} (shared by all workers)
+css_imports = {}  # Stylesheets pulled in by @import: {url: [imported_css_urls]}
+css_store = None  # Persistent CSSCache backing css_cache across runs (set up in main)
+page_cache = None  # PageCache of earlier scrapes, so unchanged pages are not rendered again (set up in main)
+frontiers = {}  # Discovery mode: {origin: Frontier} of the sites being crawled
+
+
+class ResultSet:
+    """Thread-safe set of image URLs shared by all crawl workers.
+    
+    URLs are normalized by url_set.normalizer first, so cache-buster,
+    port and encoding variants of one image are kept once. Only a hash
+    per URL stays in memory (or nothing, with --url-set-dir).
+    """
+
+    def __init__(self):
+        self.normalizer = url_set.normalizer
+        if url_set.URL_SET_DIR:
+            self._urls = url_set.DiskURLSet(url_set.URL_SET_DIR)
+        else:
+            self._urls = url_set.CompactURLSet()
+        self._lock = threading.Lock()
+
+    def add(self, url):
+        """Add a URL; return its normalized form if it had not been seen before, else None."""
+        url = self.normalizer.normalize(url)
+        with self._lock:
+            return url if self._urls.add(url) else None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._urls)
+
+    def __iter__(self):
+        return self.sorted()
+
+    def sorted(self):
+        """Yield the collected URLs in sorted order, streamed rather than built as a list."""
+        return self._urls.iter_sorted(self._lock)
+
+    def close(self):
+        with self._lock:
+            self._urls.close()
+
+
+class WorkQueueResultSet(ResultSet):
+    """ResultSet that also enqueues every newly found URL as a download task.
+
+    The shared queue deduplicates across workers, so its download tasks
+    are the merged result of every crawler.
+    """
+
+    def __init__(self, shared_queue):
+        super().__init__()
+        self.shared_queue = shared_queue
+
+    def add(self, url):
+        url = super().add(url)
+        if url:
+            self.shared_queue.enqueue(KIND_DOWNLOAD, url)
+        return url
+
+
+def merged_results(shared_queue):
+    """ResultSet of the image URLs every worker sharing the queue has found."""
+    results = ResultSet()
+    for url in shared_queue.keys(KIND_DOWNLOAD):
+        results.add(url)
+    return results
+
+
+def scan_stylesheet(css_url, css_text):
+    """Return (image_urls, imported_css_urls) referenced by a stylesheet.
     
-    # Remove query parameters and fragments for extension check
-    parsed = urlparse(url.split("?")[0].split("#")[0])
-    return parsed.path.lower().endswith(IMAGE_EXTENSIONS)
+    References are resolved relative to the CSS file location.
+    """
+    return split_references(scan_css(css_text, css_url))
 
 
-def scrape_page_images(page, page_url):
-    """Extract all image URLs from one loaded page."""
-    print(f"   🔍 Scanning for images...")
+def split_references(references):
+    """Split scan_css() output into (image_urls, imported_css_urls)."""
+    images = []
+    imports = []
+    for kind, raw, full_url in references:
+        if kind == KIND_IMPORT:
+            imports.append(full_url)
+        else:
+            images.append(full_url)
+    return images, imports
+
+
+def css_charset(headers):
+    """Charset a stylesheet response declares, defaulting to UTF-8."""
+    content_type = headers.get('content-type') or ""
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"\'')
+            try:
+                codecs.lookup(charset)
+                return charset
+            except LookupError:
+                break
+    return "utf-8"
+
+
+def read_stylesheet(response, css_url, max_bytes=MAX_CSS_BYTES):
+    """Stream a stylesheet response and scan it as it arrives.
     
-    # 1. <img src="..."> and <img data-src="..."> (for lazy loading)
-    img_elements = page.query_selector_all("img")
-    img_count = 0
-    for img in img_elements:
-        # Check multiple attributes for image sources
-        for attr in ["src", "data-src", "data-lazy-src", "data-original"]:
-            src = img.get_attribute(attr)
-            if src and src != "":
-                full_url = urljoin(page_url, src)
-                if is_image_url(full_url):
-                    all_img_urls.add(full_url)
-                    img_count += 1
-    
-    print(f"   📸 Found {img_count} images in <img> tags")
+    The body is read CSS_CHUNK_SIZE bytes at a time, hashed and decoded
+    incrementally and fed to scan_css_chunks(), so memory stays flat
+    however large the file is. Reading stops after ``max_bytes``.
+    Returns (image_urls, imported_css_urls, content_hash, truncated).
+    """
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder(css_charset(response.headers))(errors="replace")
+    truncated = False
+    
+    def text_chunks():
+        nonlocal truncated
+        size = 0
+        for chunk in response.iter_content(CSS_CHUNK_SIZE):
+            if max_bytes and size + len(chunk) > max_bytes:
+                chunk = chunk[:max_bytes - size]
+                truncated = True
+            size += len(chunk)
+            digest.update(chunk)
+            yield decoder.decode(chunk)
+            if truncated:
+                break
+        yield decoder.decode(b"", final=True)
+        metrics.inc("css_bytes", size)
+    
+    try:
+        images, imports = split_references(scan_css_chunks(text_chunks(), css_url))
+    finally:
+        response.close()
+    return images, imports, digest.hexdigest(), truncated
 
-    # 2. Inline styles: style="background-image:url(...)" and all url() patterns
-    style_count = 0
-    # Get ALL elements with style attributes (not just background)
-    style_elements = page.query_selector_all("[style]")
-    for elem in style_elements:
-        style = elem.get_attribute("style") or ""
-        # Match ALL url() patterns in CSS (background-image, background, mask, etc.)
-        matches = re.findall(r'url\s*\(\s*["\']?([^"\')\s]+)["\']?\s*\)', style, re.IGNORECASE)
-        for match in matches:
-            if not match.lower().startswith("data:"):  # Skip base64 images
-                full_url = urljoin(page_url, match)
-                if is_image_url(full_url):
-                    all_img_urls.add(full_url)
-                    style_count += 1
-    
-    # Also check common slider/carousel elements specifically
-    slider_elements = page.query_selector_all(".swiper-slide, .carousel-item, .slide, [class*='slider'], [class*='banner']")
-    for elem in slider_elements:
-        style = elem.get_attribute("style") or ""
-        if style:
-            matches = re.findall(r'url\s*\(\s*["\']?([^"\')\s]+)["\']?\s*\)', style, re.IGNORECASE)
-            for match in matches:
-                if not match.lower().startswith("data:"):
-                    full_url = urljoin(page_url, match)
-                    if is_image_url(full_url):
-                        all_img_urls.add(full_url)
-                        style_count += 1
-    
-    print(f"   🎨 Found {style_count} images in inline styles")
 
-    # 3. External CSS files (with caching)
-    css_count = 0
+def remember_stylesheet(css_url, images, imports, headers, content_hash):
+    """Record a stylesheet's analysis in the run cache and the persistent store."""
+    css_cache[css_url] = images
+    css_imports[css_url] = imports
+    if css_store is not None:
+        css_store.put(
+            css_url, images, imports,
+            etag=headers.get('etag'),  # lower-case works for requests and Playwright headers
+            last_modified=headers.get('last-modified'),
+            content_hash=content_hash,
+        )
+
+
+def analyze_css_files(css_files, page_url):
+    """Return the image URLs referenced by the given stylesheets.
+    
+    Each stylesheet is analyzed once per run (``css_cache``). When
+    ``css_store`` is set, results also persist between runs: fresh
+    entries are reused outright and stale ones are revalidated with a
+    conditional GET, so an unchanged stylesheet is never re-scanned.
+    """
+    found = []
     new_css_files = 0
     cached_css_files = 0
     
-    try:
-        css_files = page.evaluate("""
-            () => {
-                return Array.from(document.styleSheets)
-                    .map(sheet => {
-                        try {
-                            return sheet.href;
-                        } catch(e) {
-                            return null;
-                        }
-                    })
-                    .filter(href => href && href.includes('.css'));
-            }
-        """)
+    metrics.detail(f"   📄 Found {len(css_files)} CSS files to check")
+    
+    # Stylesheets reached through @import are appended as they are found
+    pending = list(css_files)
+    seen = set(pending)
+    
+    def follow_imports(imports):
+        for import_url in imports:
+            if import_url not in seen:
+                seen.add(import_url)
+                pending.append(import_url)
+    
+    for css_url in pending:
+        # Check if we've already analyzed this CSS file
+        if css_url in css_cache:
+            # Use cached results
+            found.extend(css_cache[css_url])
+            follow_imports(css_imports.get(css_url, []))
+            cached_css_files += 1
+            metrics.inc("css_cache_hits", source="run")
+            continue
         
-        print(f"   📄 Found {len(css_files)} CSS files to check")
+        stored = css_store.get(css_url) if css_store is not None else None
+        if stored and css_store.is_fresh(stored):
+            css_cache[css_url] = stored["image_urls"]
+            css_imports[css_url] = stored["imports"]
+            found.extend(stored["image_urls"])
+            follow_imports(stored["imports"])
+            cached_css_files += 1
+            metrics.inc("css_cache_hits", source="store")
+            continue
         
-        for css_url in css_files:
-            # Check if we've already analyzed this CSS file
-            if css_url in css_cache:
-                # Use cached results
-                cached_images = css_cache[css_url]
-                for img_url in cached_images:
-                    all_img_urls.add(img_url)
-                    css_count += 1
-                cached_css_files += 1
-                continue
+        # New or stale CSS file - fetch (or revalidate) and analyze it
+        css_images = []  # Store images found in this CSS file
+        imports = []  # Stylesheets this one @imports
+        try:
+            # Pace CSS requests with the host's adaptive rate; use browser-like headers
+            rate_limiter.acquire(css_url)
+            
+            headers = {
+                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/css,*/*;q=0.1',
+                'Accept-Language': 'en-US,en;q=0.9',
+                'Accept-Encoding': 'gzip, deflate, br',
+                'Referer': page_url,
+                'Connection': 'keep-alive'
+            }
+            if css_store is not None:
+                headers.update(css_store.conditional_headers(stored))
             
-            # New CSS file - analyze it
-            css_images = []  # Store images found in this CSS file
+            started = time.perf_counter()
             try:
-                # Add random delay and better headers for CSS requests
-                time.sleep(random.uniform(0.05, 0.15))  # Reduced delay
+                response = http_client.client.get(css_url, headers=headers, timeout=8, stream=True,
+                                                  allow_redirects=True)  # Reduced timeout
+            except requests.exceptions.RequestException:
+                rate_limiter.report(css_url, None)
+                raise
+            elapsed = time.perf_counter() - started
+            metrics.observe("css_fetch_seconds", elapsed)
+            rate_limiter.report(css_url, response.status_code, elapsed, response.headers)
+            if response.status_code != 200:
+                response.close()
+            
+            if response.status_code == 304 and stored:
+                # Unchanged since last run - reuse the stored analysis
+                css_store.touch(css_url)
+                css_cache[css_url] = stored["image_urls"]
+                css_imports[css_url] = stored["imports"]
+                found.extend(stored["image_urls"])
+                follow_imports(stored["imports"])
+                cached_css_files += 1
+                metrics.inc("css_cache_hits", source="revalidated")
                 
-                session = requests.Session()
-                session.headers.update({
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/css,*/*;q=0.1',
-                    'Accept-Language': 'en-US,en;q=0.9',
-                    'Accept-Encoding': 'gzip, deflate, br',
-                    'Cache-Control': 'no-cache',
-                    'Referer': page_url,
-                    'Connection': 'keep-alive'
-                })
+            elif response.status_code == 200:
+                with metrics.timer("css_scan_seconds"):
+                    css_images, imports, content_hash, truncated = read_stylesheet(response, css_url, MAX_CSS_BYTES)
                 
-                response = session.get(css_url, timeout=8, allow_redirects=True)  # Reduced timeout
-                if response.status_code == 200:
-                    css_text = response.text
-                    
-                    # Find all url() references in CSS
-                    matches = re.findall(r'url\s*\(\s*["\']?([^"\')\s]+)["\']?\s*\)', css_text, re.IGNORECASE)
-                    for match in matches:
-                        if not match.lower().startswith("data:"):  # Skip base64 images
-                            # Resolve relative to CSS file location
-                            full_url = urljoin(css_url, match)
-                            if is_image_url(full_url):
-                                all_img_urls.add(full_url)
-                                css_images.append(full_url)
-                                css_count += 1
-                    
-                    # Cache the results
+                if truncated:
+                    # Only part of the file was read - use it this run, but never persist it
+                    metrics.detail(f"   ⚠ CSS larger than {MAX_CSS_BYTES:,} bytes, scanned the start only: {css_url}")
+                    metrics.inc("css_truncated")
                     css_cache[css_url] = css_images
+                    css_imports[css_url] = imports
                     new_css_files += 1
-                    
+                    metrics.inc("css_cache_misses")
                 else:
-                    print(f"   ⚠ CSS returned status {response.status_code}: {css_url}")
-                    css_cache[css_url] = []  # Cache empty result
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"   ⚠ CSS fetch failed: {css_url} ({type(e).__name__})")
-                css_cache[css_url] = []  # Cache empty result to avoid retrying
-            except Exception as e:
-                print(f"   ⚠ CSS processing error: {css_url} ({e})")
+                    if stored and stored["content_hash"] == content_hash:
+                        # Same bytes (server ignored the validators)
+                        cached_css_files += 1
+                        metrics.inc("css_cache_hits", source="same_hash")
+                    else:
+                        new_css_files += 1
+                        metrics.inc("css_cache_misses")
+                    # Cache the results
+                    remember_stylesheet(css_url, css_images, imports, response.headers, content_hash)
+                found.extend(css_images)
+                follow_imports(imports)
+                
+            else:
+                metrics.detail(f"   ⚠ CSS returned status {response.status_code}: {css_url}")
+                metrics.inc("css_fetch_errors")
                 css_cache[css_url] = []  # Cache empty result
-    
-    except Exception as e:
-        print(f"   ⚠ Could not analyze CSS files: {e}")
+                
+        except requests.exceptions.RequestException as e:
+            metrics.detail(f"   ⚠ CSS fetch failed: {css_url} ({type(e).__name__})")
+            metrics.inc("css_fetch_errors")
+            css_cache[css_url] = []  # Cache empty result to avoid retrying
+        except Exception as e:
+            metrics.detail(f"   ⚠ CSS processing error: {css_url} ({e})")
+            css_cache[css_url] = []  # Cache empty result
     
     if new_css_files > 0 or cached_css_files > 0:
-        print(f"   🖼 Found {css_count} images in CSS files (📁 {new_css_files} new, ⚡ {cached_css_files} cached)")
+        metrics.detail(f"   🖼 Found {len(found)} images in CSS files (📁 {new_css_files} new, ⚡ {cached_css_files} cached)")
     else:
-        print(f"   🖼 Found {css_count} images in CSS files")
+        metrics.detail(f"   🖼 Found {len(found)} images in CSS files")
+    
+    return found
 
-            # Check for CSS background images set via JavaScript/computed styles (reduced scope)
-        js_bg_count = 0
-        try:
-            # Only check slider elements for better performance
-            dynamic_elements = page.query_selector_all("""
-                .swiper-slide, .carousel-item, .slide, 
-                [class*='slider'], [class*='banner'], [class*='hero']
-            """)
+
+class ResponseCapture:
+    """Record the images (and stylesheets) a page's own traffic delivers.
+    
+    Image responses are identified by content type, so images loaded by
+    JS under extension-less URLs are caught too. Stylesheets are analyzed
+    from the bodies the browser already downloaded and seeded into
+    ``css_cache``, so analyze_css_files() does not fetch them again.
+    With ``save`` set, image bodies are written straight into the
+    downloaded_images mirror, or into the folder ``folder(url)`` names.
+    """
+
+    def __init__(self, save=False, folder=None):
+        self.save = save
+        self.folder = folder
+        self._pending = []
+
+    def attach(self, page):
+        page.on("response", self._pending.append)
+
+    def drain(self):
+        """Process the responses seen since the last call; return captured image URLs."""
+        pending, self._pending = self._pending, []
+        found = []
+        for response in pending:
+            url = response.url
+            if not url.startswith(("http://", "https://")) or response.status != 200:
+                continue
             
-            for elem in dynamic_elements[:20]:  # Reduced from 100 to 20
-                try:
-                    bg_image = page.evaluate("(element) => window.getComputedStyle(element).backgroundImage", elem)
-                    if bg_image and bg_image != "none":
-                        matches = re.findall(r'url\s*\(\s*["\']?([^"\')\s]+)["\']?\s*\)', bg_image)
-                        for match in matches:
-                            if not match.lower().startswith("data:"):
-                                full_url = urljoin(page_url, match)
-                                if is_image_url(full_url):
-                                    all_img_urls.add(full_url)
-                                    js_bg_count += 1
-                    
-                    # Also check data-bg attributes (common in sliders)
-                    data_bg = elem.get_attribute("data-bg")
-                    if data_bg:
-                        full_url = urljoin(page_url, data_bg)
-                        if is_image_url(full_url):
-                            all_img_urls.add(full_url)
-                            js_bg_count += 1
-                            
-                except:
-                    continue  # Skip elements that can't be processed
-        except Exception as e:
-            print(f"   ⚠ Could not check computed background images: {e}")
+            content_type = (response.headers.get("content-type") or "").lower()
+            try:
+                if content_type.startswith("image/"):
+                    found.append(url)
+                    if self.save:
+                        self._save_image(url, response)
+                elif content_type.startswith("text/css") and url not in css_cache:
+                    body = response.body()
+                    images, imports = scan_stylesheet(url, body.decode(errors="replace"))
+                    remember_stylesheet(url, images, imports, response.headers,
+                                        hashlib.sha256(body).hexdigest())
+            except Exception as e:
+                # The body is gone once the page navigates away
+                metrics.detail(f"   ⚠ Could not read captured response: {url} ({type(e).__name__})")
+        return found
+
+    def _save_image(self, url, response):
+        body = response.body()
+        if body:
+            downloader.save_body(url, body, response.headers.get("etag"), response.headers.get("last-modified"),
+                                 self.folder(url) if self.folder else None)
+
+
+# Collects every image candidate on the page in one round-trip; resolving
+# and filtering happen in Python. Backgrounds are read from the computed
+# style of every element, so images applied by JS or stylesheets show up
+# even when no attribute mentions them.
+COLLECT_IMAGES_JS = """
+({imgAttrs, srcsetAttrs, collectLinks}) => {
+    const unique = (values) => Array.from(new Set(values.filter(Boolean)));
+    const imgSources = [], srcsets = [], styles = [], dataBgs = [], computed = [], stylesheets = [], links = [];
+
+    for (const img of document.querySelectorAll('img')) {
+        for (const name of imgAttrs) imgSources.push(img.getAttribute(name));
+    }
+    for (const el of document.querySelectorAll('img, source')) {
+        for (const name of srcsetAttrs) srcsets.push(el.getAttribute(name));
+    }
+    for (const el of document.querySelectorAll('[style]')) styles.push(el.getAttribute('style'));
+    for (const el of document.querySelectorAll('[data-bg]')) dataBgs.push(el.getAttribute('data-bg'));
+    for (const el of document.querySelectorAll('body *')) {
+        const bg = getComputedStyle(el).backgroundImage;
+        if (bg && bg !== 'none') computed.push(bg);
+    }
+    for (const sheet of document.styleSheets) {
+        try {
+            if (sheet.href && sheet.href.includes('.css')) stylesheets.push(sheet.href);
+        } catch (e) {}
+    }
+    if (collectLinks) {
+        for (const a of document.querySelectorAll('a[href]')) links.push(a.href);
+    }
+
+    return {
+        imgSources: imgSources.filter(Boolean),
+        srcsets: unique(srcsets),
+        styles: unique(styles),
+        dataBgs: unique(dataBgs),
+        computed: unique(computed),
+        stylesheets: unique(stylesheets),
+        links: unique(links),
+    };
+}
+"""
+
+
+def scrape_page_images(page, page_url, results, taps=(), response=None):
+    """Extract all image URLs from one loaded page.
+    
+    Every URL is added to ``results``; the list of URLs found on this
+    page (duplicates included) is returned. ``taps`` are the
+    ResponseCapture/ResourceBlocker objects attached to the page; image
+    URLs they saw in its network traffic are included. ``response`` is
+    the page's navigation response, used to fingerprint it for the page
+    cache.
+    """
+    metrics.detail(f"   🔍 Scanning for images...")
+    found = []
+    
+    # 0. Images (and stylesheets) seen in the browser's own traffic
+    if taps:
+        with metrics.timer("extract_seconds", phase="network"):
+            captured = [img_url for tap in taps for img_url in tap.drain()]
+        found.extend(captured)
+        metrics.detail(f"   📡 Captured {len(captured)} images from network traffic")
+    
+    frontier = frontiers.get(origin_of(page_url))
+    with metrics.timer("extract_seconds", phase="evaluate"):
+        candidates = page.evaluate(COLLECT_IMAGES_JS, {
+            "imgAttrs": list(IMG_SOURCE_ATTRS),
+            "srcsetAttrs": list(SRCSET_ATTRS),
+            "collectLinks": frontier is not None,
+        })
+    if frontier is not None:
+        discover_links(frontier, candidates["links"], page_url)
+    
+    # 1. <img src="..."> and <img data-src="..."> (for lazy loading), plus
+    #    responsive candidates from <img srcset> and <picture><source srcset>
+    img_count = 0
+    with metrics.timer("extract_seconds", phase="img"):
+        for raw, full_url in iter_image_candidates(candidates["imgSources"], page_url):
+            found.append(full_url)
+            img_count += 1
+        for srcset in candidates["srcsets"]:
+            for raw, full_url in iter_image_candidates(iter_srcset(srcset), page_url):
+                found.append(full_url)
+                img_count += 1
+    
+    metrics.detail(f"   📸 Found {img_count} images in <img> tags")
+
+    # 2. Inline styles: style="background-image:url(...)" and all url() patterns
+    style_count = 0
+    with metrics.timer("extract_seconds", phase="inline_style"):
+        for style in candidates["styles"]:
+            for raw, full_url in iter_css_urls(style, page_url):
+                found.append(full_url)
+                style_count += 1
+    
+    metrics.detail(f"   🎨 Found {style_count} images in inline styles")
+
+    # 3. External CSS files (with caching)
+    try:
+        with metrics.timer("extract_seconds", phase="css"):
+            css_images = analyze_css_files(candidates["stylesheets"], page_url)
+    except Exception as e:
+        metrics.detail(f"   ⚠ Could not analyze CSS files: {e}")
+        css_images = []
+    found.extend(css_images)
+
+    # 4. Background images set via JavaScript/computed styles, and data-bg attributes
+    js_bg_count = 0
+    with metrics.timer("extract_seconds", phase="computed"):
+        for bg_image in candidates["computed"]:
+            for raw, full_url in iter_css_urls(bg_image, page_url):
+                found.append(full_url)
+                js_bg_count += 1
+        for raw, full_url in iter_image_candidates(candidates["dataBgs"], page_url):
+            found.append(full_url)
+            js_bg_count += 1
+    
+    if js_bg_count > 0:
+        metrics.detail(f"   🔧 Found {js_bg_count} images in computed/dynamic styles")
+
+    for img_url in found:
+        results.add(img_url)
+    
+    if page_cache is not None and response is not None:
+        try:
+            html = response.text()
+        except Exception:
+            html = None  # Body not available (e.g. after a redirect)
+        css_set = set(css_images)
+        capturing = any(isinstance(tap, ResponseCapture) for tap in taps)
+        remember_page(page_url, response.headers, html, [url for url in found if url not in css_set],
+                      candidates["stylesheets"], candidates["links"], "capture" if capturing else "browser")
+    return found
+
+
+def remember_page(page_url, headers, html, images, stylesheets, links, mode):
+    """Store a page's scrape in the page cache, if it can be validated later.
+    
+    ``images`` are the page's own images; its stylesheets are analyzed
+    again on reuse, so changed CSS is still picked up.
+    """
+    fingerprint = html_fingerprint(html) if html is not None else None
+    etag = headers.get('etag')
+    last_modified = headers.get('last-modified')
+    if fingerprint or etag or last_modified:
+        page_cache.put(page_url, images, stylesheets, links, etag, last_modified, fingerprint, mode)
+
+
+def discover_links(frontier, links, page_url):
+    """Feed a page's <a href> links to the discovery frontier."""
+    added = frontier.add_links(links, page_url)
+    metrics.inc("pages_discovered", added)
+    if added:
+        metrics.detail(f"   🧭 Discovered {added} new pages")
+
+
+class StaticImageParser(HTMLParser):
+    """Collect the raw image candidates that scrape_page_images reads from the DOM."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.img_sources = []
+        self.styles = []
+        self.data_bgs = []
+        self.stylesheets = []
+        self.links = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "img":
+            for attr in IMG_SOURCE_ATTRS:
+                if attrs.get(attr):
+                    self.img_sources.append(attrs[attr])
+        if tag in ("img", "source"):
+            for attr in SRCSET_ATTRS:
+                if attrs.get(attr):
+                    self.img_sources.extend(iter_srcset(attrs[attr]))
+        if attrs.get("style"):
+            self.styles.append(attrs["style"])
+        if attrs.get("data-bg"):
+            self.data_bgs.append(attrs["data-bg"])
+        if tag == "link" and attrs.get("href"):
+            rel = (attrs.get("rel") or "").lower().split()
+            if "stylesheet" in rel:
+                self.stylesheets.append(attrs["href"])
+        if tag == "a" and attrs.get("href"):
+            self.links.append(attrs["href"])
+
+
+def extract_static_images(html, page_url):
+    """Return (image_urls, stylesheet_urls, links) referenced by raw page HTML."""
+    parser = StaticImageParser()
+    parser.feed(html)
+    parser.close()
+    
+    found = [full_url for raw, full_url in iter_image_candidates(parser.img_sources + parser.data_bgs, page_url)]
+    for style in parser.styles:
+        found.extend(full_url for raw, full_url in iter_css_urls(style, page_url))
+    
+    stylesheets = []
+    for href in parser.stylesheets:
+        css_url = urljoin(page_url, href)
+        if ".css" in css_url and css_url not in stylesheets:
+            stylesheets.append(css_url)
+    
+    return found, stylesheets, parser.links
+
+
+def scrape_page_static(page_url, results, session, min_images=0):
+    """Extract image URLs from a page's HTML without a browser.
+    
+    Applies the same rules as scrape_page_images. Returns the list of
+    images found in the HTML itself (stylesheet images excluded). The
+    page goes into the page cache only if it yields ``min_images``.
+    """
+    rate_limiter.acquire(page_url)
+    started = time.perf_counter()
+    try:
+        response = session.get(page_url, headers=STATIC_HEADERS, timeout=30)
+    except requests.exceptions.RequestException:
+        rate_limiter.report(page_url, None)
+        raise
+    elapsed = time.perf_counter() - started
+    metrics.observe("page_fetch_seconds", elapsed, mode="static")
+    rate_limiter.report(page_url, response.status_code, elapsed, response.headers)
+    response.raise_for_status()
+    
+    with metrics.timer("extract_seconds", phase="static_html"):
+        html_images, css_files, links = extract_static_images(response.text, page_url)
+    metrics.detail(f"   📸 Found {len(html_images)} images in HTML")
+    frontier = frontiers.get(origin_of(page_url))
+    if frontier is not None:
+        discover_links(frontier, links, page_url)
+    with metrics.timer("extract_seconds", phase="css"):
+        css_images = analyze_css_files(css_files, page_url)
+    
+    for img_url in html_images + css_images:
+        results.add(img_url)
+    if page_cache is not None and len(html_images) >= min_images:
+        remember_page(page_url, response.headers, response.text, html_images, css_files, links, "static")
+    return html_images
+
+
+def run_cache_pass(pages, total_pages, results, mode="browser"):
+    """Reuse the cached scrape of every page that has not changed; return the entries that have.
+    
+    A page is unchanged if a conditional GET answers 304, or if its HTML
+    still has the stored fingerprint. Only scrapes at least as thorough
+    as ``mode`` ("static", "browser" or "capture") are reused.
+    """
+    
+    def check(entry):
+        i, path, url = entry
+        stored = page_cache.get(url)
+        if stored is None:
+            return entry
+        if not mode_covers(stored["mode"], mode):
+            metrics.inc("page_cache_misses", reason="mode")
+            return entry  # e.g. a static scrape, when this run renders pages
+        frontier = frontiers.get(origin_of(url))
+        if frontier is not None and not stored["links"]:
+            return entry  # Scraped before discovery mode recorded its links
+        
+        headers = dict(STATIC_HEADERS)
+        headers.update(page_cache.conditional_headers(stored))
+        rate_limiter.acquire(url)
+        started = time.perf_counter()
+        try:
+            response = http_client.client.get(url, headers=headers, timeout=30)
+        except requests.exceptions.RequestException:
+            rate_limiter.report(url, None)
+            return entry
+        elapsed = time.perf_counter() - started
+        metrics.observe("page_fetch_seconds", elapsed, mode="revalidate")
+        rate_limiter.report(url, response.status_code, elapsed, response.headers)
+        
+        if response.status_code == 304:
+            source = "revalidated"
+        elif (response.status_code == 200 and stored["fingerprint"]
+              and html_fingerprint(response.text) == stored["fingerprint"]):
+            source = "same_hash"
+        else:
+            metrics.inc("page_cache_misses", reason="changed")
+            return entry
         
-        if js_bg_count > 0:
-            print(f"   🔧 Found {js_bg_count} images in computed/dynamic styles")
+        page_cache.touch(url)
+        metrics.inc("page_cache_hits", source=source)
+        metrics.detail(f"\n♻ [{i}/{total_pages}] Unchanged, reusing cached scrape: {url}")
+        for img_url in stored["image_urls"]:
+            results.add(img_url)
+        for img_url in analyze_css_files(stored["stylesheets"], url):
+            results.add(img_url)
+        if frontier is not None:
+            discover_links(frontier, stored["links"], url)
+        metrics.inc("pages_crawled", mode="cached")
+        return None
+    
+    with ThreadPoolExecutor(max_workers=STATIC_WORKERS) as pool:
+        return [entry for entry in pool.map(check, pages) if entry]
 
 
-def main():
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=False,  # Show browser window
-            slow_mo=300,     # Slow down actions for visibility (reduced from 500)
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--disable-extensions',
-                '--no-sandbox',
-                '--disable-web-security',
-                '--disable-gpu',
-                '--disable-setuid-sandbox',
-                '--disable-background-timer-throttling',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-renderer-backgrounding',
-                '--disable-features=TranslateUI,VizDisplayCompositor',
-                '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            ]
-        )
+def run_static_pass(pages, total_pages, results, threshold=STATIC_MIN_IMAGES, browser_pages=()):
+    """Scrape pages over plain HTTP; return the entries that still need a browser."""
+    
+    def scrape(entry):
+        i, path, url = entry
+        if path in browser_pages:
+            metrics.detail(f"\n🌐 [{i}/{total_pages}] Browser-only page: {url}")
+            return entry
         
-        # Create new context with better stealth settings
-        context = browser.new_context(
-            viewport={'width': 1920, 'height': 1080},
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            extra_http_headers={
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Cache-Control': 'max-age=0'
-            }
-        )
+        metrics.detail(f"\n⚡ [{i}/{total_pages}] Static fetch: {url}")
+        try:
+            html_images = scrape_page_static(url, results, http_client.client, threshold)
+        except requests.exceptions.RequestException as e:
+            metrics.detail(f"   ⚠ Static fetch failed ({type(e).__name__}), falling back to browser")
+            metrics.inc("static_fallbacks")
+            return entry
         
-        page = context.new_page()
+        if len(html_images) < threshold:
+            metrics.detail(f"   🔁 Only {len(html_images)} images in HTML, falling back to browser")
+            metrics.inc("static_fallbacks")
+            return entry
+        metrics.inc("pages_crawled", mode="static")
+        return None
+    
+    with ThreadPoolExecutor(max_workers=STATIC_WORKERS) as pool:
+        return [entry for entry in pool.map(scrape, pages) if entry]
+
+
+def crawl_profile():
+    """Return the settings of the active crawl profile."""
+    return CRAWL_PROFILES[CRAWL_PROFILE]
+
+
+def launch_options():
+    """Chromium launch settings with the anti-detection flags."""
+    profile = crawl_profile()
+    return dict(
+        headless=profile["headless"],
+        slow_mo=profile["slow_mo"],
+        args=[
+            '--disable-blink-features=AutomationControlled',
+            '--disable-dev-shm-usage',
+            '--disable-extensions',
+            '--no-sandbox',
+            '--disable-web-security',
+            '--disable-gpu',
+            '--disable-setuid-sandbox',
+            '--disable-background-timer-throttling',
+            '--disable-backgrounding-occluded-windows',
+            '--disable-renderer-backgrounding',
+            '--disable-features=TranslateUI,VizDisplayCompositor',
+            '--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        ]
+    )
+
+
+def launch_browser(p):
+    """Start Chromium with the anti-detection launch flags."""
+    return p.chromium.launch(**launch_options())
+
+
+def context_options(warm=False):
+    """Stealth browser context settings.
+    
+    A ``warm`` context keeps a disk cache worth using, so requests do not
+    carry Cache-Control: max-age=0 (which would revalidate every file).
+    """
+    headers = {
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0'
+    }
+    if warm:
+        del headers['Cache-Control']
+    return dict(
+        viewport={'width': 1920, 'height': 1080},
+        user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        extra_http_headers=headers,
+    )
+
+
+def open_crawl_page(browser):
+    """Create a stealth browser context and return a page ready for crawling."""
+    # Create new context with better stealth settings
+    context = browser.new_context(**context_options())
+    return prepare_page(context.new_page())
+
+
+def prepare_page(page):
+    """Apply the anti-detection script and timeouts to a new page."""
+    # Enhanced anti-detection
+    page.add_init_script("""
+        // Remove webdriver traces
+        Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
+        delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
+        delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
+        delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
         
-        # Enhanced anti-detection
-        page.add_init_script("""
-            // Remove webdriver traces
-            Object.defineProperty(navigator, 'webdriver', {get: () => undefined});
-            delete window.cdc_adoQpoasnfa76pfcZLmcfl_Array;
-            delete window.cdc_adoQpoasnfa76pfcZLmcfl_Promise;
-            delete window.cdc_adoQpoasnfa76pfcZLmcfl_Symbol;
+        // Override permissions
+        const originalQuery = window.navigator.permissions.query;
+        window.navigator.permissions.query = (parameters) => (
+            parameters.name === 'notifications' ?
+                Promise.resolve({ state: Notification.permission }) :
+                originalQuery(parameters)
+        );
+        
+        // Override plugins
+        Object.defineProperty(navigator, 'plugins', {
+            get: () => [1, 2, 3, 4, 5]
+        });
+        
+        // Override languages
+        Object.defineProperty(navigator, 'languages', {
+            get: () => ['en-US', 'en']
+        });
+    """)
+    
+    page.set_default_timeout(90000)  # Increased timeout
+    return page
+
+
+def warm_browser():
+    """True if crawl pages come from a browser whose HTTP cache outlives the run."""
+    return bool(BROWSER_PROFILE_DIR or BROWSER_ENDPOINT)
+
+
+def claim_profile_slot(root):
+    """Lock a user-data-dir under ``root`` that no other browser uses; return (path, release).
+    
+    Chromium cannot share a profile, and crawls may run side by side in one
+    process (parallel sites) or several (work-queue workers). Slots are
+    numbered and the lowest free one is taken, so the next run finds the
+    same warm caches. The lock is an flock on slot-<n>.lock, dropped by
+    release() or when the process dies. Without fcntl (Windows) each
+    process and worker gets a directory of its own instead.
+    """
+    os.makedirs(root, exist_ok=True)
+    try:
+        import fcntl
+    except ImportError:
+        return os.path.join(root, f"{os.getpid()}-{threading.current_thread().name}"), lambda: None
+    for n in count(1):
+        lock_file = open(os.path.join(root, f"slot-{n}.lock"), "w")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            continue
+        return os.path.join(root, f"slot-{n}"), lock_file.close
+
+
+def open_browser_page(p):
+    """Return (page, close) for the calling crawl worker.
+    
+    By default every worker launches a fresh Chromium. With
+    BROWSER_PROFILE_DIR it launches a persistent context on a profile
+    slot of its own (see claim_profile_slot), so the HTTP disk cache is
+    warm on the next run. With BROWSER_ENDPOINT nothing is launched: the
+    worker opens a page in an already-running browser and close() only
+    disconnects. Only a browser that exposes its default context (Chrome
+    over CDP) has a warm cache; on a Playwright server the page gets a
+    fresh context whose cache dies with it.
+    """
+    started = time.perf_counter()
+    if BROWSER_ENDPOINT:
+        source = "connected"
+        if BROWSER_ENDPOINT.startswith(("http://", "https://")) or "/devtools/" in BROWSER_ENDPOINT:
+            browser = p.chromium.connect_over_cdp(BROWSER_ENDPOINT)  # Chrome with --remote-debugging-port
+        else:
+            browser = p.chromium.connect(BROWSER_ENDPOINT)  # Playwright browser server
+        if browser.contexts:
+            page = browser.contexts[0].new_page()
+            page.set_viewport_size({'width': 1920, 'height': 1080})
             
-            // Override permissions
-            const originalQuery = window.navigator.permissions.query;
-            window.navigator.permissions.query = (parameters) => (
-                parameters.name === 'notifications' ?
-                    Promise.resolve({ state: Notification.permission }) :
-                    originalQuery(parameters)
-            );
+            def close():
+                page.close()
+                browser.close()  # Disconnects; the browser keeps running
+        else:
+            # A Playwright server has no default context: this one starts with an empty cache
+            page = browser.new_context(**context_options(warm=True)).new_page()
+            close = browser.close
+        prepare_page(page)
+    elif BROWSER_PROFILE_DIR:
+        source = "persistent"
+        user_data_dir, release = claim_profile_slot(BROWSER_PROFILE_DIR)
+        try:
+            context = p.chromium.launch_persistent_context(user_data_dir, **launch_options(),
+                                                           **context_options(warm=True))
+        except BaseException:
+            release()
+            raise
+        page = prepare_page(context.pages[0] if context.pages else context.new_page())
+        
+        def close():
+            try:
+                context.close()
+            finally:
+                release()
+    else:
+        source = "launched"
+        browser = launch_browser(p)
+        page = open_crawl_page(browser)
+        close = browser.close
+    metrics.observe("browser_start_seconds", time.perf_counter() - started, source=source)
+    return page, close
+
+
+class ResourceBlocker:
+    """Abort requests for resource types the crawl never uses.
+    
+    Blocked image requests are not lost: their URLs are recorded and
+    handed to scrape_page_images() like captured responses.
+    """
+
+    def __init__(self, resource_types):
+        self.resource_types = frozenset(resource_types)
+        self._pending = []
+
+    def attach(self, page):
+        page.route("**/*", self._handle)
+
+    def _handle(self, route):
+        resource_type = route.request.resource_type
+        if resource_type not in self.resource_types:
+            route.continue_()
+            return
+        if resource_type == "image" and route.request.url.startswith(("http://", "https://")):
+            self._pending.append(route.request.url)
+        route.abort()
+
+    def drain(self):
+        """Return the image URLs blocked since the last call."""
+        pending, self._pending = self._pending, []
+        return pending
+
+
+# Scrolls one viewport at a time and waits for the DOM to stop changing
+# after each step, so lazy loaders and sliders have populated the page
+# without any fixed sleep.
+SETTLE_PAGE_JS = """
+async ({quietMs, stepMs, maxMs}) => {
+    const deadline = performance.now() + maxMs;
+    // Image-related attributes only: carousels and animations rewrite class
+    // and the like every frame and would never let the page go quiet
+    const watched = ['src', 'srcset', 'data-src', 'data-srcset', 'style'];
+    const quiet = (limit) => new Promise((resolve) => {
+        let finished = false;
+        let timer = null;
+        const observer = new MutationObserver(() => arm());
+        const cap = setTimeout(() => done(), limit);
+        function done() {
+            if (finished) return;
+            finished = true;
+            observer.disconnect();
+            clearTimeout(timer);
+            clearTimeout(cap);
+            resolve();
+        }
+        function arm() {
+            clearTimeout(timer);
+            timer = setTimeout(() => done(), quietMs);
+        }
+        observer.observe(document.documentElement,
+                         {subtree: true, childList: true, attributes: true, attributeFilter: watched});
+        arm();
+    });
+    // Every viewport is visited; once the budget is spent each one only gets
+    // a frame for its lazy loaders, and the page is no longer allowed to grow
+    const step = () => quiet(Math.max(50, Math.min(stepMs, deadline - performance.now())));
+
+    let bottom = document.documentElement.scrollHeight;
+    for (let y = 0; y < bottom; y += window.innerHeight) {
+        window.scrollTo(0, y);
+        await step();
+        if (performance.now() < deadline) bottom = document.documentElement.scrollHeight;
+    }
+    window.scrollTo(0, 0);
+    await step();
+}
+"""
+
+
+def settle_page(page):
+    """Wait for a freshly loaded page to finish rendering, per the active profile."""
+    profile = crawl_profile()
+    
+    if profile["networkidle_timeout"]:
+        # Wait for network to be idle
+        try:
+            page.wait_for_load_state("networkidle", timeout=profile["networkidle_timeout"])
+        except:
+            metrics.detail(f"   ⏳ Network not idle, continuing anyway...")
+    
+    if not profile["human_scroll"]:
+        page.evaluate(SETTLE_PAGE_JS, {"quietMs": SETTLE_QUIET_MS, "stepMs": SETTLE_STEP_MS,
+                                       "maxMs": SETTLE_MAX_MS})
+        return
+    
+    # More human-like behavior with random variations
+    page.mouse.move(
+        random.randint(200, 800), 
+        random.randint(200, 600)
+    )
+    
+    # Random scrolling pattern
+    scroll_positions = [300, 600, 900, 600, 300, 0]
+    for pos in scroll_positions:
+        page.evaluate(f"window.scrollTo(0, {pos})")
+        page.wait_for_timeout(random.randint(200, 500))
+    
+    # Extra wait for dynamic content
+    page.wait_for_timeout(3000)
+
+
+def crawl_page(page, i, total_pages, url, results, taps=()):
+    """Visit one page with up to 3 attempts; return True if it was scraped."""
+    for attempt in range(3):  # Try each page up to 3 times
+        try:
+            if attempt > 0:
+                metrics.detail(f"   🔄 Retry attempt {attempt + 1}/3")
+                # Exponential backoff with jitter between retries
+                metrics.inc("page_retries")
+                metrics.sleep(rate_limiter.backoff_delay(attempt), "page_retry")
             
-            // Override plugins
-            Object.defineProperty(navigator, 'plugins', {
-                get: () => [1, 2, 3, 4, 5]
-            });
+            metrics.detail(f"\n🌐 [{i}/{total_pages}] Visiting: {url}")
             
-            // Override languages
-            Object.defineProperty(navigator, 'languages', {
-                get: () => ['en-US', 'en']
-            });
-        """)
-        
-        page.set_default_timeout(90000)  # Increased timeout
+            # Navigate with multiple wait strategies
+            rate_limiter.acquire(url)
+            started = time.perf_counter()
+            try:
+                response = page.goto(url, wait_until="domcontentloaded", timeout=90000)
+            except Exception:
+                rate_limiter.report(url, None)
+                raise
+            elapsed = time.perf_counter() - started
+            metrics.observe("navigation_seconds", elapsed)
+            if response:
+                rate_limiter.report(url, response.status, elapsed, response.headers)
+            
+            if response and response.status >= 400:
+                metrics.detail(f"   ⚠ HTTP {response.status} - trying different approach")
+                continue
+            
+            with metrics.timer("settle_seconds"):
+                settle_page(page)
+            
+            # Scrape images from this page
+            scrape_page_images(page, url, results, taps, response)
+            
+            metrics.detail(f"   ✅ Total unique images so far: {len(results)}")
+            metrics.inc("pages_crawled", mode="browser")
+            return True
+            
+        except Exception as e:
+            metrics.detail(f"   ❌ Attempt {attempt + 1} failed: {str(e)[:100]}...")
+            if attempt < 2:  # Don't wait after last attempt
+                metrics.sleep(rate_limiter.backoff_delay(attempt + 1), "page_retry")
+    
+    return False
+
+
+def final_retry_page(page, i, total_pages, url, results, taps=()):
+    """Give a page that failed the first pass one last, simpler attempt."""
+    try:
+        metrics.detail(f"\n🔄 Final retry [{i}/{total_pages}]: {url}")
+        metrics.sleep(rate_limiter.backoff_delay(3), "page_retry")
         
-        total_pages = len(PAGES)
-        retry_pages = []
+        rate_limiter.acquire(url)
+        with metrics.timer("navigation_seconds"):
+            response = page.goto(url, wait_until="domcontentloaded", timeout=60000)
+        with metrics.timer("settle_seconds"):
+            if crawl_profile()["human_scroll"]:
+                page.wait_for_timeout(3000)
+            else:
+                page.evaluate(SETTLE_PAGE_JS, {"quietMs": SETTLE_QUIET_MS, "stepMs": SETTLE_STEP_MS,
+                                               "maxMs": SETTLE_MAX_MS})
+        scrape_page_images(page, url, results, taps, response)
+        metrics.detail(f"   ✅ Retry successful! Total images: {len(results)}")
+        metrics.inc("pages_crawled", mode="browser")
+        return True
         
-        for i, path in enumerate(PAGES, 1):
-            url = urljoin(BASE_URL, path)
-            success = False
+    except Exception as e:
+        metrics.detail(f"   ❌ Final retry failed: {str(e)[:100]}...")
+        metrics.inc("page_failures")
+        return False
+
+
+def crawl_worker(tasks, total_pages, results, failed_pages, final_pass, capture_folder=None):
+    """Drain the page queue with a browser of this worker's own.
+    
+    Playwright's sync API objects must stay on the thread that created
+    them, so every worker opens its own browser (or connection) and page.
+    """
+    with sync_playwright() as p:
+        page, close = open_browser_page(p)
+        try:
+            profile = crawl_profile()
+            
+            # Network taps feed URLs seen in traffic into scrape_page_images.
+            # Routing requests turns the browser cache off, so a warm browser
+            # lets its cache serve the fonts/media the profile would block.
+            taps = []
+            blocked = set() if warm_browser() else set(profile["block_resources"])
+            if profile["block_images"] or BLOCK_IMAGES:
+                blocked.add("image")
+            if blocked:
+                taps.append(ResourceBlocker(blocked))
+            if CAPTURE_NETWORK:
+                taps.append(ResponseCapture(save=CAPTURE_SAVE, folder=capture_folder))
+            for tap in taps:
+                tap.attach(page)
             
-            for attempt in range(3):  # Try each page up to 3 times
+            while True:
                 try:
-                    if attempt > 0:
-                        print(f"   🔄 Retry attempt {attempt + 1}/3")
-                        # Longer wait between retries
-                        time.sleep(random.uniform(3, 6))
-                    
-                    print(f"\n🌐 [{i}/{total_pages}] Visiting: {url}")
-                    
-                    # Navigate with multiple wait strategies
-                    response = page.goto(url, wait_until="domcontentloaded", timeout=90000)
-                    
-                    if response and response.status >= 400:
-                        print(f"   ⚠ HTTP {response.status} - trying different approach")
-                        continue
-                    
-                    # Wait for network to be idle
-                    try:
-                        page.wait_for_load_state("networkidle", timeout=15000)
-                    except:
-                        print(f"   ⏳ Network not idle, continuing anyway...")
-                    
-                    # More human-like behavior with random variations
-                    page.mouse.move(
-                        random.randint(200, 800), 
-                        random.randint(200, 600)
-                    )
-                    
-                    # Random scrolling pattern
-                    scroll_positions = [300, 600, 900, 600, 300, 0]
-                    for pos in scroll_positions:
-                        page.evaluate(f"window.scrollTo(0, {pos})")
-                        page.wait_for_timeout(random.randint(200, 500))
-                    
-                    # Extra wait for dynamic content
-                    page.wait_for_timeout(3000)
-                    
-                    # Scrape images from this page
-                    scrape_page_images(page, url)
-                    
-                    print(f"   ✅ Total unique images so far: {len(all_img_urls)}")
-                    success = True
+                    i, path, url = tasks.get_nowait()
+                except queue.Empty:
                     break
-                    
-                except Exception as e:
-                    print(f"   ❌ Attempt {attempt + 1} failed: {str(e)[:100]}...")
-                    if attempt < 2:  # Don't wait after last attempt
-                        time.sleep(random.uniform(2, 4))
-            
-            if not success:
-                retry_pages.append((i, path, url))
-                print(f"   💀 All attempts failed for {url}")
-            
-            # Variable wait between pages (2-4 seconds)
-            if i < total_pages:
-                wait_time = random.uniform(2, 4)
-                print(f"   ⏳ Waiting {wait_time:.1f} seconds before next page...")
-                time.sleep(wait_time)
-        
-        # Retry failed pages once more
-        if retry_pages:
-            print(f"\n🔄 Retrying {len(retry_pages)} failed pages...")
-            for i, path, url in retry_pages:
+                
+                if final_pass:
+                    if not final_retry_page(page, i, total_pages, url, results, taps):
+                        failed_pages.append((i, path, url))
+                    continue
+                
+                if not crawl_page(page, i, total_pages, url, results, taps):
+                    failed_pages.append((i, path, url))
+                    metrics.detail(f"   💀 All attempts failed for {url}")
+                
+                # Variable wait between pages
+                if profile["page_delay"] and not tasks.empty():
+                    wait_time = random.uniform(*profile["page_delay"])
+                    metrics.detail(f"   ⏳ Waiting {wait_time:.1f} seconds before next page...")
+                    metrics.sleep(wait_time, "page_delay")
+        finally:
+            close()
+
+
+def run_crawl_pass(pages, total_pages, results, workers, final_pass=False, capture_folder=None):
+    """Crawl (index, path, url) entries with a pool of browser workers.
+    
+    Returns the entries that failed every attempt.
+    """
+    tasks = queue.Queue()
+    for entry in pages:
+        tasks.put(entry)
+    
+    failed_pages = []  # list.append is atomic, so workers can share it
+    threads = [
+        threading.Thread(
+            target=crawl_worker,
+            args=(tasks, total_pages, results, failed_pages, final_pass, capture_folder),
+            name=f"crawl-{n + 1}",
+        )
+        for n in range(max(1, min(workers, len(pages))))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # Pages no worker got to (e.g. the browser would not start) failed too
+    while not tasks.empty():
+        failed_pages.append(tasks.get_nowait())
+    return sorted(failed_pages)
+
+
+def crawl_pages(pages, total_pages, results, workers, mode, static_threshold, browser_pages,
+                capture_folder=None):
+    """Crawl (index, path, url) entries, then give failed pages one final retry.
+    
+    ``capture_folder(url)`` picks the folder --capture-save writes an
+    image to (default: the downloaded_images mirror). Returns the
+    entries that failed the retry as well.
+    """
+    if page_cache is not None:
+        count = len(pages)
+        pages = run_cache_pass(pages, total_pages, results, "capture" if CAPTURE_NETWORK else mode)
+        print(f"\n♻ Page cache: {count - len(pages)}/{count} pages unchanged since the last run")
+        if not pages:
+            return []
+    
+    if mode == "static":
+        count = len(pages)
+        pages = run_static_pass(pages, total_pages, results, static_threshold, set(browser_pages))
+        print(f"\n⚡ Static pass done: {count - len(pages)}/{count} pages without a browser")
+        if not pages:
+            return []
+    
+    if workers > 1:
+        print(f"🧵 Crawling with {workers} parallel browser workers")
+    
+    retry_pages = run_crawl_pass(pages, total_pages, results, workers, capture_folder=capture_folder)
+    
+    # Retry failed pages once more
+    if retry_pages:
+        print(f"\n🔄 Retrying {len(retry_pages)} failed pages...")
+        return run_crawl_pass(retry_pages, total_pages, results, workers, final_pass=True,
+                              capture_folder=capture_folder)
+    return []
+
+
+def crawl_site(results, workers=WORKERS, mode="browser",
+               static_threshold=STATIC_MIN_IMAGES, browser_pages=BROWSER_PAGES,
+               base_url=None, paths=None, discover=False, max_depth=DISCOVER_MAX_DEPTH,
+               max_pages=DISCOVER_MAX_PAGES, use_sitemap=True, allow=None, capture_folder=None):
+    """Crawl every page of a site, then give failed pages one final retry.
+    
+    ``base_url`` and ``paths`` default to BASE_URL and PAGES. In "static"
+    mode pages are first read over plain HTTP and only those that need
+    it go through the browser.
+    
+    With ``discover`` the paths are only seeds: robots.txt and the sitemap
+    add more, and every crawled page's same-origin links are followed
+    breadth-first, one depth level per round, up to ``max_depth`` links
+    away and ``max_pages`` pages. ``allow`` filters discovered page URLs.
+    ``capture_folder`` is passed on to crawl_pages().
+    
+    Returns the number of pages crawled.
+    """
+    base_url = base_url or BASE_URL
+    paths = PAGES if paths is None else paths
+    options = (workers, mode, static_threshold, browser_pages, capture_folder)
+    
+    if not discover:
+        pages = [(i, path, urljoin(base_url, path)) for i, path in enumerate(paths, 1)]
+        if pages:
+            crawl_pages(pages, len(pages), results, *options)
+        return len(pages)
+    
+    frontier = Frontier(base_url, max_depth, max_pages, allow=allow, robots=load_robots(base_url))
+    seeds = seed_frontier(frontier, base_url, paths, use_sitemap)
+    print(f"🧭 Discovery: {seeds} seed pages (max depth {max_depth}, max {max_pages} pages)")
+    frontiers[frontier.origin] = frontier
+    try:
+        depth = 0
+        pages = frontier.take_batch()
+        while pages:
+            print(f"\n🧭 Depth {depth}: crawling {len(pages)} pages ({frontier.known()} known so far)")
+            crawl_pages(pages, frontier.known(), results, *options)
+            depth += 1
+            pages = frontier.take_batch()
+    finally:
+        del frontiers[frontier.origin]
+    dropped = f", {frontier.dropped} links over the page limit skipped" if frontier.dropped else ""
+    print(f"\n🧭 Discovery done: {frontier.known()} pages crawled{dropped}")
+    return frontier.known()
+
+
+def crawl_queue(results, shared_queue, worker_id, lease=LEASE_SECONDS, workers=WORKERS, mode="browser",
+                static_threshold=STATIC_MIN_IMAGES, browser_pages=BROWSER_PAGES,
+                base_url=None, paths=None, discover=False, max_depth=DISCOVER_MAX_DEPTH,
+                max_pages=DISCOVER_MAX_PAGES, use_sitemap=True, allow=None):
+    """Crawl a site as one of any number of workers sharing a work queue.
+    
+    Every worker seeds the queue (enqueueing is idempotent), then claims
+    batches of pages under a lease that a heartbeat keeps alive, until no
+    page is left anywhere. Pages claimed by a worker that dies are
+    crawled by another once the lease runs out. With ``discover`` the
+    links found are enqueued for all workers.
+    
+    Returns the number of pages this worker crawled.
+    """
+    base_url = base_url or BASE_URL
+    paths = PAGES if paths is None else paths
+    options = (workers, mode, static_threshold, browser_pages)
+    # Claim as many pages as this worker crawls at once, leaving the rest to the others
+    batch_size = max(1, STATIC_WORKERS if mode == "static" else workers)
+    
+    if discover:
+        frontier = QueueFrontier(shared_queue, worker_id, base_url, max_depth, max_pages, allow=allow,
+                                 robots=load_robots(base_url), batch_size=batch_size, lease=lease)
+        seed_frontier(frontier, base_url, paths, use_sitemap)
+        frontiers[frontier.origin] = frontier
+    else:
+        frontier = QueueFrontier(shared_queue, worker_id, base_url, 0, max(len(paths), 1),
+                                 batch_size=batch_size, lease=lease)
+        for path in paths:
+            frontier.add(urljoin(base_url, path))
+    print(f"🤝 Work queue: {frontier.known()} pages known, {len(frontier)} still to crawl "
+          f"(worker {worker_id})")
+    
+    crawled = 0
+    try:
+        with Heartbeat(shared_queue, worker_id, lease) as heartbeat:
+            while True:
+                pages = frontier.take_batch()
+                if not pages:
+                    if not len(frontier):
+                        break
+                    metrics.sleep(POLL_SECONDS, "queue_wait")  # Other workers hold the rest
+                    continue
+                
+                claimed = list(frontier.claimed)
+                heartbeat.hold(claimed)
+                print(f"\n🤝 Claimed {len(pages)} pages ({len(frontier)} not done yet)")
                 try:
-                    print(f"\n🔄 Final retry [{i}/{total_pages}]: {url}")
-                    time.sleep(random.uniform(3, 5))
-                    
-                    response = page.goto(url, wait_until="domcontentloaded", timeout=60000)
-                    page.wait_for_timeout(3000)
-                    scrape_page_images(page, url)
-                    print(f"   ✅ Retry successful! Total images: {len(all_img_urls)}")
-                    
-                except Exception as e:
-                    print(f"   ❌ Final retry failed: {str(e)[:100]}...")
-
-        browser.close()
+                    failed_pages = crawl_pages(pages, frontier.known(), results, *options)
+                except BaseException as e:
+                    for task_id in frontier.claimed:
+                        shared_queue.fail(task_id, worker_id, f"{type(e).__name__}: {e}")
+                    raise
+                finally:
+                    heartbeat.release(claimed)
+                frontier.complete_batch(failed=[task_id for task_id, _, _ in failed_pages])
+                crawled += len(pages) - len(failed_pages)
+                metrics.inc("queue_tasks_done", len(pages) - len(failed_pages), kind=KIND_PAGE)
+                if failed_pages:
+                    metrics.inc("queue_tasks_failed", len(failed_pages), kind=KIND_PAGE)
+    finally:
+        frontiers.pop(frontier.origin, None)
+    
+    counts = shared_queue.counts(KIND_PAGE)
+    failed = f", {counts[work_queue.TASK_FAILED]} gave up on" if counts.get(work_queue.TASK_FAILED) else ""
+    print(f"\n🤝 Work queue drained: this worker crawled {crawled} of {sum(counts.values())} pages{failed}")
+    return crawled
 
-    # Save all collected URLs to a text file
-    output_file = "image_files_url.txt"
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(f"# Image URLs scraped from {BASE_URL}\n")
-        f.write(f"# Total images found: {len(all_img_urls)}\n")
+
+def save_results(results, output_file, base_url=None):
+    """Write the collected URLs in the image_files_url.txt format.
+    
+    The file is replaced in one step, so workers sharing a queue can all
+    write it.
+    """
+    temp_file = f"{output_file}.{os.getpid()}.tmp"
+    with open(temp_file, "w", encoding="utf-8") as f:
+        f.write(f"# Image URLs scraped from {base_url or BASE_URL}\n")
+        f.write(f"# Total images found: {len(results)}\n")
         f.write(f"# Scraped on: {time.strftime('%Y-%m-%d %H:%M:%S')}\n\n")
         
-        for img_url in sorted(all_img_urls):
+        for img_url in results.sorted():
             f.write(img_url + "\n")
+    os.replace(temp_file, output_file)
+
+
+def build_arg_parser(add_help=True):
+    """Return the command-line parser (reused by pipeline.py)."""
+    parser = argparse.ArgumentParser(description="Collect image URLs from every page in PAGES.",
+                                     add_help=add_help)
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f"browser contexts crawling in parallel (default: {WORKERS})")
+    parser.add_argument('--mode', choices=("browser", "static"), default="browser",
+                        help="'static' reads server-rendered HTML over plain HTTP and only "
+                             "uses Chromium where that finds too few images")
+    parser.add_argument('--static-threshold', type=int, default=STATIC_MIN_IMAGES,
+                        help=f"minimum images a static page must yield (default: {STATIC_MIN_IMAGES})")
+    parser.add_argument('--profile', choices=sorted(CRAWL_PROFILES), default=CRAWL_PROFILE,
+                        help="'human' paces every action; 'fast' runs headless, blocks fonts/media "
+                             "and waits for the DOM to go quiet instead of sleeping")
+    parser.add_argument('--block-images', action='store_true',
+                        help="abort image downloads in the browser and only record their URLs")
+    parser.add_argument('--browser-profile', nargs='?', const=DEFAULT_BROWSER_PROFILE_DIR, metavar='DIR',
+                        help=f"keep each browser worker's profile and HTTP cache under DIR between runs, "
+                             f"so shared JS, CSS and fonts are not downloaded again "
+                             f"(default DIR: {DEFAULT_BROWSER_PROFILE_DIR})")
+    parser.add_argument('--connect', metavar='ENDPOINT',
+                        help="crawl in an already-running browser instead of launching one: a CDP URL "
+                             "(http://localhost:9222 for Chrome started with --remote-debugging-port; "
+                             "its default context and warm cache are reused) or a Playwright server "
+                             "ws:// endpoint (a fresh context per worker, so no cache carries over)")
+    parser.add_argument('--capture', action='store_true',
+                        help="also record every image response the browser receives")
+    parser.add_argument('--capture-save', action='store_true',
+                        help="with --capture, save captured image bodies into the download folder")
+    parser.add_argument('--css-cache', default=CSS_CACHE_FILE, metavar='PATH',
+                        help=f"persistent stylesheet cache (default: {CSS_CACHE_FILE})")
+    parser.add_argument('--no-css-cache', action='store_true',
+                        help="do not read or write the persistent stylesheet cache")
+    parser.add_argument('--page-cache', default=PAGE_CACHE_FILE, metavar='PATH',
+                        help=f"results of earlier page scrapes, reused while a page is unchanged "
+                             f"(default: {PAGE_CACHE_FILE})")
+    parser.add_argument('--no-page-cache', action='store_true',
+                        help="scrape every page again and do not record the results")
+    parser.add_argument('--max-css-bytes', type=int, default=MAX_CSS_BYTES, metavar='N',
+                        help=f"stop reading a stylesheet after N bytes, 0 for no limit (default: {MAX_CSS_BYTES})")
+    parser.add_argument('--browser-page', action='append', default=list(BROWSER_PAGES), metavar='PATH',
+                        help="always crawl this path in the browser (repeatable)")
+    parser.add_argument('--discover', action='store_true',
+                        help="treat PAGES as seeds and follow same-origin links, robots.txt and sitemap.xml")
+    parser.add_argument('--max-depth', type=int, default=DISCOVER_MAX_DEPTH,
+                        help=f"with --discover, links to follow away from a seed (default: {DISCOVER_MAX_DEPTH})")
+    parser.add_argument('--max-pages', type=int, default=DISCOVER_MAX_PAGES,
+                        help=f"with --discover, most pages to crawl per site (default: {DISCOVER_MAX_PAGES})")
+    parser.add_argument('--no-sitemap', action='store_true',
+                        help="with --discover, do not seed from sitemap.xml")
+    work_queue.add_arguments(parser)
+    url_set.add_arguments(parser)
+    rate_limiter.add_arguments(parser)
+    http_client.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser
+
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    return build_arg_parser().parse_args(argv)
+
+
+def open_crawl(args):
+    """Apply crawl-wide settings from parsed ``args`` and open the persistent CSS and page caches."""
+    global css_store, page_cache, CAPTURE_NETWORK, CAPTURE_SAVE, CRAWL_PROFILE, BLOCK_IMAGES, MAX_CSS_BYTES
+    global BROWSER_PROFILE_DIR, BROWSER_ENDPOINT
+    CRAWL_PROFILE = args.profile
+    BROWSER_ENDPOINT = args.connect
+    BROWSER_PROFILE_DIR = None if args.connect else args.browser_profile
+    if BROWSER_ENDPOINT:
+        print(f"🔌 Crawling in the running browser at {BROWSER_ENDPOINT}")
+    elif BROWSER_PROFILE_DIR:
+        print(f"🔥 Browser profile: {os.path.abspath(BROWSER_PROFILE_DIR)} (HTTP cache kept between runs)")
+    if warm_browser() and args.block_images:
+        print("⚠ --block-images routes every request, which turns the browser's HTTP cache off")
+    MAX_CSS_BYTES = args.max_css_bytes
+    BLOCK_IMAGES = args.block_images
+    CAPTURE_NETWORK = args.capture or args.capture_save
+    CAPTURE_SAVE = args.capture_save
+    if not args.no_css_cache:
+        css_store = CSSCache(args.css_cache)
+    if not args.no_page_cache:
+        page_cache = PageCache(args.page_cache)
+
+
+def close_crawl():
+    global css_store, page_cache
+    if page_cache is not None:
+        evicted = page_cache.evict()
+        print(f"\n🗄️ Page cache: {len(page_cache)} entries ({evicted} evicted)")
+        page_cache.close()
+        page_cache = None
+    if css_store is not None:
+        evicted = css_store.evict()
+        print(f"\n🗄️ Persistent CSS cache: {len(css_store)} entries ({evicted} evicted)")
+        css_store.close()
+        css_store = None
+
+
+def run_crawl(args, results, shared_queue=None):
+    """Crawl the site as configured by parsed command-line ``args``.
+    
+    With a ``shared_queue`` the pages are split with the other workers on it.
+    """
+    open_crawl(args)
+    try:
+        options = dict(workers=args.workers, mode=args.mode, static_threshold=args.static_threshold,
+                       browser_pages=args.browser_page, discover=args.discover, max_depth=args.max_depth,
+                       max_pages=args.max_pages, use_sitemap=not args.no_sitemap)
+        if shared_queue is not None:
+            crawl_queue(results, shared_queue, args.worker_id, args.lease, **options)
+        else:
+            crawl_site(results, **options)
+    finally:
+        close_crawl()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.configure(args)
+    rate_limiter.configure(args)
+    http_client.configure(args, max(STATIC_WORKERS, args.workers))
+    url_set.configure(args)
+    
+    if args.work_queue:
+        shared_queue = work_queue.join_work_queue(args, KIND_PAGE)
+        try:
+            found = WorkQueueResultSet(shared_queue)
+            run_crawl(args, found, shared_queue)
+            results = merged_results(shared_queue)
+        finally:
+            shared_queue.close()
+        print(f"🤝 {len(results)} unique image URLs from all workers ({len(found)} found by this one)")
+    else:
+        results = ResultSet()
+        run_crawl(args, results)
+
+    # Save all collected URLs to a text file
+    output_file = "image_files_url.txt"
+    save_results(results, output_file)
 
     print(f"\n🎉 COMPLETED!")
-    print(f"📊 Total unique image URLs found: {len(all_img_urls)}")
+    print(f"📊 Total unique image URLs found: {len(results)}")
     print(f"🗂️ CSS cache stats: {len(css_cache)} files analyzed total")
     print(f"💾 All URLs saved to: {output_file}")
     
     # Show some sample URLs
-    if all_img_urls:
+    if len(results):
         print(f"\n📋 Sample URLs found:")
-        for i, url in enumerate(sorted(all_img_urls)[:5]):
+        for i, url in enumerate(islice(results.sorted(), 5)):
             print(f"   {i+1}. {url}")
-        if len(all_img_urls) > 5:
-            print(f"   ... and {len(all_img_urls) - 5} more")
+        if len(results) > 5:
+            print(f"   ... and {len(results) - 5} more")
+    
+    http_client.print_stats()
+    metrics.finish(args)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,234 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+# Configuration
+POOL_HOSTS = 16         # Hosts that keep a connection pool open at once
+POOL_MAXSIZE = 16       # Keep-alive connections per host (sized to the download concurrency)
+TIMEOUT = 30
+DNS_CACHE_TTL = 300     # Seconds a resolved address is reused (0 disables the cache)
+
+
+class DNSCache:
+    """TTL cache in front of socket.getaddrinfo (installed process-wide)."""
+
+    def __init__(self, ttl=DNS_CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._getaddrinfo = None
+
+    def getaddrinfo(self, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = self._getaddrinfo(*args, **kwargs)
+        with self._lock:
+            self.entries[key] = (now + self.ttl, result)
+        return result
+
+    def install(self):
+        if self._getaddrinfo is None:
+            self._getaddrinfo = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+
+    def uninstall(self):
+        if self._getaddrinfo is not None:
+            socket.getaddrinfo = self._getaddrinfo
+            self._getaddrinfo = None
+
+
+class HTTPXResponse:
+    """requests-style view of an httpx response, so callers need not care which client ran."""
+
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers  # Case-insensitive, like requests
+        self.url = str(response.url)
+
+    @property
+    def content(self):
+        with translate_httpx_errors():
+            return self._response.read()
+
+    @property
+    def text(self):
+        with translate_httpx_errors():
+            self._response.read()
+        return self._response.text
+
+    def iter_content(self, chunk_size=None):
+        with translate_httpx_errors():
+            yield from self._response.iter_bytes(chunk_size)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"{self.status_code} for url: {self.url}", response=self)
+
+    def close(self):
+        self._response.close()
+
+
+@contextmanager
+def translate_httpx_errors():
+    """Re-raise httpx errors as the requests exceptions every caller already handles."""
+    import httpx
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e)) from e
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(str(e)) from e
+
+
+class HTTPClient:
+    """One keep-alive client shared by every crawl and download thread.
+
+    By default a requests.Session whose pools are sized to the
+    configured concurrency (urllib3 pools are thread-safe). With
+    ``http2=True`` and httpx installed, requests are multiplexed over
+    HTTP/2 where the server supports it. Headers are always passed per
+    request; the client itself is never mutated after set-up.
+    """
+
+    def __init__(self, max_connections=POOL_MAXSIZE, http2=False):
+        self.session = None
+        self.httpx = None
+        self.configure(max_connections, http2)
+
+    def configure(self, max_connections=POOL_MAXSIZE, http2=False):
+        self.close()
+        self.requests = 0
+        self.httpx_connections = 0
+        self._lock = threading.Lock()
+        self.max_connections = max_connections
+        self.http2 = False
+
+        if http2:
+            try:
+                import httpx
+                import h2  # noqa: F401 - httpx needs it for HTTP/2
+            except ImportError:
+                print("⚠ HTTP/2 needs 'pip install httpx[http2]', using HTTP/1.1 keep-alive")
+            else:
+                self.httpx = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=max_connections * POOL_HOSTS,
+                                        max_keepalive_connections=max_connections * POOL_HOSTS),
+                )
+                self.http2 = True
+                return
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get(self, url, headers=None, timeout=TIMEOUT, stream=False, allow_redirects=True):
+        return self.request("GET", url, headers, timeout, stream, allow_redirects)
+
+    def head(self, url, headers=None, timeout=TIMEOUT, allow_redirects=True):
+        return self.request("HEAD", url, headers, timeout, False, allow_redirects)
+
+    def request(self, method, url, headers=None, timeout=TIMEOUT, stream=False, allow_redirects=True):
+        with self._lock:
+            self.requests += 1
+        metrics.inc("http_requests")
+
+        if self.httpx is None:
+            return self.session.request(method, url, headers=headers, timeout=timeout, stream=stream,
+                                        allow_redirects=allow_redirects)
+
+        with translate_httpx_errors():
+            request = self.httpx.build_request(method, url, headers=headers, timeout=timeout,
+                                               extensions={"trace": self._trace})
+            response = self.httpx.send(request, stream=stream, follow_redirects=allow_redirects)
+        return HTTPXResponse(response)
+
+    def _trace(self, event, info):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.httpx_connections += 1
+
+    def connections(self):
+        """Connections opened so far."""
+        if self.httpx is not None:
+            return self.httpx_connections
+        opened = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    opened += pool.num_connections
+        return opened
+
+    def stats(self):
+        """Requests sent, connections opened and how often a connection was reused."""
+        requests_sent = self.requests
+        opened = self.connections()
+        return {
+            "protocol": "HTTP/2" if self.http2 else "HTTP/1.1",
+            "requests": requests_sent,
+            "connections": opened,
+            "reuse_ratio": 1 - opened / requests_sent if requests_sent else 0.0,
+            "dns_hits": dns_cache.hits,
+            "dns_misses": dns_cache.misses,
+        }
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        if self.httpx is not None:
+            self.httpx.close()
+            self.httpx = None
+
+
+dns_cache = DNSCache()
+
+# Client shared by h.py, image_download_1.py and pipeline.py
+client = HTTPClient()
+
+
+def add_arguments(parser):
+    """Add the shared HTTP client options to a script's parser."""
+    parser.add_argument('--http2', action='store_true',
+                        help="multiplex CSS and image fetches over HTTP/2 (needs httpx[http2])")
+    parser.add_argument('--dns-cache-ttl', type=float, default=DNS_CACHE_TTL, metavar='SECONDS',
+                        help=f"reuse DNS answers this long, 0 to disable (default: {DNS_CACHE_TTL})")
+
+
+def configure(args, max_connections=POOL_MAXSIZE):
+    """Apply parsed --http2 / --dns-cache-ttl and size the pools for ``max_connections``."""
+    dns_cache.ttl = args.dns_cache_ttl
+    if args.dns_cache_ttl > 0:
+        dns_cache.install()
+    else:
+        dns_cache.uninstall()
+    client.configure(max(max_connections, 1), args.http2)
+
+
+def print_stats():
+    """Print connection reuse for the run."""
+    stats = client.stats()
+    if not stats["requests"]:
+        return
+    print(f"🔌 {stats['protocol']}: {stats['requests']} requests over {stats['connections']} connections "
+          f"({stats['reuse_ratio']:.0%} reused), DNS cache {stats['dns_hits']} hits / "
+          f"{stats['dns_misses']} misses")
+    metrics.inc("http_connections", stats["connections"])
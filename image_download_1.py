@@ -2,10 +2,30 @@ import os
 import re
 import time
 import random
+import asyncio
+import argparse
+import threading
 import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, unquote
 from pathlib import Path
 import hashlib
+from download_manifest import DownloadManifest, MANIFEST_FILE, STATE_COMPLETE, STATE_PARTIAL, STATE_FAILED
+from blob_store import BlobStore, BLOB_STORE_DIR
+from postprocess import (
+    PostProcessor, POSTPROCESS_WORKERS, THUMBNAIL_SIZE, RESULT_REJECTED, RESULT_RENAMED,
+)
+from download_scheduler import (
+    SEGMENT_THRESHOLD, SEGMENTS, learn_sizes, order_by_size, should_segment, plan_segments,
+    content_range_matches,
+)
+import metrics
+import rate_limiter
+import http_client
+import work_queue
+from url_set import host_of
+from work_queue import Heartbeat, KIND_PAGE, KIND_DOWNLOAD, POLL_SECONDS
 
 # Configuration
 INPUT_FILE = "image_files_url.txt"
@@ -13,7 +33,24 @@ DOWNLOAD_DIR = "downloaded_images"
 MAX_RETRIES = 3
 DELAY_RANGE = (0.5, 2.0)  # Random delay between downloads (seconds)
 TIMEOUT = 30
-CHUNK_SIZE = 8192
+CHUNK_SIZE = 64 * 1024        # Smallest read; larger files are read in bigger chunks...
+MAX_CHUNK_SIZE = 1024 * 1024  # ...of Content-Length / 16, up to this size
+PREALLOCATE = True            # Reserve the full Content-Length on disk before writing
+MAX_CONCURRENCY = 16     # Total downloads in flight at once (async engine)
+PER_HOST_CONCURRENCY = 4  # Downloads in flight per host (async engine)
+PART_SUFFIX = ".part"     # In-progress downloads live next to their target until complete
+
+# Result of handling one URL
+STATUS_DOWNLOADED = "downloaded"
+STATUS_UNCHANGED = "unchanged"  # Revalidated with the server (304)
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+manifest = None  # DownloadManifest shared by all workers (set up in main)
+TRUST_MANIFEST = False  # Skip complete files recorded in the manifest without asking the server
+blob_store = None  # Optional content-addressed BlobStore the mirror links into (set up in main)
+postprocessor = None  # Optional PostProcessor verifying finished downloads (set up in main)
+size_hints = {}  # URL -> SizeHint learned before downloading (--schedule-by-size)
 
 # User agents for rotation
 USER_AGENTS = [
@@ -86,60 +123,332 @@ def get_random_headers():
         'Pragma': 'no-cache'
     }
 
+def file_sha256(path):
+    """Return a SHA-256 hash object fed with the contents of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest
+
+def file_size(path):
+    """Size of a file, or None if it does not exist (one stat call)."""
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return None
+
+_created_dirs = set()
+
+def ensure_dir(path):
+    """os.makedirs(path, exist_ok=True), remembering the folders already created this run."""
+    if path not in _created_dirs:
+        os.makedirs(path, exist_ok=True)
+        _created_dirs.add(path)
+
+def chunk_size_for(content_length):
+    """Read size for a body of ``content_length`` bytes (None if unknown)."""
+    if not content_length:
+        return CHUNK_SIZE
+    return max(CHUNK_SIZE, min(MAX_CHUNK_SIZE, content_length // 16))
+
+def preallocate(f, length):
+    """Reserve ``length`` bytes from the current position (best effort; fewer fragments, early ENOSPC)."""
+    if not (PREALLOCATE and length and hasattr(os, "posix_fallocate")):
+        return False
+    try:
+        os.posix_fallocate(f.fileno(), f.tell(), length)
+    except OSError:
+        return False
+    return True
+
+def write_body(response, f, digest, content_length=None):
+    """Stream a response body into ``f`` and ``digest`` (if any); return the bytes written.
+    
+    Chunks grow with the body (see chunk_size_for), so large files take
+    few reads. iter_content() undoes any Content-Encoding.
+    """
+    written = 0
+    for chunk in response.iter_content(chunk_size=chunk_size_for(content_length)):
+        f.write(chunk)
+        if digest is not None:
+            digest.update(chunk)
+        written += len(chunk)
+    return written
+
+def commit_download(part_path, download_path, digest):
+    """Move a finished .part file into place, through the blob store when enabled."""
+    if blob_store is not None:
+        blob_store.ingest(part_path, digest)
+        blob_store.link(digest, download_path)
+    else:
+        os.replace(part_path, download_path)
+
+class SegmentRefused(Exception):
+    """The server did not answer a Range request with exactly the bytes asked for."""
+
+class SegmentWriter:
+    """File wrapper that keeps count of a segment's bytes as they are written."""
+    
+    def __init__(self, f, progress, index, length, abort):
+        self.f = f
+        self.progress = progress
+        self.index = index
+        self.length = length
+        self.abort = abort
+    
+    def write(self, chunk):
+        if self.abort.is_set():
+            raise SegmentRefused("another segment failed")
+        if self.progress[self.index] + len(chunk) > self.length:
+            raise SegmentRefused("more bytes than the range asked for")
+        self.f.write(chunk)
+        self.progress[self.index] += len(chunk)
+
+def fetch_segment(url, part_path, index, start, end, hint, progress, abort, session):
+    """Fetch bytes start-end of a file into its place in the .part file, retrying from where it stopped."""
+    length = end - start + 1
+    for attempt in range(MAX_RETRIES):
+        if abort.is_set():
+            return
+        if attempt > 0:
+            metrics.inc("download_retries")
+            metrics.sleep(rate_limiter.backoff_delay(attempt), "download_retry")
+        
+        offset = start + progress[index]
+        request_headers = get_random_headers()
+        request_headers['Range'] = f'bytes={offset}-{end}'
+        request_headers['Accept-Encoding'] = 'identity'
+        if hint.etag or hint.last_modified:
+            # A changed file comes back as a 200, which is refused below
+            request_headers['If-Range'] = hint.etag or hint.last_modified
+        
+        rate_limiter.acquire(url)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = session.get(url, timeout=TIMEOUT, stream=True, headers=request_headers)
+            rate_limiter.report(url, response.status_code, time.perf_counter() - started, response.headers)
+            if response.status_code != 206 or not content_range_matches(
+                    response.headers.get('Content-Range'), offset, end, hint.size):
+                raise SegmentRefused(f"HTTP {response.status_code}, Content-Range "
+                                     f"{response.headers.get('Content-Range')!r}")
+            with open(part_path, 'r+b') as f:
+                f.seek(offset)
+                write_body(response, SegmentWriter(f, progress, index, length, abort), None, end - offset + 1)
+            if progress[index] == length:
+                return
+        except requests.exceptions.RequestException:
+            if response is None:
+                rate_limiter.report(url, None)
+            if attempt == MAX_RETRIES - 1:
+                raise
+        finally:
+            if response is not None:
+                response.close()
+    raise requests.exceptions.ConnectionError(f"segment {index} incomplete after {MAX_RETRIES} attempts")
+
+def download_segmented(url, download_path, hint, session):
+    """Download a large file as parallel Range segments written straight into its .part file.
+    
+    Returns the status, or None if the server would not serve the ranges
+    (the caller then downloads it as one stream). If a segment fails, the
+    .part file is cut back to the bytes received contiguously from the
+    start, so the single-stream path can resume from there.
+    """
+    part_path = download_path + PART_SUFFIX
+    ranges = plan_segments(hint.size, SEGMENTS)
+    progress = [0] * len(ranges)
+    abort = threading.Event()
+    metrics.detail(f"      ✂ Fetching {hint.size / (1024 * 1024):.1f}MB in {len(ranges)} parallel segments")
+    
+    if manifest is not None:
+        manifest.record(url, download_path, STATE_PARTIAL, etag=hint.etag, last_modified=hint.last_modified)
+    with open(part_path, 'wb') as f:
+        if not preallocate(f, hint.size):
+            f.truncate(hint.size)
+    
+    started = time.perf_counter()
+    error = None
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="segment") as executor:
+        futures = [executor.submit(fetch_segment, url, part_path, i, start, end, hint, progress, abort, session)
+                   for i, (start, end) in enumerate(ranges)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                abort.set()
+                error = error or e
+    
+    if error is not None:
+        # Keep only what can be resumed: the unbroken run of bytes from offset 0
+        contiguous = 0
+        for (start, end), done in zip(ranges, progress):
+            contiguous += done
+            if done < end - start + 1:
+                break
+        with open(part_path, 'r+b') as f:
+            f.truncate(contiguous)
+        metrics.inc("downloaded_bytes", sum(progress))
+        if isinstance(error, SegmentRefused):
+            metrics.detail(f"      ⚠ Segmented download refused ({error}), using one stream")
+            metrics.inc("segmented_downloads", result="refused")
+            return None
+        metrics.detail(f"      ❌ Segmented download failed: {type(error).__name__}")
+        metrics.inc("segmented_downloads", result="failed")
+        return STATUS_FAILED
+    
+    elapsed = time.perf_counter() - started
+    metrics.inc("segmented_downloads", result="ok")
+    metrics.observe("download_seconds", elapsed)
+    metrics.observe("download_bytes_per_second", hint.size / max(elapsed, 1e-6), buckets=metrics.RATE_BUCKETS)
+    metrics.inc("downloaded_bytes", hint.size)
+    digest = file_sha256(part_path).hexdigest()
+    commit_download(part_path, download_path, digest)
+    if manifest is not None:
+        manifest.record(url, download_path, STATE_COMPLETE, hint.size, digest, hint.etag, hint.last_modified)
+    metrics.detail(f"      ✅ Downloaded {hint.size / 1024:.1f}KB in {len(ranges)} segments")
+    return STATUS_DOWNLOADED
+
 def download_image(url, download_path, session):
-    """Download a single image with retry logic."""
+    """Download a single image with retry logic.
+    
+    Bytes are streamed into ``<path>.part`` and only renamed into place
+    once complete, so an interrupted download is never mistaken for a
+    finished file; the next attempt resumes it with a Range request. If
+    the manifest knows the file, the request is conditional and a 304
+    leaves it untouched.
+    """
+    part_path = download_path + PART_SUFFIX
+    entry = manifest.get(url) if manifest is not None else None
+    
+    # A large new file whose server takes Range requests: fetch it in parallel pieces
+    hint = size_hints.get(url)
+    if (should_segment(hint, SEGMENT_THRESHOLD, SEGMENTS) and not os.path.exists(part_path)
+            and not os.path.exists(download_path)):
+        status = download_segmented(url, download_path, hint, session)
+        if status is not None:
+            return status
+        entry = manifest.get(url) if manifest is not None else None
+    
     for attempt in range(MAX_RETRIES):
+        response = None
         try:
-            # Random delay to appear human-like
+            # Exponential backoff with jitter; a Retry-After from the server
+            # is enforced by the host's rate limiter on top
             if attempt > 0:
-                delay = random.uniform(2, 5)  # Longer delay for retries
-                print(f"      ⏳ Retry {attempt + 1}/{MAX_RETRIES} after {delay:.1f}s delay...")
-                time.sleep(delay)
+                delay = rate_limiter.backoff_delay(attempt)
+                metrics.detail(f"      ⏳ Retry {attempt + 1}/{MAX_RETRIES} after {delay:.1f}s delay...")
+                metrics.inc("download_retries")
+                metrics.sleep(delay, "download_retry")
+            
+            # Fresh browser-like headers for each attempt, passed per request
+            request_headers = get_random_headers()
+            resume_from = file_size(part_path) or 0
+            if resume_from:
+                # Resume the partial file; If-Range makes the server send the
+                # whole file instead if it changed in the meantime
+                request_headers['Range'] = f'bytes={resume_from}-'
+                request_headers['Accept-Encoding'] = 'identity'  # Byte offsets must match the file
+                if entry and (entry['etag'] or entry['last_modified']):
+                    request_headers['If-Range'] = entry['etag'] or entry['last_modified']
+            elif entry and entry['status'] == STATE_COMPLETE and os.path.exists(download_path):
+                request_headers.update(manifest.conditional_headers(entry))
             
-            # Update headers for each attempt
-            session.headers.update(get_random_headers())
+            # Make request, as fast as the host's adaptive rate allows
+            rate_limiter.acquire(url)
+            started = time.perf_counter()
+            response = session.get(url, timeout=TIMEOUT, stream=True, headers=request_headers)
+            rate_limiter.report(url, response.status_code, time.perf_counter() - started, response.headers)
+            
+            if response.status_code == 304 and entry:
+                response.close()
+                metrics.detail(f"      ✔ Not modified since last run")
+                manifest.record(url, download_path, STATE_COMPLETE, entry['size'], entry['sha256'],
+                                entry['etag'], entry['last_modified'])
+                return STATUS_UNCHANGED
+            
+            if response.status_code == 416 and resume_from:
+                # The partial file does not fit the remote one any more - start over
+                response.close()
+                os.remove(part_path)
+                metrics.detail(f"      ⚠ Partial file rejected by server, restarting")
+                continue
             
-            # Make request
-            response = session.get(url, timeout=TIMEOUT, stream=True)
             response.raise_for_status()
             
             # Check if it's actually an image
             content_type = response.headers.get('content-type', '').lower()
             if not any(img_type in content_type for img_type in ['image/', 'application/octet-stream']):
-                print(f"      ⚠ Not an image: {content_type}")
-                return False
+                metrics.detail(f"      ⚠ Not an image: {content_type}")
+                return STATUS_FAILED
+            
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            
+            if response.status_code == 206:
+                metrics.detail(f"      ↪ Resuming from {resume_from / 1024:.1f}KB")
+                digest = file_sha256(part_path)
+                mode = 'r+b'  # Not 'ab': appends would land after preallocated space
+                downloaded = resume_from
+            else:
+                digest = hashlib.sha256()
+                mode = 'wb'
+                downloaded = 0
             
-            # Download with progress
-            total_size = int(response.headers.get('content-length', 0))
-            downloaded = 0
+            # Content-Length is the size on disk only for an unencoded body
+            content_length = None
+            if response.headers.get('content-encoding', 'identity').lower() == 'identity':
+                try:
+                    content_length = int(response.headers.get('content-length'))
+                except (TypeError, ValueError):
+                    pass
             
-            with open(download_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
+            # Remember the validators so an interrupted transfer can be resumed
+            if manifest is not None:
+                manifest.record(url, download_path, STATE_PARTIAL, etag=etag, last_modified=last_modified)
+                entry = manifest.get(url)
+            
+            with open(part_path, mode) as f:
+                f.seek(downloaded)
+                preallocated = preallocate(f, content_length)
+                try:
+                    downloaded += write_body(response, f, digest, content_length)
+                finally:
+                    if preallocated:
+                        f.truncate()  # Drop unused reserved space, so resuming starts at the real end
             
             # Verify download
-            if os.path.getsize(download_path) > 0:
-                size_kb = os.path.getsize(download_path) / 1024
-                print(f"      ✅ Downloaded {size_kb:.1f}KB")
-                return True
+            if downloaded > 0:
+                elapsed = time.perf_counter() - started
+                metrics.observe("download_seconds", elapsed)
+                metrics.observe("download_bytes_per_second", (downloaded - resume_from) / max(elapsed, 1e-6),
+                                buckets=metrics.RATE_BUCKETS)
+                metrics.inc("downloaded_bytes", downloaded - resume_from)
+                commit_download(part_path, download_path, digest.hexdigest())
+                if manifest is not None:
+                    manifest.record(url, download_path, STATE_COMPLETE, downloaded, digest.hexdigest(),
+                                    etag, last_modified)
+                metrics.detail(f"      ✅ Downloaded {downloaded / 1024:.1f}KB")
+                return STATUS_DOWNLOADED
             else:
-                print(f"      ❌ Empty file downloaded")
-                os.remove(download_path)
-                return False
+                metrics.detail(f"      ❌ Empty file downloaded")
+                os.remove(part_path)
+                return STATUS_FAILED
                 
         except requests.exceptions.RequestException as e:
+            if response is None:
+                rate_limiter.report(url, None)  # No answer at all (timeout, reset, ...)
             error_type = type(e).__name__
-            print(f"      ❌ Attempt {attempt + 1} failed: {error_type}")
+            metrics.detail(f"      ❌ Attempt {attempt + 1} failed: {error_type}")
             if attempt == MAX_RETRIES - 1:
-                print(f"      💀 All {MAX_RETRIES} attempts failed")
-                return False
+                metrics.detail(f"      💀 All {MAX_RETRIES} attempts failed")
+                return STATUS_FAILED
         except Exception as e:
-            print(f"      ❌ Unexpected error: {str(e)[:50]}...")
-            return False
+            metrics.detail(f"      ❌ Unexpected error: {str(e)[:50]}...")
+            return STATUS_FAILED
     
-    return False
+    return STATUS_FAILED
 
 def load_urls_from_file(filepath):
     """Load URLs from text file, ignoring comments and empty lines."""
@@ -163,88 +472,468 @@ def load_urls_from_file(filepath):
     
     return urls
 
-def main():
-    print("🚀 Starting Anti-Detection Image Downloader")
-    print("=" * 50)
+def prepare_download_path(url, download_dir=None):
+    """Map a URL to its mirrored location under ``download_dir`` (default DOWNLOAD_DIR), creating folders as needed."""
+    download_dir = download_dir or DOWNLOAD_DIR
+    directory, filename = get_path_and_filename(url)
     
-    # Load URLs from file
-    print(f"📖 Loading URLs from: {INPUT_FILE}")
-    urls = load_urls_from_file(INPUT_FILE)
+    # Create full path maintaining directory structure
+    if directory:
+        full_dir = os.path.join(download_dir, directory)
+        ensure_dir(full_dir)
+        return os.path.join(full_dir, filename), os.path.join(directory, filename)
     
-    if not urls:
-        print("❌ No valid URLs found in file!")
-        return
+    ensure_dir(download_dir)
+    return os.path.join(download_dir, filename), filename
+
+_path_locks = {}
+_path_locks_lock = threading.Lock()
+
+def path_lock(download_path):
+    """Lock serializing work on one mirror file (several URLs can map to it, e.g. ?w=2 variants)."""
+    with _path_locks_lock:
+        return _path_locks.setdefault(download_path, threading.Lock())
+
+def process_url(url, session, download_dir=None):
+    """Download one URL into the mirror unless it is already up to date."""
+    download_path, relative_path = prepare_download_path(url, download_dir)
+    metrics.detail(f"    📁 Path: {relative_path}")
     
-    print(f"📊 Found {len(urls)} image URLs to download")
+    with path_lock(download_path):
+        return update_mirror_file(url, download_path, relative_path, session)
+
+def save_body(url, body, etag=None, last_modified=None, download_dir=None):
+    """Put an image body fetched elsewhere (e.g. captured from the browser) into the mirror.
     
-    # Create download directory
-    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
-    print(f"📁 Download directory: {DOWNLOAD_DIR}")
+    Treated like a finished download: serialized with downloads of the
+    same file, recorded in the manifest and post-processed. The bytes go
+    through a temporary file of their own, never the .part file a
+    download may be resuming. Returns the status.
+    """
+    download_path, relative_path = prepare_download_path(url, download_dir)
+    with path_lock(download_path):
+        entry = manifest.get(url) if manifest is not None else None
+        if (os.path.exists(download_path) or os.path.exists(download_path + PART_SUFFIX)
+                or (entry and entry['status'] == STATE_COMPLETE and os.path.exists(entry['path']))):
+            return STATUS_SKIPPED
+        
+        digest = hashlib.sha256(body).hexdigest()
+        temp_path = f"{download_path}.{os.getpid()}.{threading.get_ident()}.capture"
+        try:
+            with open(temp_path, 'xb') as f:
+                f.write(body)
+            commit_download(temp_path, download_path, digest)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if manifest is not None:
+            manifest.record(url, download_path, STATE_COMPLETE, len(body), digest, etag, last_modified)
+        if postprocessor is not None:
+            postprocessor.submit(url, download_path, relative_path)
+        return STATUS_DOWNLOADED
+
+def update_mirror_file(url, download_path, relative_path, session):
+    """Bring one mirror file up to date for ``url``; return its status."""
+    entry = manifest.get(url) if manifest is not None else None
     
-    # Setup session with connection pooling
-    session = requests.Session()
+    # Post-processing gave the file the extension of its real format
+    if (entry and entry['path'] != download_path
+            and os.path.splitext(entry['path'])[0] == os.path.splitext(download_path)[0]):
+        download_path = entry['path']
+        relative_path = os.path.splitext(relative_path)[0] + os.path.splitext(download_path)[1]
     
-    # Statistics
-    successful = 0
-    failed = 0
-    skipped = 0
+    # Already have these bytes (e.g. the mirror was cleaned): relink, no download
+    if (not os.path.exists(download_path) and blob_store is not None and entry
+            and entry['status'] == STATE_COMPLETE and blob_store.has(entry['sha256'])):
+        blob_store.link(entry['sha256'], download_path)
+        metrics.detail(f"    ♻ Restored from blob store")
     
-    print(f"\n🎯 Starting downloads...")
-    print("=" * 50)
+    # Skip if already exists
+    size = file_size(download_path)
+    if size is not None:
+        if manifest is None or (TRUST_MANIFEST and (entry is None or entry['size'] == size)):
+            metrics.detail(f"    ⏭ Already exists ({size / 1024:.1f}KB)")
+            return STATUS_SKIPPED
+        
+        if entry is None or entry['status'] != STATE_COMPLETE:
+            # Mirrored before the manifest existed: adopt it as-is
+            digest = file_sha256(download_path).hexdigest()
+            if blob_store is not None:
+                blob_store.adopt(download_path, digest)
+            manifest.record(url, download_path, STATE_COMPLETE, size, digest)
+            metrics.detail(f"    ⏭ Already exists ({size / 1024:.1f}KB), added to manifest")
+            return STATUS_SKIPPED
+        
+        if not (entry['etag'] or entry['last_modified']):
+            metrics.detail(f"    ⏭ Already exists ({size / 1024:.1f}KB), no validators to revalidate with")
+            return STATUS_SKIPPED
+        
+        metrics.detail(f"    🔁 Revalidating: {relative_path}")
+    else:
+        metrics.detail(f"    💾 Saving to: {relative_path}")
+    
+    # Download the image
+    status = download_image(url, download_path, session)
+    if status == STATUS_DOWNLOADED and postprocessor is not None:
+        postprocessor.submit(url, download_path, relative_path)
+    if status == STATUS_FAILED and manifest is not None and not os.path.exists(download_path):
+        state = STATE_PARTIAL if os.path.exists(download_path + PART_SUFFIX) else STATE_FAILED
+        previous = manifest.get(url) or {}
+        manifest.record(url, download_path, state, etag=previous.get('etag'),
+                        last_modified=previous.get('last_modified'))
+    return status
+
+def download_sequential(urls):
+    """Download URLs one at a time with a human-like delay between files."""
+    session = http_client.client
+    stats = {STATUS_DOWNLOADED: 0, STATUS_UNCHANGED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
     
     for i, url in enumerate(urls, 1):
         try:
-            print(f"\n📥 [{i}/{len(urls)}] Downloading:")
-            print(f"    🔗 {url}")
-            
-            # Get folder structure and filename from URL
-            directory, filename = get_path_and_filename(url)
-            
-            # Create full path maintaining directory structure
-            if directory:
-                full_dir = os.path.join(DOWNLOAD_DIR, directory)
-                os.makedirs(full_dir, exist_ok=True)
-                download_path = os.path.join(full_dir, filename)
-                relative_path = os.path.join(directory, filename)
-            else:
-                download_path = os.path.join(DOWNLOAD_DIR, filename)
-                relative_path = filename
-            
-            print(f"    📁 Path: {relative_path}")
+            metrics.detail(f"\n📥 [{i}/{len(urls)}] Downloading:")
+            metrics.detail(f"    🔗 {url}")
             
-            # Skip if already exists
-            if os.path.exists(download_path):
-                size_kb = os.path.getsize(download_path) / 1024
-                print(f"    ⏭ Already exists ({size_kb:.1f}KB)")
-                skipped += 1
+            status = process_url(url, session)
+            stats[status] += 1
+            metrics.inc("downloads", status=status)
+            if status in (STATUS_SKIPPED, STATUS_UNCHANGED):
                 continue
             
-            print(f"    💾 Saving to: {relative_path}")
-            
-            # Download the image
-            if download_image(url, download_path, session):
-                successful += 1
-            else:
-                failed += 1
-            
             # Human-like delay between downloads (except for last item)
             if i < len(urls):
                 delay = random.uniform(*DELAY_RANGE)
-                print(f"    ⏳ Waiting {delay:.1f}s before next download...")
-                time.sleep(delay)
+                metrics.detail(f"    ⏳ Waiting {delay:.1f}s before next download...")
+                metrics.sleep(delay, "between_downloads")
                 
         except KeyboardInterrupt:
             print(f"\n\n⏹ Download interrupted by user")
             break
         except Exception as e:
-            print(f"    💥 Unexpected error: {str(e)[:100]}...")
-            failed += 1
+            metrics.detail(f"    💥 Unexpected error: {str(e)[:100]}...")
+            stats[STATUS_FAILED] += 1
+            metrics.inc("downloads", status=STATUS_FAILED)
+    
+    return stats
+
+async def download_all_async(urls, max_concurrency=MAX_CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+                             download_dir=None, slots=None):
+    """Download URLs concurrently, bounded by a global and a per-host limit.
+    
+    Each download still goes through process_url()/download_image() on a
+    worker thread, so retries, the content-type check and the mirrored
+    folder layout behave exactly as in the sequential loop. ``slots`` is
+    an optional threading.Semaphore held around every download, to share
+    one concurrency limit between calls running in different threads.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="download")
+    global_limit = asyncio.Semaphore(max_concurrency)
+    host_limits = {}
+    stats = {STATUS_DOWNLOADED: 0, STATUS_UNCHANGED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+    
+    def run_one(i, url):
+        metrics.detail(f"\n📥 [{i}/{len(urls)}] Downloading:")
+        metrics.detail(f"    🔗 {url}")
+        if slots is None:
+            return process_url(url, http_client.client, download_dir)
+        with slots:
+            return process_url(url, http_client.client, download_dir)
+    
+    async def worker(i, url):
+        host = urlparse(url).netloc
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+        # Take the host slot first so a busy host never holds global slots idle
+        async with host_limit:
+            async with global_limit:
+                try:
+                    status = await loop.run_in_executor(executor, run_one, i, url)
+                except Exception as e:
+                    metrics.detail(f"    💥 Unexpected error: {str(e)[:100]}...")
+                    status = STATUS_FAILED
+        stats[status] += 1
+        metrics.inc("downloads", status=status)
+    
+    try:
+        await asyncio.gather(*(worker(i, url) for i, url in enumerate(urls, 1)))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    return stats
+
+class HostDispatcher:
+    """Hands queued items to download workers only when their host has a free slot.
+    
+    A worker that took a URL and then waited for its host would sit idle
+    while URLs for other hosts queue up behind it. Here a host becomes
+    ready only while fewer than ``per_host`` of its items are running,
+    and ready hosts take turns. put() blocks while ``maxsize`` items wait
+    (0: unbounded); take() blocks until an item is ready and returns
+    None once close() was called and nothing is left. Every item taken
+    must be given back with done(host).
+    """
+    
+    def __init__(self, per_host=PER_HOST_CONCURRENCY, maxsize=0):
+        self.per_host = max(1, per_host)
+        self.maxsize = maxsize
+        self.waiting = {}    # {host: deque of items}
+        self.running = {}    # {host: items taken and not done yet}
+        self.ready = deque()  # Hosts with a waiting item and a free slot, in turn order
+        self.size = 0
+        self.closed = False
+        self._cond = threading.Condition()
+    
+    def _mark_ready(self, host):
+        if (self.waiting.get(host) and self.running.get(host, 0) < self.per_host
+                and host not in self.ready):
+            self.ready.append(host)
+    
+    def put(self, item, host):
+        with self._cond:
+            while self.maxsize and self.size >= self.maxsize:
+                self._cond.wait()
+            self.waiting.setdefault(host, deque()).append(item)
+            self.size += 1
+            self._mark_ready(host)
+            self._cond.notify_all()
+    
+    def take(self):
+        """Return (item, host) for a host with a free slot, or None when closed and drained."""
+        with self._cond:
+            while not self.ready:
+                if self.closed and not self.size:
+                    return None
+                self._cond.wait()
+            host = self.ready.popleft()
+            item = self.waiting[host].popleft()
+            if not self.waiting[host]:
+                del self.waiting[host]
+            self.size -= 1
+            self.running[host] = self.running.get(host, 0) + 1
+            self._mark_ready(host)  # Back of the line, if it still has a free slot
+            self._cond.notify_all()
+            return item, host
+    
+    def done(self, host):
+        with self._cond:
+            self.running[host] -= 1
+            if not self.running[host]:
+                del self.running[host]
+            self._mark_ready(host)
+            self._cond.notify_all()
+    
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+def download_from_queue(shared_queue, worker_id, lease, concurrency=MAX_CONCURRENCY,
+                        per_host=PER_HOST_CONCURRENCY, download_dir=None):
+    """Download tasks claimed from a shared work queue until none are left anywhere.
+    
+    Any number of processes (on this or other machines sharing the queue)
+    can run this at once; each task is leased to one of them, and a task
+    whose worker dies goes to another once its lease runs out. Workers
+    keep polling while crawlers on the queue may still add URLs. Claimed
+    tasks reach the download threads through a HostDispatcher, so a busy
+    host never keeps a thread waiting.
+    
+    Returns this worker's stats.
+    """
+    stats = {STATUS_DOWNLOADED: 0, STATUS_UNCHANGED: 0, STATUS_SKIPPED: 0, STATUS_FAILED: 0}
+    stats_lock = threading.Lock()
+    # Claimed tasks wait here (leases kept alive) until their host has a free slot
+    dispatcher = HostDispatcher(per_host, maxsize=max(1, concurrency) * 2)
+    
+    def run(heartbeat):
+        while True:
+            taken = dispatcher.take()
+            if taken is None:
+                return
+            task, host = taken
+            try:
+                status = download_task(task, heartbeat)
+            finally:
+                dispatcher.done(host)
+            with stats_lock:
+                stats[status] += 1
+            metrics.inc("downloads", status=status)
+    
+    def download_task(task, heartbeat):
+        # Several URLs can share a mirror file (whatever its final extension), also across workers
+        mirror_name = os.path.splitext(prepare_download_path(task.key, download_dir)[0])[0]
+        try:
+            while not shared_queue.lock(mirror_name, task.id):
+                metrics.sleep(POLL_SECONDS, "queue_wait")
+            metrics.detail(f"\n📥 [task {task.id}, attempt {task.attempts}] Downloading:")
+            metrics.detail(f"    🔗 {task.key}")
+            status = process_url(task.key, http_client.client, download_dir)
+        except Exception as e:
+            # Unexpected: give it back so another attempt (maybe another worker) can try
+            metrics.detail(f"    💥 Unexpected error: {str(e)[:100]}...")
+            shared_queue.fail(task.id, worker_id, f"{type(e).__name__}: {e}")
+            status = STATUS_FAILED
+        else:
+            shared_queue.complete(task.id, worker_id, status)
+        finally:
+            shared_queue.unlock(mirror_name, task.id)
+            heartbeat.release([task.id])
+        return status
+    
+    with Heartbeat(shared_queue, worker_id, lease) as heartbeat:
+        threads = [threading.Thread(target=run, args=(heartbeat,), name=f"download-{n + 1}")
+                   for n in range(max(1, concurrency))]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                tasks = shared_queue.claim(KIND_DOWNLOAD, worker_id, 1, lease)
+                if not tasks:
+                    # Our own claimed tasks count as active until the workers finish them
+                    if not (shared_queue.active(KIND_DOWNLOAD) or shared_queue.active(KIND_PAGE)):
+                        break
+                    metrics.sleep(POLL_SECONDS, "queue_wait")  # Other workers hold the rest
+                    continue
+                heartbeat.hold([tasks[0].id])
+                dispatcher.put(tasks[0], host_of(tasks[0].key))
+        finally:
+            dispatcher.close()
+            for thread in threads:
+                thread.join()
+    return stats
+
+def build_arg_parser(add_help=True):
+    """Return the command-line parser (reused by pipeline.py)."""
+    parser = argparse.ArgumentParser(description="Download scraped image URLs into a mirrored folder tree.",
+                                     add_help=add_help)
+    parser.add_argument('--sequential', action='store_true',
+                        help="download one file at a time with human-like DELAY_RANGE pauses (original behaviour)")
+    parser.add_argument('--concurrency', type=int, default=MAX_CONCURRENCY,
+                        help=f"maximum downloads in flight (default: {MAX_CONCURRENCY})")
+    parser.add_argument('--per-host', type=int, default=PER_HOST_CONCURRENCY,
+                        help=f"maximum downloads in flight per host (default: {PER_HOST_CONCURRENCY})")
+    parser.add_argument('--manifest', default=MANIFEST_FILE, metavar='PATH',
+                        help=f"download manifest used to resume and revalidate files (default: {MANIFEST_FILE})")
+    parser.add_argument('--no-manifest', action='store_true',
+                        help="skip any existing file without checking it (original behaviour)")
+    parser.add_argument('--trust-manifest', action='store_true',
+                        help="offline re-run: skip files the manifest records as complete without a request")
+    parser.add_argument('--blob-store', nargs='?', const=BLOB_STORE_DIR, metavar='DIR',
+                        help=f"keep each distinct file once in a SHA-256 keyed store and hardlink the mirror "
+                             f"into it (default DIR: {BLOB_STORE_DIR})")
+    parser.add_argument('--verify', action='store_true',
+                        help="decode every downloaded file in a process pool, drop non-images and "
+                             "corrupt files, and fix extensions to the real format (needs Pillow)")
+    parser.add_argument('--thumbnails', nargs='?', type=int, const=THUMBNAIL_SIZE, default=0, metavar='PX',
+                        help=f"with --verify, also write thumbnails into <download dir>_thumbnails "
+                             f"(default PX: {THUMBNAIL_SIZE})")
+    parser.add_argument('--webp', action='store_true',
+                        help="with --verify, also write WebP copies into <download dir>_webp")
+    parser.add_argument('--postprocess-workers', type=int, default=POSTPROCESS_WORKERS, metavar='N',
+                        help=f"processes used by --verify (default: CPU count, {POSTPROCESS_WORKERS})")
+    parser.add_argument('--schedule-by-size', action='store_true',
+                        help="learn file sizes first (manifest, else HEAD requests), download the smallest "
+                             "first and fetch large files in parallel Range segments")
+    parser.add_argument('--segment-threshold', type=float, default=SEGMENT_THRESHOLD / (1024 * 1024),
+                        metavar='MB',
+                        help=f"with --schedule-by-size, split files at least this big "
+                             f"(default: {SEGMENT_THRESHOLD // (1024 * 1024)})")
+    parser.add_argument('--segments', type=int, default=SEGMENTS, metavar='N',
+                        help=f"with --schedule-by-size, Range requests per large file, 1 to disable "
+                             f"(default: {SEGMENTS})")
+    work_queue.add_arguments(parser)
+    rate_limiter.add_arguments(parser)
+    http_client.add_arguments(parser)
+    metrics.add_arguments(parser)
+    return parser
+
+def parse_args(argv=None):
+    """Parse command-line options."""
+    return build_arg_parser().parse_args(argv)
+
+def open_stores(args):
+    """Set up the shared manifest, blob store and post-processor from parsed command-line ``args``."""
+    global manifest, TRUST_MANIFEST, blob_store, postprocessor
+    if not args.no_manifest:
+        manifest = DownloadManifest(args.manifest)
+        TRUST_MANIFEST = args.trust_manifest
+    if args.blob_store:
+        blob_store = BlobStore(args.blob_store)
+    if args.verify or args.thumbnails or args.webp:
+        postprocessor = PostProcessor(args.postprocess_workers, args.thumbnails, args.webp)
+
+def schedule_downloads(urls, args):
+    """Learn file sizes and return ``urls`` smallest first (--schedule-by-size)."""
+    global size_hints, SEGMENT_THRESHOLD, SEGMENTS
+    SEGMENT_THRESHOLD = int(args.segment_threshold * 1024 * 1024)
+    SEGMENTS = 1 if args.sequential else args.segments  # Sequential mode keeps to one connection
+    
+    print(f"📏 Learning the size of {len(urls)} files...")
+    size_hints = learn_sizes(urls, manifest, get_random_headers, args.concurrency)
+    from_manifest = sum(1 for hint in size_hints.values() if hint.source == "manifest")
+    segmented = sum(1 for hint in size_hints.values() if should_segment(hint, SEGMENT_THRESHOLD, SEGMENTS))
+    total = sum(hint.size for hint in size_hints.values())
+    print(f"📏 Sizes known for {len(size_hints)}/{len(urls)} files ({from_manifest} from the manifest), "
+          f"{total / (1024 * 1024):.1f} MB; {segmented} large files will be fetched in segments")
+    return order_by_size(urls, size_hints)
+
+def close_stores():
+    global manifest, blob_store, postprocessor
+    if postprocessor is not None:
+        finish_postprocessing(postprocessor)
+        postprocessor = None
+    if manifest is not None:
+        manifest.close()
+        manifest = None
+    blob_store = None
+
+def finish_postprocessing(processor):
+    """Wait for the post-processing pool and apply its results to the mirror and manifest."""
+    if processor.pending:
+        print(f"\n🔍 Verifying {len(processor.pending)} downloaded files...")
+    counts = {}
+    for url, result in processor.drain():
+        path = result['path']
+        counts[result['result']] = counts.get(result['result'], 0) + 1
+        metrics.inc("postprocessed", result=result['result'])
+        metrics.observe("postprocess_seconds", result['seconds'])
+        
+        with path_lock(path):
+            if result['result'] == RESULT_REJECTED:
+                # Remove it and forget it, so the next run downloads it again
+                metrics.detail(f"    🚫 Rejected {path}: {result['error']}")
+                if os.path.exists(path):
+                    os.remove(path)
+                if manifest is not None:
+                    manifest.record(url, path, STATE_FAILED)
+                continue
+            
+            fixed_path = result['fixed_path']
+            if fixed_path and os.path.exists(path) and not os.path.exists(fixed_path):
+                os.replace(path, fixed_path)
+                metrics.detail(f"    🏷 Renamed {os.path.basename(path)} -> {os.path.basename(fixed_path)} "
+                               f"({result['format']})")
+                entry = manifest.get(url) if manifest is not None else None
+                if entry is not None:
+                    manifest.record(url, fixed_path, entry['status'], entry['size'], entry['sha256'],
+                                    entry['etag'], entry['last_modified'])
+    
+    if counts:
+        print(f"🔍 Post-processing: {sum(counts.values())} files checked, "
+              f"{counts.get(RESULT_RENAMED, 0)} extensions fixed, {counts.get(RESULT_REJECTED, 0)} rejected")
+
+def print_summary(stats):
+    """Print download statistics and a sample of the mirrored folder tree."""
+    successful = stats[STATUS_DOWNLOADED]
+    unchanged = stats[STATUS_UNCHANGED]
+    skipped = stats[STATUS_SKIPPED]
+    failed = stats[STATUS_FAILED]
     
     # Final statistics
     print(f"\n" + "=" * 50)
     print(f"🎉 DOWNLOAD COMPLETED!")
     print(f"📊 Statistics:")
     print(f"   ✅ Successful: {successful}")
+    print(f"   ✔ Unchanged (revalidated): {unchanged}")
     print(f"   ⏭ Skipped (already exist): {skipped}")
     print(f"   ❌ Failed: {failed}")
     print(f"   📁 Total files in folder: {len(os.listdir(DOWNLOAD_DIR))}")
@@ -283,5 +972,69 @@ def main():
             print(f"   {subindent}... and {len(files) - 3} more files")
         structure_count += 1
 
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.configure(args)
+    rate_limiter.configure(args)
+    http_client.configure(args, 1 if args.sequential else args.concurrency)
+    
+    print("🚀 Starting Anti-Detection Image Downloader")
+    print("=" * 50)
+    
+    # Load URLs from file
+    print(f"📖 Loading URLs from: {INPUT_FILE}")
+    urls = load_urls_from_file(INPUT_FILE)
+    
+    shared_queue = work_queue.join_work_queue(args, KIND_DOWNLOAD) if args.work_queue else None
+    if not urls and not (shared_queue is not None and (shared_queue.active(KIND_DOWNLOAD)
+                                                       or shared_queue.active(KIND_PAGE))):
+        print("❌ No valid URLs found in file!")
+        return
+    
+    print(f"📊 Found {len(urls)} image URLs to download")
+    
+    # Create download directory
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    print(f"📁 Download directory: {DOWNLOAD_DIR}")
+    
+    print(f"\n🎯 Starting downloads...")
+    if args.sequential:
+        print("🐢 Sequential mode")
+    else:
+        print(f"⚡ Concurrent mode: {args.concurrency} in flight, {args.per_host} per host")
+    print("=" * 50)
+    
+    open_stores(args)
+    try:
+        if args.schedule_by_size:
+            urls = schedule_downloads(urls, args)
+        if shared_queue is not None:
+            # Enqueueing is idempotent, so every worker may add the same file
+            added = sum(shared_queue.enqueue(KIND_DOWNLOAD, url) for url in urls)
+            print(f"🤝 Work queue: {added} new download tasks, {shared_queue.active(KIND_DOWNLOAD)} "
+                  f"not done yet (worker {args.worker_id})")
+            stats = download_from_queue(shared_queue, args.worker_id, args.lease, args.concurrency,
+                                        args.per_host)
+            merged = shared_queue.results(KIND_DOWNLOAD)
+            failed = shared_queue.counts(KIND_DOWNLOAD).get(work_queue.TASK_FAILED, 0)
+            print(f"\n🤝 All workers: " + ", ".join(f"{count} {status}" for status, count in sorted(merged.items()))
+                  + (f", {failed} given up after repeated crashes" if failed else ""))
+        elif args.sequential:
+            stats = download_sequential(urls)
+        else:
+            try:
+                stats = asyncio.run(download_all_async(urls, args.concurrency, args.per_host))
+            except KeyboardInterrupt:
+                print(f"\n\n⏹ Download interrupted by user (partial files will resume next run)")
+                return
+    finally:
+        close_stores()
+        if shared_queue is not None:
+            shared_queue.close()
+    
+    print_summary(stats)
+    http_client.print_stats()
+    metrics.finish(args)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
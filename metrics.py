@@ -0,0 +1,220 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# Configuration
+METRICS_FORMATS = ("jsonl", "prom")
+METRICS_PREFIX = "lyra_"  # Prometheus metric name prefix
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Seconds
+RATE_BUCKETS = tuple(2 ** n * 1024 for n in range(6, 18, 2))  # Bytes/s, 64KB/s .. 128MB/s
+QUIET = False  # Drop per-page / per-file progress lines (set from --quiet)
+
+
+class Histogram:
+    """Count, sum, min, max and cumulative bucket counts of observed values."""
+
+    def __init__(self, buckets=TIME_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms.
+
+    Timers are histograms of seconds whose name ends in ``_seconds``; the
+    run summary uses them to show where wall-clock time went.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.perf_counter()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=TIME_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def value(self, name, **labels):
+        """Current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def total(self, name):
+        """Sum of a counter over all of its label sets."""
+        with self._lock:
+            return sum(value for (key, labels), value in self.counters.items() if key == name)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.perf_counter()
+
+    def records(self):
+        """Every metric as a JSON-serializable dict."""
+        records = [{"type": "gauge", "name": "run_wall_seconds", "labels": {}, "value": self.elapsed()}]
+        with self._lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                records.append({"type": "counter", "name": name, "labels": dict(labels), "value": value})
+            for (name, labels), h in sorted(self.histograms.items()):
+                records.append({
+                    "type": "histogram", "name": name, "labels": dict(labels),
+                    "count": h.count, "sum": h.sum, "min": h.min, "max": h.max,
+                    "buckets": dict(zip((str(bound) for bound in h.buckets), h.bucket_counts)),
+                })
+        return records
+
+    def write_jsonl(self, path):
+        stamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with open(path, "w", encoding="utf-8") as f:
+            for record in self.records():
+                record["time"] = stamp
+                f.write(json.dumps(record) + "\n")
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text exposition format (for node_exporter's textfile collector)."""
+        lines = []
+        typed = set()
+        for record in self.records():
+            name = METRICS_PREFIX + record["name"]
+            if record["type"] == "counter":
+                name += "_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} {record['type']}")
+                typed.add(name)
+            labels = record["labels"]
+            if record["type"] == "histogram":
+                for bound, count in record["buckets"].items():
+                    lines.append(f"{name}_bucket{format_labels(labels, le=bound)} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels, le='+Inf')} {record['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {record['sum']}")
+                lines.append(f"{name}_count{format_labels(labels)} {record['count']}")
+            else:
+                lines.append(f"{name}{format_labels(labels)} {record['value']}")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def write(self, path, fmt=None):
+        """Write all metrics to ``path``; the format defaults from the extension."""
+        if fmt is None:
+            fmt = "prom" if path.endswith((".prom", ".txt")) else "jsonl"
+        if fmt == "prom":
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+
+    def print_summary(self):
+        """Print where the run's wall-clock time went, plus the main counters."""
+        wall = self.elapsed()
+        with self._lock:
+            timers = {}
+            for (name, labels), h in self.histograms.items():
+                if name.endswith("_seconds"):
+                    label = name[:-len("_seconds")]
+                    if labels:
+                        label += "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+                    timers[label] = (h.sum, h.count)
+            counters = {}
+            for (name, labels), value in self.counters.items():
+                counters[name] = counters.get(name, 0) + value
+
+        print(f"\n⏱ Time breakdown (wall clock {wall:.1f}s; phases can overlap across workers):")
+        for label, (seconds, count) in sorted(timers.items(), key=lambda item: -item[1][0]):
+            share = seconds / wall * 100 if wall else 0
+            print(f"   {label:<40} {seconds:9.2f}s {share:6.1f}%  ({count}x)")
+        if counters:
+            print(f"📈 Counters:")
+            for name, value in sorted(counters.items()):
+                print(f"   {name:<40} {value:,}")
+
+        hits = self.total("css_cache_hits")
+        lookups = hits + self.total("css_cache_misses")
+        if lookups:
+            print(f"🗂️ CSS cache hit ratio: {hits / lookups:.0%} ({hits}/{lookups})")
+
+
+def format_labels(labels, **extra):
+    labels = dict(labels, **extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in sorted(labels.items())) + "}"
+
+
+# Registry shared by h.py, image_download_1.py and pipeline.py
+registry = Metrics()
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+
+
+def detail(message):
+    """Print a per-item progress line unless running with --quiet."""
+    if not QUIET:
+        print(message)
+
+
+def sleep(seconds, reason):
+    """time.sleep() that is accounted for in the run summary."""
+    registry.observe("sleep_seconds", seconds, reason=reason)
+    time.sleep(seconds)
+
+
+def add_arguments(parser):
+    """Add the shared --quiet / --metrics options to a script's parser."""
+    parser.add_argument('--quiet', action='store_true',
+                        help="drop per-page and per-file progress lines")
+    parser.add_argument('--metrics', metavar='PATH',
+                        help="write counters and timings to PATH when the run ends")
+    parser.add_argument('--metrics-format', choices=METRICS_FORMATS,
+                        help="'jsonl' (one JSON object per metric) or 'prom' (Prometheus text); "
+                             "default from the PATH extension")
+
+
+def configure(args):
+    """Apply parsed --quiet and start timing the run."""
+    global QUIET
+    QUIET = args.quiet
+    registry.reset()
+
+
+def finish(args):
+    """Print the run summary and write the metrics file, if one was asked for."""
+    registry.print_summary()
+    if args.metrics:
+        registry.write(args.metrics, args.metrics_format)
+        print(f"📝 Metrics written to: {args.metrics}")
@@ -0,0 +1,106 @@
+import re
+import json
+import time
+import hashlib
+
+from sqlite_store import LRUStore
+
+# Configuration
+PAGE_CACHE_FILE = ".page_cache.sqlite3"
+PAGE_CACHE_MAX_AGE = 30 * 24 * 3600     # Entries unused for this long are evicted
+PAGE_CACHE_MAX_ENTRIES = 10000          # Least recently used entries beyond this are evicted
+
+# How a page was scraped, weakest first: a static scrape misses JS-rendered
+# images, a browser scrape misses those only seen in network traffic
+SCRAPE_MODES = ("static", "browser", "capture")
+
+# Parts of a page that change on every request without the page changing
+# (Laravel's CSRF token, CSP nonces); blanked out before fingerprinting
+VOLATILE_HTML_PATTERNS = [
+    re.compile(r'(<meta[^>]+name=["\']csrf-token["\'][^>]+content=["\'])[^"\']*', re.IGNORECASE),
+    re.compile(r'(<meta[^>]+content=["\'])[^"\']*(?=["\'][^>]+name=["\']csrf-token["\'])', re.IGNORECASE),
+    re.compile(r'(name=["\']_token["\'][^>]*value=["\'])[^"\']*', re.IGNORECASE),
+    re.compile(r'(value=["\'])[^"\']*(?=["\'][^>]*name=["\']_token["\'])', re.IGNORECASE),
+    re.compile(r'(\snonce=["\'])[^"\']*', re.IGNORECASE),
+]
+WHITESPACE_RE = re.compile(r"\s+")
+TAG_GAP_RE = re.compile(r">\s+<")
+
+
+def html_fingerprint(html):
+    """SHA-256 of a page's HTML with volatile tokens and whitespace differences removed."""
+    for pattern in VOLATILE_HTML_PATTERNS:
+        html = pattern.sub(r"\1", html)
+    html = WHITESPACE_RE.sub(" ", TAG_GAP_RE.sub("><", html)).strip()
+    return hashlib.sha256(html.encode("utf-8", errors="replace")).hexdigest()
+
+
+def mode_covers(stored_mode, required_mode):
+    """True if a scrape made in ``stored_mode`` is as thorough as ``required_mode`` asks."""
+    if stored_mode not in SCRAPE_MODES or required_mode not in SCRAPE_MODES:
+        return False
+    return SCRAPE_MODES.index(stored_mode) >= SCRAPE_MODES.index(required_mode)
+
+
+class PageCache(LRUStore):
+    """On-disk cache of scraped pages, keyed by page URL.
+
+    Each entry keeps the page's validators (ETag / Last-Modified), a
+    fingerprint of its HTML, the image URLs found on the page itself,
+    the stylesheets it links (analyzed again through the CSS cache) and
+    its links. Safe to share between threads.
+    """
+
+    TABLE = "page_entries"
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS page_entries (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            fingerprint TEXT,
+            image_urls TEXT NOT NULL,
+            stylesheets TEXT NOT NULL,
+            links TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path=PAGE_CACHE_FILE, max_age=PAGE_CACHE_MAX_AGE, max_entries=PAGE_CACHE_MAX_ENTRIES):
+        super().__init__(path, max_age, max_entries)
+
+    def get(self, url):
+        """Return the cached entry for a page as a dict, or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, fingerprint, image_urls, stylesheets, links, mode, fetched_at "
+                "FROM page_entries WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        etag, last_modified, fingerprint, image_urls, stylesheets, links, mode, fetched_at = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "fingerprint": fingerprint,
+            "image_urls": json.loads(image_urls),
+            "stylesheets": json.loads(stylesheets),
+            "links": json.loads(links),
+            "mode": mode,
+            "fetched_at": fetched_at,
+        }
+
+    def put(self, url, image_urls, stylesheets=(), links=(), etag=None, last_modified=None,
+            fingerprint=None, mode="browser"):
+        """Store (or replace) the scrape of a page."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO page_entries "
+                "(url, etag, last_modified, fingerprint, image_urls, stylesheets, links, mode, "
+                "fetched_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, fingerprint, json.dumps(image_urls),
+                 json.dumps(list(stylesheets)), json.dumps(list(links)), mode, now, now)
+            )
@@ -0,0 +1,154 @@
+import os
+import argparse
+import threading
+
+import h
+import image_download_1 as downloader
+import metrics
+import rate_limiter
+import http_client
+import url_set
+
+# Configuration
+QUEUE_SIZE = 500  # Found-but-not-yet-downloaded URLs; the crawl waits when this fills up
+
+# Options the parent parsers define that the streaming pipeline has no use for
+UNSUPPORTED_OPTIONS = {
+    'sequential': '--sequential',
+    'schedule_by_size': '--schedule-by-size',
+    'segment_threshold': '--segment-threshold',
+    'segments': '--segments',
+    'work_queue': '--work-queue',
+    'reset_queue': '--reset-queue',
+}
+
+
+class QueueingResultSet(h.ResultSet):
+    """ResultSet that hands every newly found URL straight to the downloaders.
+
+    Deduplication happens here, once, so each URL is queued exactly once
+    no matter how many pages reference it.
+    """
+
+    def __init__(self, dispatcher):
+        super().__init__()
+        self.dispatcher = dispatcher
+
+    def add(self, url):
+        url = super().add(url)
+        if url:
+            self.dispatcher.put(url, url_set.host_of(url))  # Blocks while the download side is behind
+        return url
+
+
+def download_worker(dispatcher, stats, stats_lock):
+    """Download URLs whose host has a free slot until the dispatcher is closed and empty."""
+    session = http_client.client
+    while True:
+        taken = dispatcher.take()
+        if taken is None:
+            break
+
+        url, host = taken
+        try:
+            with stats_lock:
+                stats["queued"] += 1
+                n = stats["queued"]
+            metrics.detail(f"\n📥 [{n}] Downloading:")
+            metrics.detail(f"    🔗 {url}")
+            try:
+                status = downloader.process_url(url, session)
+            except Exception as e:
+                metrics.detail(f"    💥 Unexpected error: {str(e)[:100]}...")
+                status = downloader.STATUS_FAILED
+        finally:
+            dispatcher.done(host)
+
+        with stats_lock:
+            stats[status] += 1
+        metrics.inc("downloads", status=status)
+
+
+def run_pipeline(args):
+    """Crawl and download at the same time; return the download stats."""
+    # Per-host queues: a worker only takes a URL whose host has a free slot
+    dispatcher = downloader.HostDispatcher(args.per_host, maxsize=args.queue_size)
+    results = QueueingResultSet(dispatcher)
+    stats = {
+        "queued": 0,
+        downloader.STATUS_DOWNLOADED: 0,
+        downloader.STATUS_UNCHANGED: 0,
+        downloader.STATUS_SKIPPED: 0,
+        downloader.STATUS_FAILED: 0,
+    }
+    stats_lock = threading.Lock()
+
+    os.makedirs(downloader.DOWNLOAD_DIR, exist_ok=True)
+    workers = [
+        threading.Thread(
+            target=download_worker,
+            args=(dispatcher, stats, stats_lock),
+            name=f"download-{n + 1}",
+        )
+        for n in range(args.concurrency)
+    ]
+    for worker in workers:
+        worker.start()
+
+    downloader.open_stores(args)
+    try:
+        h.run_crawl(args, results)
+    finally:
+        # Let the download side drain what is queued, then stop it
+        dispatcher.close()
+        for worker in workers:
+            worker.join()
+        downloader.close_stores()
+
+        # Keep writing the URL list so the two scripts can still run separately
+        h.save_results(results, downloader.INPUT_FILE)
+        print(f"\n💾 {len(results)} URLs saved to: {downloader.INPUT_FILE}")
+
+    return stats
+
+
+def parse_args(argv=None):
+    """Parse command-line options (crawl options from h.py, download options from image_download_1.py)."""
+    parser = argparse.ArgumentParser(
+        description="Crawl pages and download their images in one streaming pass.",
+        parents=[h.build_arg_parser(add_help=False), downloader.build_arg_parser(add_help=False)],
+        conflict_handler="resolve",
+    )
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help=f"URLs buffered between crawl and download (default: {QUEUE_SIZE})")
+    args = parser.parse_args(argv)
+    for dest, option in UNSUPPORTED_OPTIONS.items():
+        if getattr(args, dest) != parser.get_default(dest):
+            parser.error(f"{option} is not supported by the pipeline; run h.py and image_download_1.py separately")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    metrics.configure(args)
+    rate_limiter.configure(args)
+    http_client.configure(args, max(args.concurrency, h.STATIC_WORKERS))
+    url_set.configure(args)
+
+    print("🚀 Starting crawl + download pipeline")
+    print(f"⚡ {args.concurrency} download workers, {args.per_host} per host")
+    print("=" * 50)
+
+    try:
+        stats = run_pipeline(args)
+    except KeyboardInterrupt:
+        print(f"\n\n⏹ Pipeline interrupted by user (partial files will resume next run)")
+        return
+
+    downloader.print_summary(stats)
+    http_client.print_stats()
+    metrics.finish(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Pillow is optional: without it files are only sniffed, not decoded
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# Configuration
+POSTPROCESS_WORKERS = os.cpu_count() or 1  # Processes verifying images (CPU-bound, off the download threads)
+SNIFF_BYTES = 512          # Bytes read to recognise a format...
+MARKUP_SNIFF_BYTES = 64 * 1024  # ...or, for XML/HTML, to get past a long prolog (DOCTYPE entity blocks)
+THUMBNAIL_SIZE = 320       # Longest side of a thumbnail, in pixels
+WEBP_QUALITY = 80
+THUMBNAIL_SUFFIX = "_thumbnails"  # Variants go to sibling trees: downloaded_images_thumbnails/...
+WEBP_SUFFIX = "_webp"
+
+# Outcome of post-processing one file
+RESULT_OK = "ok"
+RESULT_RENAMED = "renamed"        # Valid, but the extension did not match the real format
+RESULT_REJECTED = "rejected"      # An HTML page, or an image that fails to decode
+RESULT_UNVERIFIED = "unverified"  # Unrecognised, or Pillow cannot decode this format here
+
+# Canonical extension of each sniffed format, and the extensions accepted for it
+FORMAT_EXTENSIONS = {
+    "jpeg": (".jpg", ".jpeg"),
+    "png": (".png",),
+    "gif": (".gif",),
+    "webp": (".webp",),
+    "avif": (".avif",),
+    "bmp": (".bmp",),
+    "ico": (".ico",),
+    "svg": (".svg",),
+}
+# Sniffed format -> Pillow format name
+PILLOW_FORMATS = {"jpeg": "JPEG", "png": "PNG", "gif": "GIF", "webp": "WEBP", "avif": "AVIF",
+                  "bmp": "BMP", "ico": "ICO"}
+
+
+def skip_xml_prolog(text):
+    """What follows the XML declaration, comments, processing instructions and DOCTYPE of ``text``.
+
+    Returns b"" if the prolog does not end within ``text``.
+    """
+    while True:
+        text = text.lstrip()
+        if text.startswith(b"<?"):
+            end = text.find(b"?>")
+            if end < 0:
+                return b""
+            text = text[end + 2:]
+        elif text.startswith(b"<!--"):
+            end = text.find(b"-->")
+            if end < 0:
+                return b""
+            text = text[end + 3:]
+        elif text.startswith(b"<!doctype"):
+            # An internal subset ([ <!ENTITY ...> ]) can itself contain ">"
+            close = text.find(b">")
+            bracket = text.find(b"[")
+            if 0 <= bracket < close:
+                subset_end = text.find(b"]", bracket)
+                if subset_end < 0:
+                    return b""
+                close = text.find(b">", subset_end)
+            if close < 0:
+                return b""
+            text = text[close + 1:]
+        else:
+            return text
+
+
+def sniff_format(head):
+    """Real format of a file from its first bytes: a FORMAT_EXTENSIONS key, "html" or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"avif", b"avis"):
+        return "avif"
+    if head.startswith(b"BM"):
+        return "bmp"
+    if head.startswith(b"\x00\x00\x01\x00"):
+        return "ico"
+
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<!doctype html", b"<html", b"<head", b"<body")):
+        return "html"
+    if text.startswith(b"<"):
+        root = skip_xml_prolog(text)
+        if root.startswith(b"<svg"):
+            return "svg"
+        if root.startswith((b"<html", b"<head", b"<body")):
+            return "html"
+    return None
+
+
+def can_decode(fmt):
+    """True if Pillow is installed and can open this format."""
+    if Image is None or fmt not in PILLOW_FORMATS:
+        return False
+    Image.init()
+    return PILLOW_FORMATS[fmt] in Image.OPEN
+
+
+def decode_image(path):
+    """Fully decode an image; return an error message or None.
+
+    verify() catches structural damage such as bad PNG checksums, and
+    load() decodes every pixel, which catches truncated files.
+    """
+    try:
+        with Image.open(path) as img:
+            img.verify()
+        with Image.open(path) as img:
+            img.load()
+    except Image.DecompressionBombError:
+        raise
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None
+
+
+def variant_path(download_path, relative_path, suffix, extension):
+    """Path of a variant in the sibling tree, e.g. downloaded_images_thumbnails/<relative>.jpg."""
+    root = download_path[:len(download_path) - len(relative_path)].rstrip(os.sep) or "."
+    stem = os.path.splitext(relative_path)[0]
+    return os.path.join(root + suffix, stem + extension)
+
+
+def save_variant(img, path, fmt, **options):
+    """Write an image atomically (temp file, then rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path + ".tmp"
+    img.save(temp_path, fmt, **options)
+    os.replace(temp_path, path)
+
+
+def make_variants(path, download_path, relative_path, thumbnail_size, webp):
+    """Write the thumbnail and/or WebP copy of an image; return their paths."""
+    variants = []
+    with Image.open(path) as img:
+        img.seek(0)  # First frame of animations
+        if img.mode not in ("RGB", "RGBA"):
+            img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+        if webp:
+            target = variant_path(download_path, relative_path, WEBP_SUFFIX, ".webp")
+            save_variant(img, target, "WEBP", quality=WEBP_QUALITY)
+            variants.append(target)
+        if thumbnail_size:
+            thumb = img.copy()
+            thumb.thumbnail((thumbnail_size, thumbnail_size))
+            alpha = thumb.mode == "RGBA"
+            if alpha:
+                target = variant_path(download_path, relative_path, THUMBNAIL_SUFFIX, ".png")
+                save_variant(thumb, target, "PNG")
+            else:
+                target = variant_path(download_path, relative_path, THUMBNAIL_SUFFIX, ".jpg")
+                save_variant(thumb, target, "JPEG", quality=85)
+            variants.append(target)
+    return variants
+
+
+def process_file(download_path, relative_path, thumbnail_size=0, webp=False):
+    """Sniff, verify and make variants of one downloaded file (runs in a worker process).
+
+    Never renames or deletes anything: the caller applies the result,
+    so the manifest and mirror are only touched from the main process.
+    """
+    started = time.perf_counter()
+    result = {"path": download_path, "format": None, "result": RESULT_OK, "error": None,
+              "fixed_path": None, "variants": [], "seconds": 0.0}
+    try:
+        with open(download_path, "rb") as f:
+            head = f.read(SNIFF_BYTES)
+            if head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<"):
+                head += f.read(MARKUP_SNIFF_BYTES - len(head))
+            fmt = sniff_format(head)
+        result["format"] = fmt
+
+        if fmt == "html":
+            result["result"] = RESULT_REJECTED
+            result["error"] = "HTML page, not an image"
+        elif fmt is None:
+            # Maybe a format missing from the table (TIFF, HEIC, ...): keep it
+            result["result"] = RESULT_UNVERIFIED
+            result["error"] = "unrecognised file format"
+        elif fmt != "svg" and not can_decode(fmt):
+            result["result"] = RESULT_UNVERIFIED
+        elif fmt != "svg":
+            try:
+                result["error"] = decode_image(download_path)
+            except Image.DecompressionBombError as e:
+                result["result"] = RESULT_UNVERIFIED
+                result["error"] = str(e)
+            else:
+                if result["error"]:
+                    result["result"] = RESULT_REJECTED
+
+        if result["result"] != RESULT_REJECTED and fmt in FORMAT_EXTENSIONS:
+            stem, extension = os.path.splitext(download_path)
+            if extension.lower() not in FORMAT_EXTENSIONS[fmt]:
+                result["fixed_path"] = stem + FORMAT_EXTENSIONS[fmt][0]
+                relative_path = os.path.splitext(relative_path)[0] + FORMAT_EXTENSIONS[fmt][0]
+                if result["result"] == RESULT_OK:
+                    result["result"] = RESULT_RENAMED
+
+        if result["result"] in (RESULT_OK, RESULT_RENAMED) and fmt != "svg" and (thumbnail_size or webp):
+            result["variants"] = make_variants(download_path, result["fixed_path"] or download_path,
+                                               relative_path, thumbnail_size, webp)
+    except OSError as e:
+        result["result"] = RESULT_UNVERIFIED
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+class PostProcessor:
+    """Process pool that verifies downloaded files while downloads continue.
+
+    submit() only queues the work, so network threads are never held up
+    by decoding; results are collected with drain() once downloads end.
+    """
+
+    def __init__(self, workers=POSTPROCESS_WORKERS, thumbnail_size=0, webp=False):
+        self.workers = max(1, workers)
+        self.thumbnail_size = thumbnail_size
+        self.webp = webp
+        self.pending = {}  # Future -> URL
+        # spawn: forking a process full of network threads is not safe
+        self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                         mp_context=multiprocessing.get_context("spawn"))
+        if Image is None:
+            print("⚠ Image verification needs Pillow (pip install pillow); only sniffing file formats")
+
+    def submit(self, url, download_path, relative_path):
+        future = self._pool.submit(process_file, download_path, relative_path,
+                                   self.thumbnail_size, self.webp and Image is not None)
+        self.pending[future] = url
+
+    def drain(self):
+        """Yield (url, result) for every submitted file as they finish, then stop the pool."""
+        try:
+            for future in as_completed(list(self.pending)):
+                url = self.pending.pop(future)
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    yield url, {"path": None, "result": RESULT_UNVERIFIED, "error": str(e),
+                                "format": None, "fixed_path": None, "variants": [], "seconds": 0.0}
+        finally:
+            self._pool.shutdown(wait=True, cancel_futures=True)
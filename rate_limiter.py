@@ -0,0 +1,171 @@
+import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+
+import metrics
+from url_set import host_of
+
+# Configuration
+HOST_RATE = 4.0          # Requests/s a host starts at
+MIN_HOST_RATE = 0.2      # Never slower than this...
+MAX_HOST_RATE = 50.0     # ...or faster than this
+SLOW_START = 1.1         # Until the first backoff, each healthy response multiplies the rate by this
+RATE_STEP = 0.25         # Afterwards, additive increase per healthy response
+RATE_BACKOFF = 0.5       # Multiplicative decrease on 429/5xx or rising latency
+BURST = 2.0              # Tokens a quiet host can save up
+SLOW_FACTOR = 2.0        # Smoothed latency this many times the best seen counts as "rising"...
+SLOW_MIN_LATENCY = 0.25  # ...once it is above this many seconds
+RETRY_BASE = 1.0         # Exponential backoff: up to RETRY_BASE * 2**attempt seconds...
+RETRY_MAX = 60.0         # ...capped here, with full jitter
+MAX_RETRY_AFTER = 300.0  # Longest Retry-After we honour (seconds)
+
+THROTTLE_STATUSES = (429, 503)
+
+
+def backoff_delay(attempt, base=RETRY_BASE, cap=RETRY_MAX):
+    """Seconds to wait before retry number ``attempt`` (1-based), with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def parse_retry_after(value):
+    """Seconds asked for by a Retry-After header (delta-seconds or HTTP-date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        seconds = float(value)
+    else:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """Token bucket for one host whose rate is steered by AIMD.
+
+    Like TCP, a host starts in slow start (the rate grows by SLOW_START
+    per healthy response); after the first backoff every healthy
+    response adds RATE_STEP requests/s. A 429/5xx or a
+    smoothed latency well above the best seen multiplies the rate by
+    RATE_BACKOFF (at most once per round-trip). Retry-After blocks the
+    host outright until it has passed.
+    """
+
+    def __init__(self, rate=HOST_RATE, max_rate=MAX_HOST_RATE):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.latency = None
+        self.best_latency = None
+        self.last_backoff = 0.0
+        self.slow_start = True
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(BURST, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        """Block until the host may be sent another request."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            metrics.sleep(wait, "rate_limit")
+
+    def report(self, status, latency, retry_after=None):
+        """Feed back the outcome of a request (status None for a network error)."""
+        with self._lock:
+            now = time.monotonic()
+            if latency is not None:
+                self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+                self.best_latency = min(self.best_latency or self.latency, self.latency)
+
+            if status in THROTTLE_STATUSES and retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+
+            throttled = status is None or status in THROTTLE_STATUSES or status >= 500
+            slow = (self.latency is not None and self.latency > SLOW_MIN_LATENCY
+                    and self.latency > SLOW_FACTOR * self.best_latency)
+            if throttled or slow:
+                if now - self.last_backoff >= (self.latency or 0):
+                    self.rate = max(MIN_HOST_RATE, self.rate * RATE_BACKOFF)
+                    self.last_backoff = now
+                    self.slow_start = False
+                    return "throttled" if throttled else "slow"
+            elif self.slow_start:
+                self.rate = min(self.max_rate, self.rate * SLOW_START)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP)
+        return None
+
+
+class RateLimiter:
+    """Per-host adaptive limiters, shared by every crawl and download thread."""
+
+    def __init__(self, rate=HOST_RATE, max_rate=MAX_HOST_RATE):
+        self.configure(rate, max_rate)
+
+    def configure(self, rate=HOST_RATE, max_rate=MAX_HOST_RATE):
+        self.initial_rate = rate
+        self.max_rate = max_rate
+        self.hosts = {}
+        self.host_settings = {}
+        self._lock = threading.Lock()
+
+    def set_host_rate(self, netloc, rate=None, max_rate=None):
+        """Give one host its own starting / maximum rate (e.g. a site's politeness limit).
+
+        ``netloc`` is in the form url_set.host_of() returns.
+        """
+        with self._lock:
+            self.host_settings[netloc] = (rate or self.initial_rate, max_rate or self.max_rate)
+            self.hosts.pop(netloc, None)
+
+    def host(self, url):
+        netloc = host_of(url)
+        with self._lock:
+            limiter = self.hosts.get(netloc)
+            if limiter is None:
+                rate, max_rate = self.host_settings.get(netloc, (self.initial_rate, self.max_rate))
+                limiter = self.hosts[netloc] = HostLimiter(rate, max_rate)
+            return limiter
+
+    def acquire(self, url):
+        self.host(url).acquire()
+
+    def report(self, url, status, latency=None, headers=None):
+        retry_after = parse_retry_after(headers.get('retry-after')) if headers else None
+        backoff = self.host(url).report(status, latency, retry_after)
+        if backoff:
+            metrics.inc("rate_backoffs", reason=backoff)
+
+
+# Limiter shared by h.py, image_download_1.py and pipeline.py
+limiter = RateLimiter()
+acquire = limiter.acquire
+report = limiter.report
+
+
+def add_arguments(parser):
+    """Add the shared per-host rate options to a script's parser."""
+    parser.add_argument('--host-rate', type=float, default=HOST_RATE, metavar='N',
+                        help=f"requests/s each host starts at before adapting (default: {HOST_RATE})")
+    parser.add_argument('--max-host-rate', type=float, default=MAX_HOST_RATE, metavar='N',
+                        help=f"requests/s a healthy host can ramp up to (default: {MAX_HOST_RATE})")
+
+
+def configure(args):
+    """Apply parsed --host-rate / --max-host-rate."""
+    limiter.configure(args.host_rate, args.max_host_rate)
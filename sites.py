@@ -0,0 +1,269 @@
+import os
+import asyncio
+import argparse
+import threading
+from fnmatch import fnmatch
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+import h
+import image_download_1 as downloader
+from pipeline import UNSUPPORTED_OPTIONS
+import metrics
+import rate_limiter
+import http_client
+import url_set
+
+# Configuration
+SITES_CONFIG = "sites.toml"
+SITES_DIR = "sites"                              # Per-site outputs default to sites/<name>/
+SHARED_DIR = os.path.join(SITES_DIR, "_shared")  # Images on other hosts (CDNs), one folder per host
+PARALLEL_SITES = 2                               # Sites crawled at the same time
+
+# Keys a [[sites]] entry may set: its identity, and per-site overrides of the job options
+SITE_KEYS = ("name", "base_url", "pages", "include", "exclude", "output", "download_dir")
+SITE_OPTIONS = ("workers", "mode", "static_threshold", "browser_pages", "host_rate", "max_host_rate",
+                "discover", "max_depth", "max_pages")
+
+
+def normalize_keys(table):
+    return {key.replace("-", "_"): value for key, value in (table or {}).items()}
+
+
+def load_config(path):
+    """Read a TOML or YAML job file; return (defaults, site tables)."""
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML job files need PyYAML (pip install pyyaml); TOML needs nothing extra")
+        with open(path, encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    else:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+
+    defaults = normalize_keys(data.get("defaults"))
+    sites = []
+    for table in data.get("sites") or []:
+        site = normalize_keys(table)
+        unknown = set(site) - set(SITE_KEYS) - set(SITE_OPTIONS)
+        if unknown:
+            raise ValueError(f"{path}: unknown key(s) for site {site.get('name')!r}: {', '.join(sorted(unknown))}")
+        if not site.get("name") or not site.get("base_url"):
+            raise ValueError(f"{path}: every [[sites]] entry needs a name and a base_url")
+        sites.append(site)
+    if not sites:
+        raise ValueError(f"{path}: no [[sites]] defined")
+    return defaults, sites
+
+
+def apply_defaults(args, defaults):
+    """Let the job file's [defaults] table set any command-line option by its long name.
+
+    Values must have the type of the option's argparse value (an integer
+    may stand for a float); options that default to None take anything.
+    """
+    for key, value in defaults.items():
+        if not hasattr(args, key):
+            raise ValueError(f"unknown option in [defaults]: {key}")
+        if key in UNSUPPORTED_OPTIONS:
+            raise ValueError(f"[defaults] {key} is not supported by sites.py")
+        current = getattr(args, key)
+        if current is not None:
+            expected = type(current)
+            if expected is float and type(value) is int:
+                value = float(value)
+            elif type(value) is not expected:
+                raise ValueError(f"[defaults] {key} must be {expected.__name__}, not {type(value).__name__}: "
+                                 f"{value!r}")
+        setattr(args, key, value)
+
+
+class Site:
+    """One [[sites]] entry, with its options resolved against the job defaults."""
+
+    def __init__(self, config, args):
+        self.name = config["name"]
+        self.base_url = config["base_url"]
+        self.host = url_set.host_of(self.base_url)
+        self.pages = config.get("pages") or ["/"]
+        self.include = config.get("include") or []
+        self.exclude = config.get("exclude") or []
+
+        folder = os.path.join(SITES_DIR, self.name)
+        self.output = config.get("output") or os.path.join(folder, downloader.INPUT_FILE)
+        self.download_dir = config.get("download_dir") or os.path.join(folder, downloader.DOWNLOAD_DIR)
+
+        self.workers = config.get("workers", args.workers)
+        self.mode = config.get("mode", args.mode)
+        self.static_threshold = config.get("static_threshold", args.static_threshold)
+        self.browser_pages = config.get("browser_pages", args.browser_page)
+        self.host_rate = config.get("host_rate")
+        self.max_host_rate = config.get("max_host_rate")
+        self.discover = config.get("discover", args.discover)
+        self.max_depth = config.get("max_depth", args.max_depth)
+        self.max_pages = config.get("max_pages", args.max_pages)
+
+    def in_scope(self, url):
+        """True if a page URL passes the include/exclude glob patterns (matched on path or full URL)."""
+        path = urlparse(url).path or "/"
+
+        def matches(patterns):
+            return any(fnmatch(path, pattern) or fnmatch(url, pattern) for pattern in patterns)
+
+        if self.include and not matches(self.include):
+            return False
+        return not matches(self.exclude)
+
+
+def shared_folder(host):
+    """Download folder for assets on a host shared between sites."""
+    return os.path.join(SHARED_DIR, host.replace(":", "_"))
+
+
+def site_folder(site, url):
+    """Folder an image of ``site`` is downloaded into: its own, or the shared one of a CDN host."""
+    host = url_set.host_of(url)
+    return site.download_dir if host == site.host else shared_folder(host)
+
+
+def run_site(site, args, shared_images, download_slots=None):
+    """Crawl one site, save its URL list and download its images; return a summary dict.
+
+    ``download_slots`` is shared by the sites running in parallel, so
+    together they stay within --concurrency downloads.
+    """
+    print(f"\n🌍 [{site.name}] Crawling {site.base_url}")
+    rate_limiter.limiter.set_host_rate(site.host, site.host_rate, site.max_host_rate)
+
+    paths = [path for path in site.pages if site.in_scope(urljoin(site.base_url, path))]
+    results = h.ResultSet()
+    crawled = h.crawl_site(results, workers=site.workers, mode=site.mode, static_threshold=site.static_threshold,
+                           browser_pages=site.browser_pages, base_url=site.base_url, paths=paths,
+                           discover=site.discover, max_depth=site.max_depth, max_pages=site.max_pages,
+                           use_sitemap=not args.no_sitemap, allow=site.in_scope,
+                           capture_folder=lambda url: site_folder(site, url))
+
+    os.makedirs(os.path.dirname(site.output) or ".", exist_ok=True)
+    h.save_results(results, site.output, site.base_url)
+    print(f"💾 [{site.name}] {len(results)} URLs saved to: {site.output}")
+
+    summary = {"pages": crawled, "urls": len(results), "shared": 0}
+    if args.no_download:
+        return summary
+
+    # The site's own images go to its folder; images on other hosts (CDNs)
+    # are downloaded once for all sites into a shared folder per host
+    own = []
+    shared = {}
+    for url in results.sorted():
+        host = url_set.host_of(url)
+        if host == site.host:
+            own.append(url)
+        elif shared_images.add(url):
+            shared.setdefault(host, []).append(url)
+
+    batches = [(own, site.download_dir)]
+    batches += [(urls, shared_folder(host)) for host, urls in shared.items()]
+    for urls, folder in batches:
+        if not urls:
+            continue
+        stats = asyncio.run(downloader.download_all_async(urls, args.concurrency, args.per_host, folder,
+                                                          download_slots))
+        for status, count in stats.items():
+            summary[status] = summary.get(status, 0) + count
+    summary["shared"] = sum(len(urls) for urls in shared.values())
+    return summary
+
+
+def parse_args(argv=None):
+    """Parse command-line options (h.py and image_download_1.py options act as job defaults)."""
+    parser = argparse.ArgumentParser(
+        description="Crawl, and download the images of, every site listed in a TOML/YAML job file.",
+        parents=[h.build_arg_parser(add_help=False), downloader.build_arg_parser(add_help=False)],
+        conflict_handler="resolve",
+    )
+    parser.add_argument('config', nargs='?', default=SITES_CONFIG,
+                        help=f"job file (default: {SITES_CONFIG})")
+    parser.add_argument('--site', action='append', metavar='NAME',
+                        help="only run this site (repeatable)")
+    parser.add_argument('--parallel-sites', type=int, default=PARALLEL_SITES,
+                        help=f"sites crawled at the same time (default: {PARALLEL_SITES})")
+    parser.add_argument('--no-download', action='store_true',
+                        help="only write each site's URL list")
+    args = parser.parse_args(argv)
+    for dest, option in UNSUPPORTED_OPTIONS.items():
+        if getattr(args, dest) != parser.get_default(dest):
+            parser.error(f"{option} is not supported by sites.py; run h.py and image_download_1.py per site")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        defaults, site_configs = load_config(args.config)
+        apply_defaults(args, defaults)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load job file: {e}")
+        return
+    sites = [Site(config, args) for config in site_configs if not args.site or config["name"] in args.site]
+    if not sites:
+        print(f"❌ No matching sites in {args.config}")
+        return
+
+    metrics.configure(args)
+    rate_limiter.configure(args)
+    http_client.configure(args, max(args.concurrency, h.STATIC_WORKERS))
+    url_set.configure(args)
+
+    print(f"🚀 Running {len(sites)} sites from {args.config}, {args.parallel_sites} at a time")
+    print("=" * 50)
+
+    # Shared by every site: CSS analyses (h.css_cache / the persistent
+    # store) and the set of CDN images already claimed for download
+    shared_images = h.ResultSet()
+    download_slots = threading.BoundedSemaphore(max(1, args.concurrency))  # --concurrency across all sites
+    summaries = {}
+
+    def run(site):
+        try:
+            summaries[site.name] = run_site(site, args, shared_images, download_slots)
+        except Exception as e:
+            print(f"💥 [{site.name}] Site failed: {str(e)[:100]}")
+            summaries[site.name] = {"error": str(e)[:100]}
+
+    h.open_crawl(args)
+    downloader.open_stores(args)
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.parallel_sites), thread_name_prefix="site") as pool:
+            list(pool.map(run, sites))
+    except KeyboardInterrupt:
+        print(f"\n\n⏹ Interrupted by user (partial files will resume next run)")
+    finally:
+        downloader.close_stores()
+        h.close_crawl()
+
+    print(f"\n" + "=" * 50)
+    print(f"🎉 ALL SITES COMPLETED!")
+    for site in sites:
+        summary = summaries.get(site.name, {})
+        if "error" in summary:
+            print(f"   ❌ {site.name}: {summary['error']}")
+        elif summary:
+            print(f"   🌍 {site.name}: {summary['pages']} pages, {summary['urls']} URLs, "
+                  f"✅ {summary.get(downloader.STATUS_DOWNLOADED, 0)} downloaded, "
+                  f"⏭ {summary.get(downloader.STATUS_SKIPPED, 0) + summary.get(downloader.STATUS_UNCHANGED, 0)} up to date, "
+                  f"❌ {summary.get(downloader.STATUS_FAILED, 0)} failed, "
+                  f"🔗 {summary['shared']} shared")
+    http_client.print_stats()
+    metrics.finish(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import time
+import sqlite3
+import threading
+
+
+def conditional_headers(entry):
+    """Request headers that turn a GET into a revalidation of ``entry``."""
+    headers = {}
+    if entry:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+class SQLiteStore:
+    """One SQLite table keyed by URL, opened in WAL mode and safe to share between threads.
+
+    Subclasses name their ``TABLE`` and create it in ``SCHEMA``.
+    """
+
+    TABLE = None
+    SCHEMA = None
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(self.SCHEMA)
+
+    def conditional_headers(self, entry):
+        """Request headers that turn a GET into a revalidation of ``entry``."""
+        return conditional_headers(entry)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.TABLE}").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class LRUStore(SQLiteStore):
+    """SQLiteStore whose entries carry ``fetched_at`` / ``last_used`` times and are evicted by LRU."""
+
+    def __init__(self, path, max_age, max_entries):
+        super().__init__(path)
+        self.max_age = max_age
+        self.max_entries = max_entries
+
+    def touch(self, url):
+        """Mark an entry as just revalidated (the server answered 304)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"UPDATE {self.TABLE} SET fetched_at = ?, last_used = ? WHERE url = ?", (now, now, url)
+            )
+
+    def evict(self):
+        """Drop long-unused entries, then trim to ``max_entries`` by LRU.
+
+        Returns the number of entries removed.
+        """
+        with self._lock:
+            removed = self._db.execute(
+                f"DELETE FROM {self.TABLE} WHERE last_used < ?", (time.time() - self.max_age,)
+            ).rowcount
+            removed += self._db.execute(
+                f"DELETE FROM {self.TABLE} WHERE url IN ("
+                f"SELECT url FROM {self.TABLE} ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            ).rowcount
+        return removed
@@ -0,0 +1,56 @@
+import unittest
+
+import download_scheduler
+from download_scheduler import SizeHint
+
+MB = 1024 * 1024
+
+
+def hint(size, accept_ranges=True, content_type="image/png", source="head"):
+    return SizeHint(size, accept_ranges, None, None, content_type, source)
+
+
+class PlanSegmentsTest(unittest.TestCase):
+    def test_segments_cover_the_file_exactly(self):
+        for size, segments in ((10 * MB, 4), (10 * MB + 3, 4), (9 * MB, 3), (5 * MB + 1, 8)):
+            ranges = download_scheduler.plan_segments(size, segments, MB)
+            self.assertLessEqual(len(ranges), segments)
+            self.assertEqual(ranges[0][0], 0)
+            self.assertEqual(ranges[-1][1], size - 1)
+            for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                self.assertEqual(start, end + 1)
+
+    def test_min_segment_size_limits_the_count(self):
+        self.assertEqual(download_scheduler.plan_segments(3 * MB, 8, MB),
+                         [(0, MB - 1), (MB, 2 * MB - 1), (2 * MB, 3 * MB - 1)])
+        self.assertEqual(download_scheduler.plan_segments(MB // 2, 4, MB), [(0, MB // 2 - 1)])
+
+    def test_content_range_matches(self):
+        matches = download_scheduler.content_range_matches
+        self.assertTrue(matches("bytes 0-99/1000", 0, 99, 1000))
+        self.assertTrue(matches("Bytes 100-199/*", 100, 199, 1000))
+        self.assertFalse(matches("bytes 0-99/999", 0, 99, 1000))
+        self.assertFalse(matches("bytes 0-199/1000", 0, 99, 1000))
+        self.assertFalse(matches(None, 0, 99, 1000))
+
+
+class ScheduleTest(unittest.TestCase):
+    def test_order_by_size_is_stable(self):
+        hints = {"big": hint(10 * MB), "small": hint(10), "tiny": hint(1)}
+        self.assertEqual(download_scheduler.order_by_size(["big", "unknown", "small", "other", "tiny"], hints),
+                         ["tiny", "small", "unknown", "other", "big"])
+
+    def test_should_segment(self):
+        should = download_scheduler.should_segment
+        self.assertTrue(should(hint(16 * MB), threshold=8 * MB))
+        self.assertTrue(should(hint(16 * MB, content_type="application/octet-stream"), threshold=8 * MB))
+        self.assertFalse(should(hint(4 * MB), threshold=8 * MB))
+        self.assertFalse(should(hint(16 * MB, accept_ranges=False), threshold=8 * MB))
+        self.assertFalse(should(hint(16 * MB, content_type="text/html"), threshold=8 * MB))
+        self.assertFalse(should(hint(16 * MB, source="manifest"), threshold=8 * MB))
+        self.assertFalse(should(hint(16 * MB), threshold=8 * MB, segments=1))
+        self.assertFalse(should(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
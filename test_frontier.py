@@ -0,0 +1,149 @@
+import gzip
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import frontier
+from work_queue import KIND_PAGE, TASK_DONE, TASK_LEASED, TASK_PENDING, SQLiteWorkQueue
+
+
+class NormalizePageURLTest(unittest.TestCase):
+    def test_canonical_form(self):
+        self.assertEqual(frontier.normalize_page_url("HTTPS://Example.com:443//blog//post/#comments"),
+                         "https://example.com/blog/post")
+        self.assertEqual(frontier.normalize_page_url("https://example.com/a/../b/./c/"),
+                         "https://example.com/b/c")
+        self.assertEqual(frontier.normalize_page_url("https://example.com"), "https://example.com/")
+
+    def test_query_is_kept_sorted_without_tracking(self):
+        self.assertEqual(frontier.normalize_page_url("https://example.com/blog?page=2&utm_source=x&sort=new&v=3"),
+                         "https://example.com/blog?page=2&sort=new")
+        self.assertNotEqual(frontier.normalize_page_url("https://example.com/blog?page=2"),
+                            frontier.normalize_page_url("https://example.com/blog?page=3"))
+
+    def test_non_http_urls(self):
+        for url in ("mailto:a@example.com", "javascript:void(0)", "ftp://example.com/", "https://example.com:99999/"):
+            self.assertIsNone(frontier.normalize_page_url(url))
+        self.assertIsNone(frontier.origin_of("mailto:a@example.com"))
+
+    def test_origin_and_page_urls(self):
+        self.assertEqual(frontier.origin_of("HTTP://Example.com:80/a?b=1"), "http://example.com")
+        self.assertEqual(frontier.origin_of("https://example.com:8443/a"), "https://example.com:8443")
+        self.assertTrue(frontier.is_page_url("https://example.com/about"))
+        self.assertFalse(frontier.is_page_url("https://example.com/logo.PNG"))
+
+
+class FrontierTest(unittest.TestCase):
+    def test_same_origin_dedup_and_limits(self):
+        pages = frontier.Frontier("https://example.com/", max_depth=1, max_pages=3)
+        self.assertTrue(pages.add("https://example.com/"))
+        self.assertFalse(pages.add("https://EXAMPLE.com/#top"))
+        self.assertFalse(pages.add("https://other.example/"))
+        self.assertFalse(pages.add("https://example.com/style.css"))
+        self.assertFalse(pages.add("https://example.com/deep", depth=2))
+
+        self.assertEqual(pages.add_links(["a", "/b?utm_medium=x", "/b", "c"], "https://example.com/"), 2)
+        self.assertEqual(pages.dropped, 1)
+        self.assertEqual(pages.depths["https://example.com/a"], 1)
+        self.assertEqual((pages.known(), len(pages)), (3, 3))
+
+        batch = pages.take_batch()
+        self.assertEqual([path for _, path, _ in batch], ["/", "/a", "/b"])
+        self.assertEqual((pages.known(), len(pages)), (3, 0))
+        self.assertEqual(pages.add_links(["/d"], "https://example.com/a"), 0)  # Too deep
+
+    def test_allow_filter(self):
+        pages = frontier.Frontier("https://example.com/", allow=lambda url: "/private" not in url)
+        self.assertTrue(pages.add("https://example.com/public"))
+        self.assertFalse(pages.add("https://example.com/private/a"))
+
+
+class QueueFrontierTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = SQLiteWorkQueue(os.path.join(self.tmp.name, "queue.sqlite3"))
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_workers_share_and_retry_pages(self):
+        first = frontier.QueueFrontier(self.queue, "w1", "https://example.com/", batch_size=2)
+        second = frontier.QueueFrontier(self.queue, "w2", "https://example.com/", batch_size=2)
+        for pages in (first, second):  # Every worker seeds the same pages
+            for path in ("/", "/a", "/b"):
+                pages.add("https://example.com" + path)
+        self.assertEqual((first.known(), len(first)), (3, 3))
+
+        batch = first.take_batch()
+        self.assertEqual([url for _, _, url in batch], ["https://example.com/", "https://example.com/a"])
+        self.assertEqual([url for _, _, url in second.take_batch()], ["https://example.com/b"])
+
+        first.complete_batch(failed=[batch[1][0]])
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_DONE: 1, TASK_PENDING: 1, TASK_LEASED: 1})
+        self.assertEqual(len(second), 2)
+        self.assertEqual([url for _, _, url in second.take_batch()], ["https://example.com/a"])
+
+    def test_max_pages(self):
+        pages = frontier.QueueFrontier(self.queue, "w1", "https://example.com/", max_pages=1)
+        self.assertTrue(pages.add("https://example.com/"))
+        self.assertFalse(pages.add("https://example.com/a"))
+        self.assertEqual(pages.dropped, 1)
+
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+
+class SitemapHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        base = f"http://{self.headers['Host']}"
+        if self.path == "/robots.txt":
+            body = f"User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap-index.xml\n".encode()
+        elif self.path == "/sitemap-index.xml":
+            body = (f'<sitemapindex xmlns="{SITEMAP_NS}"><sitemap><loc>{base}/pages.xml.gz</loc></sitemap>'
+                    f'<sitemap><loc>{base}/missing.xml</loc></sitemap></sitemapindex>').encode()
+        elif self.path == "/pages.xml.gz":
+            body = gzip.compress(
+                f'<urlset xmlns="{SITEMAP_NS}"><url><loc> {base}/a </loc></url><url><loc>{base}/b/</loc></url>'
+                f'<url><loc>{base}/private/c</loc></url><url><loc>https://other.example/d</loc></url>'
+                f'</urlset>'.encode())
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SitemapTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), SitemapHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_index_and_gzipped_sitemaps_are_followed(self):
+        urls = list(frontier.iter_sitemap_urls([self.base_url + "sitemap-index.xml"]))
+        self.assertEqual(urls, [self.base_url + "a", self.base_url + "b/", self.base_url + "private/c",
+                                "https://other.example/d"])
+
+    def test_seed_frontier_honours_robots(self):
+        pages = frontier.Frontier(self.base_url, robots=frontier.load_robots(self.base_url))
+        self.assertEqual(frontier.seed_frontier(pages, self.base_url, paths=["/private/x", "/about"]), 4)
+        self.assertEqual([url for _, _, url in pages.take_batch()],
+                         [self.base_url, self.base_url + "about", self.base_url + "a", self.base_url + "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
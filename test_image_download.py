@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import http_client
+import image_download_1 as downloader
+
+SVG = (b'<?xml version="1.0" encoding="UTF-8"?>\n<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+       + b'<rect width="10" height="10" fill="#333"/>' * 80 + b'</svg>\n')
+
+
+class EncodedBodyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = SVG
+        self.send_response(200)
+        self.send_header("Content-Type", "image/svg+xml")
+        if self.path.startswith("/gzip/"):
+            body = gzip.compress(SVG)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class DownloadImageTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), EncodedBodyHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def download(self, path):
+        with tempfile.TemporaryDirectory() as folder:
+            target = os.path.join(folder, "logo.svg")
+            status = downloader.download_image(self.base_url + path, target, http_client.client)
+            with open(target, "rb") as f:
+                return status, f.read()
+
+    def test_gzip_encoded_body_is_saved_decoded(self):
+        status, body = self.download("/gzip/logo.svg")
+        self.assertEqual(status, downloader.STATUS_DOWNLOADED)
+        self.assertEqual(hashlib.sha256(body).hexdigest(), hashlib.sha256(SVG).hexdigest())
+
+    def test_identity_body_is_saved_as_is(self):
+        status, body = self.download("/plain/logo.svg")
+        self.assertEqual(status, downloader.STATUS_DOWNLOADED)
+        self.assertEqual(body, SVG)
+
+
+class HostDispatcherTest(unittest.TestCase):
+    def test_busy_host_does_not_block_other_hosts(self):
+        dispatcher = downloader.HostDispatcher(per_host=1)
+        for n in range(3):
+            dispatcher.put(f"a{n}", "a.example")
+        dispatcher.put("b0", "b.example")
+
+        self.assertEqual(dispatcher.take(), ("a0", "a.example"))
+        # a.example is at its limit: the next worker gets b.example, not a1
+        self.assertEqual(dispatcher.take(), ("b0", "b.example"))
+
+        taken = []
+        worker = threading.Thread(target=lambda: taken.append(dispatcher.take()))
+        worker.start()
+        worker.join(0.2)
+        self.assertTrue(worker.is_alive())  # Waits for a free slot instead of taking a1
+        dispatcher.done("a.example")
+        worker.join(1)
+        self.assertEqual(taken, [("a1", "a.example")])
+
+    def test_close_drains_then_stops(self):
+        dispatcher = downloader.HostDispatcher(per_host=2)
+        dispatcher.put("x", "h")
+        dispatcher.close()
+        self.assertEqual(dispatcher.take(), ("x", "h"))
+        dispatcher.done("h")
+        self.assertIsNone(dispatcher.take())
+
+    def test_put_blocks_at_maxsize(self):
+        dispatcher = downloader.HostDispatcher(per_host=1, maxsize=1)
+        dispatcher.put("x", "h")
+        producer = threading.Thread(target=dispatcher.put, args=("y", "h"))
+        producer.start()
+        producer.join(0.2)
+        self.assertTrue(producer.is_alive())
+        dispatcher.take()
+        producer.join(1)
+        self.assertFalse(producer.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
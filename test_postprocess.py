@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+
+import postprocess
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg" width="1" height="1"/>'
+
+
+class SniffFormatTest(unittest.TestCase):
+    def test_magic_numbers(self):
+        cases = {
+            b"\xff\xd8\xff\xe0\x00\x10JFIF": "jpeg",
+            b"\x89PNG\r\n\x1a\n\x00\x00": "png",
+            b"GIF89a\x01\x00": "gif",
+            b"RIFF\x10\x00\x00\x00WEBPVP8 ": "webp",
+            b"\x00\x00\x00\x1cftypavif\x00\x00": "avif",
+            b"BM\x36\x00": "bmp",
+            b"\x00\x00\x01\x00\x01\x00": "ico",
+            b"II*\x00": None,
+        }
+        for head, fmt in cases.items():
+            self.assertEqual(postprocess.sniff_format(head), fmt, head)
+
+    def test_markup(self):
+        self.assertEqual(postprocess.sniff_format(b"\xef\xbb\xbf\n" + SVG), "svg")
+        self.assertEqual(postprocess.sniff_format(b'<?xml version="1.0"?>\n<!-- logo -->\n' + SVG), "svg")
+        self.assertEqual(postprocess.sniff_format(
+            b'<!DOCTYPE svg PUBLIC "-//W3C//DTD SVG 1.1//EN" [ <!ENTITY a "<x>"> ]>' + SVG), "svg")
+        self.assertEqual(postprocess.sniff_format(b"  <!DOCTYPE html><html><body>404</body></html>"), "html")
+        self.assertEqual(postprocess.sniff_format(b'<?xml version="1.0"?><html xmlns="x"/>'), "html")
+        self.assertIsNone(postprocess.sniff_format(b"<rss/>"))
+
+    def test_skip_xml_prolog(self):
+        self.assertEqual(postprocess.skip_xml_prolog(b"<?xml?> <!-- a --> <svg/>"), b"<svg/>")
+        self.assertEqual(postprocess.skip_xml_prolog(b"<!-- unterminated"), b"")
+        self.assertEqual(postprocess.skip_xml_prolog(b"<!doctype svg [ <!entity a"), b"")
+
+
+class ProcessFileTest(unittest.TestCase):
+    def process(self, name, body):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, name)
+            with open(path, "wb") as f:
+                f.write(body)
+            result = postprocess.process_file(path, name)
+            self.assertEqual(os.listdir(folder), [name])  # Renames are left to the caller
+            return result
+
+    def test_svg_with_wrong_extension_is_renamed(self):
+        result = self.process("logo.png", SVG)
+        self.assertEqual(result["format"], "svg")
+        self.assertEqual(result["result"], postprocess.RESULT_RENAMED)
+        self.assertTrue(result["fixed_path"].endswith("logo.svg"))
+
+    def test_html_error_page_is_rejected(self):
+        result = self.process("photo.jpg", b"<!doctype html><title>Not found</title>")
+        self.assertEqual(result["result"], postprocess.RESULT_REJECTED)
+        self.assertIsNone(result["fixed_path"])
+
+    def test_unknown_format_is_kept(self):
+        result = self.process("scan.tiff", b"II*\x00" + b"\x00" * 64)
+        self.assertEqual(result["result"], postprocess.RESULT_UNVERIFIED)
+        self.assertIsNone(result["fixed_path"])
+
+
+if __name__ == "__main__":
+    unittest.main()
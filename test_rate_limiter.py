@@ -0,0 +1,84 @@
+import time
+import unittest
+from email.utils import formatdate
+
+import rate_limiter
+from rate_limiter import HostLimiter
+
+
+class HostLimiterTest(unittest.TestCase):
+    def test_slow_start_then_additive_increase(self):
+        host = HostLimiter(rate=4.0)
+        self.assertIsNone(host.report(200, 0.05))
+        self.assertAlmostEqual(host.rate, 4.0 * rate_limiter.SLOW_START)
+
+        self.assertEqual(host.report(429, 0.05), "throttled")
+        backed_off = 4.0 * rate_limiter.SLOW_START * rate_limiter.RATE_BACKOFF
+        self.assertAlmostEqual(host.rate, backed_off)
+        self.assertFalse(host.slow_start)
+
+        host.report(200, 0.05)
+        self.assertAlmostEqual(host.rate, backed_off + rate_limiter.RATE_STEP)
+
+    def test_one_backoff_per_latency_window(self):
+        host = HostLimiter(rate=8.0)
+        self.assertEqual(host.report(None, 0.5), "throttled")
+        self.assertIsNone(host.report(503, 0.5))  # Same round-trip: no second halving
+        self.assertAlmostEqual(host.rate, 4.0)
+        host.last_backoff -= 1.0
+        self.assertEqual(host.report(500, 0.5), "throttled")
+        self.assertAlmostEqual(host.rate, 2.0)
+
+    def test_rising_latency_backs_off(self):
+        host = HostLimiter(rate=8.0)
+        host.report(200, 0.1)
+        for _ in range(10):
+            if host.report(200, 2.0) == "slow":
+                break
+        else:
+            self.fail("rising latency never backed off")
+        self.assertLess(host.rate, 8.0)
+
+    def test_rate_stays_within_bounds(self):
+        host = HostLimiter(rate=1.0, max_rate=2.0)
+        for _ in range(20):
+            host.report(200, 0.01)
+        self.assertEqual(host.rate, 2.0)
+        for _ in range(20):
+            host.last_backoff = 0.0
+            host.report(429, None)
+        self.assertEqual(host.rate, rate_limiter.MIN_HOST_RATE)
+
+    def test_retry_after_blocks_the_host(self):
+        host = HostLimiter()
+        host.report(429, 0.01, retry_after=30)
+        self.assertGreater(host.blocked_until - time.monotonic(), 29)
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_hosts_are_keyed_by_normalized_host(self):
+        limiter = rate_limiter.RateLimiter(rate=2.0)
+        limiter.set_host_rate("example.com", rate=1.0)
+        host = limiter.host("https://EXAMPLE.com:443/a.png")
+        self.assertIs(limiter.host("https://example.com/b.png"), host)
+        self.assertEqual(host.rate, 1.0)
+        self.assertIsNot(limiter.host("https://example.com:8443/a.png"), host)
+
+
+class RetryTest(unittest.TestCase):
+    def test_parse_retry_after(self):
+        self.assertEqual(rate_limiter.parse_retry_after(" 12 "), 12.0)
+        self.assertEqual(rate_limiter.parse_retry_after("100000"), rate_limiter.MAX_RETRY_AFTER)
+        self.assertEqual(rate_limiter.parse_retry_after(formatdate(time.time() - 60, usegmt=True)), 0.0)
+        self.assertAlmostEqual(rate_limiter.parse_retry_after(formatdate(time.time() + 60, usegmt=True)), 60, delta=2)
+        for value in (None, "", "soon", "-5"):
+            self.assertIsNone(rate_limiter.parse_retry_after(value))
+
+    def test_backoff_delay_is_capped(self):
+        for attempt in range(1, 12):
+            delay = rate_limiter.backoff_delay(attempt)
+            self.assertTrue(0 <= delay <= min(rate_limiter.RETRY_MAX, rate_limiter.RETRY_BASE * 2 ** attempt))
+
+
+if __name__ == "__main__":
+    unittest.main()
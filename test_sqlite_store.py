@@ -0,0 +1,80 @@
+import os
+import tempfile
+import unittest
+
+import page_cache
+from css_store import CSSCache
+from sqlite_store import conditional_headers
+
+
+class LRUStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = CSSCache(os.path.join(self.tmp.name, "css.sqlite3"), ttl=60, max_age=3600, max_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def age(self, url, seconds):
+        self.cache._db.execute("UPDATE css_entries SET fetched_at = fetched_at - ?, last_used = last_used - ? "
+                               "WHERE url = ?", (seconds, seconds, url))
+
+    def test_round_trip_and_freshness(self):
+        self.cache.put("a.css", ["x.png"], imports=["b.css"], etag='"1"', content_hash="h")
+        entry = self.cache.get("a.css")
+        self.assertEqual((entry["image_urls"], entry["imports"], entry["etag"]), (["x.png"], ["b.css"], '"1"'))
+        self.assertTrue(self.cache.is_fresh(entry))
+        self.age("a.css", 120)
+        self.assertFalse(self.cache.is_fresh(self.cache.get("a.css")))
+        self.cache.touch("a.css")
+        self.assertTrue(self.cache.is_fresh(self.cache.get("a.css")))
+        self.assertIsNone(self.cache.get("missing.css"))
+
+    def test_evict_by_age_then_lru(self):
+        for n, url in enumerate(("old.css", "a.css", "b.css", "c.css")):
+            self.cache.put(url, [])
+            self.age(url, 10 - n)
+        self.age("old.css", 7200)
+        self.cache.get("a.css")  # Used last: survives the LRU trim
+        self.assertEqual(self.cache.evict(), 2)
+        self.assertEqual(len(self.cache), 2)
+        self.assertIsNotNone(self.cache.get("a.css"))
+        self.assertIsNotNone(self.cache.get("c.css"))
+
+    def test_conditional_headers(self):
+        self.assertEqual(conditional_headers(None), {})
+        self.cache.put("a.css", [], etag='"1"', last_modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(self.cache.conditional_headers(self.cache.get("a.css")),
+                         {"If-None-Match": '"1"', "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT"})
+
+
+class PageCacheTest(unittest.TestCase):
+    def test_mode_covers(self):
+        self.assertTrue(page_cache.mode_covers("capture", "browser"))
+        self.assertTrue(page_cache.mode_covers("browser", "browser"))
+        self.assertFalse(page_cache.mode_covers("static", "browser"))
+        self.assertFalse(page_cache.mode_covers("browser", "capture"))
+        self.assertFalse(page_cache.mode_covers(None, "static"))
+
+    def test_fingerprint_ignores_volatile_markup(self):
+        page = ('<html><head><meta name="csrf-token" content="{}"><script nonce="{}"></script></head>\n'
+                '  <body>\n    <input type="hidden" name="_token" value="{}"><p>Hi</p>\n  </body>\n</html>')
+        first = page_cache.html_fingerprint(page.format("a1", "n1", "a1"))
+        self.assertEqual(first, page_cache.html_fingerprint(page.format("b2", "n2", "b2").replace("\n  ", "")))
+        self.assertNotEqual(first, page_cache.html_fingerprint(page.format("a1", "n1", "a1").replace("Hi", "Bye")))
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = page_cache.PageCache(os.path.join(directory, "pages.sqlite3"))
+            try:
+                cache.put("https://example.com/", ["a.png"], stylesheets=["s.css"], links=["/b"], mode="static")
+                entry = cache.get("https://example.com/")
+                self.assertEqual((entry["image_urls"], entry["stylesheets"], entry["links"], entry["mode"]),
+                                 (["a.png"], ["s.css"], ["/b"], "static"))
+            finally:
+                cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import url_extractor
+
+BASE = "https://example.com/css/"
+
+
+def images(css):
+    return [raw for kind, raw, _ in url_extractor.scan_css(css, BASE) if kind == url_extractor.KIND_IMAGE]
+
+
+class ImageSetTest(unittest.TestCase):
+    def test_type_does_not_hide_the_next_candidate(self):
+        css = 'a{background:image-set(url(a.avif) type("image/avif"), url(b.jpg) type("image/jpeg"))}'
+        self.assertEqual(images(css), ["a.avif", "b.jpg"])
+
+    def test_type_is_never_taken_for_an_image(self):
+        self.assertEqual(images('a{background:image-set("a.png" type("image/png.png"))}'), ["a.png"])
+
+    def test_multiple_candidates_with_resolutions(self):
+        css = 'a{background:-webkit-image-set(url(a.png) 1x, url("b.png") 2x, url(\'c.png\') 3x)}'
+        self.assertEqual(images(css), ["a.png", "b.png", "c.png"])
+
+    def test_bare_string_candidates(self):
+        self.assertEqual(images('a{background:image-set("a.png" 1x, \'b.webp\' 2x)}'), ["a.png", "b.webp"])
+
+    def test_mixed_url_and_string_candidates(self):
+        css = 'a{background:image-set(url("x,1.png") 1x type("image/png"), type("image/webp") "y.webp")}'
+        self.assertEqual(images(css), ["x,1.png", "y.webp"])
+
+    def test_computed_style_value(self):
+        # How Chrome serializes a computed backgroundImage
+        value = ('image-set(url("https://example.com/a.avif") 1x type("image/avif"), '
+                 'url("https://example.com/a.jpg") 1x type("image/jpeg"))')
+        self.assertEqual(images(value), ["https://example.com/a.avif", "https://example.com/a.jpg"])
+
+
+class ScanCSSTest(unittest.TestCase):
+    def test_imports_and_urls(self):
+        css = '@import url("theme.css"); @import "print.css"; .x{background:url(../img/bg.png)}'
+        found = list(url_extractor.scan_css(css, BASE))
+        self.assertEqual(found, [
+            (url_extractor.KIND_IMPORT, "theme.css", "https://example.com/css/theme.css"),
+            (url_extractor.KIND_IMPORT, "print.css", "https://example.com/css/print.css"),
+            (url_extractor.KIND_IMAGE, "../img/bg.png", "https://example.com/img/bg.png"),
+        ])
+
+    def test_data_uris_and_non_images_are_skipped(self):
+        self.assertEqual(images('.a{background:url(data:image/png;base64,AAAA)} .b{src:url(font.woff2)}'), [])
+
+    def test_token_split_across_chunks(self):
+        chunks = [".a{background:url(../img/o", "ne.png)} .b{background:url(two.png)}"]
+        found = [raw for _, raw, _ in url_extractor.scan_css_chunks(chunks, BASE)]
+        self.assertEqual(found, ["../img/one.png", "two.png"])
+
+
+class HelpersTest(unittest.TestCase):
+    def test_has_image_extension(self):
+        self.assertTrue(url_extractor.has_image_extension("https://example.com/a/logo.PNG?v=2#x"))
+        self.assertFalse(url_extractor.has_image_extension("https://cdn.example.png"))
+        self.assertFalse(url_extractor.has_image_extension("https://example.com/page.html"))
+
+    def test_srcset(self):
+        value = "a.png 1x, b,c.png 2x,d.png 480w"
+        self.assertEqual(list(url_extractor.iter_srcset(value)), ["a.png", "b,c.png", "d.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
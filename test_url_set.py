@@ -0,0 +1,93 @@
+import threading
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import url_set
+
+
+class URLNormalizerTest(unittest.TestCase):
+    def setUp(self):
+        self.normalizer = url_set.URLNormalizer()
+
+    def test_scheme_host_port_and_fragment(self):
+        self.assertEqual(self.normalizer.normalize(" HTTPS://Example.COM:443/a.png#top "),
+                         "https://example.com/a.png")
+        self.assertEqual(self.normalizer.normalize("http://example.com:8080/a.png"),
+                         "http://example.com:8080/a.png")
+        self.assertEqual(self.normalizer.normalize("https://example.com"), "https://example.com/")
+
+    def test_dot_segments_and_percent_encoding(self):
+        self.assertEqual(self.normalizer.normalize("https://example.com/a/./b/../%7euser/%2f x.png"),
+                         "https://example.com/a/~user/%2F%20x.png")
+
+    def test_cache_busters_are_dropped(self):
+        self.assertEqual(self.normalizer.normalize("https://example.com/a.png?v=3&w=200&_=1699999&TS=1"),
+                         "https://example.com/a.png?w=200")
+
+    def test_sorted_query(self):
+        normalizer = url_set.URLNormalizer(sort_query=True)
+        self.assertEqual(normalizer.normalize("https://example.com/a.png?w=2&h=1"),
+                         "https://example.com/a.png?h=1&w=2")
+        self.assertEqual(self.normalizer.normalize("https://example.com/a.png?w=2&h=1"),
+                         "https://example.com/a.png?w=2&h=1")
+
+    def test_other_urls_are_left_alone(self):
+        for url in ("data:image/png;base64,AAAA", "https://example.com:99999/a.png", "/relative.png"):
+            self.assertEqual(self.normalizer.normalize(url), url)
+        disabled = url_set.URLNormalizer(enabled=False)
+        self.assertEqual(disabled.normalize("HTTPS://Example.com/a.png?v=1"), "HTTPS://Example.com/a.png?v=1")
+
+
+class HostOfTest(unittest.TestCase):
+    def test_host_forms(self):
+        self.assertEqual(url_set.host_of("https://Example.com:443/a"), "example.com")
+        self.assertEqual(url_set.host_of("http://example.com:8080/a"), "example.com:8080")
+        self.assertEqual(url_set.host_of("https://[::1]:443/a"), "[::1]")
+        self.assertEqual(url_set.host_of("https://example.com:99999/a"), "example.com:99999")
+
+
+class URLSetTest(unittest.TestCase):
+    def check_set(self, urls):
+        self.assertTrue(urls.add("https://example.com/b.png"))
+        self.assertTrue(urls.add("https://example.com/a.png"))
+        self.assertFalse(urls.add("https://example.com/b.png"))
+        self.assertTrue(urls.add("https://example.com/c.png"))
+        self.assertEqual(len(urls), 3)
+        self.assertEqual(list(urls.iter_sorted(threading.Lock())), [
+            "https://example.com/a.png", "https://example.com/b.png", "https://example.com/c.png"])
+
+    def test_compact_set(self):
+        urls = url_set.CompactURLSet()
+        try:
+            self.check_set(urls)
+        finally:
+            urls.close()
+
+    def test_compact_set_merges_runs(self):
+        urls = url_set.CompactURLSet()
+        try:
+            for n in (5, 3, 9, 1, 7, 2):
+                urls.add(f"https://example.com/{n}.png")
+            with patch.object(url_set, "SORT_RUN_SIZE", 2):
+                runs = urls.sorted_runs()
+                self.assertEqual(len(runs), 3)
+                for run in runs:
+                    run.close()
+                self.assertTrue(urls.add("https://example.com/0.png"))  # Adding still works after a sort
+                self.assertEqual([url[20] for url in urls.iter_sorted(threading.Lock())],
+                                 ["0", "1", "2", "3", "5", "7", "9"])
+        finally:
+            urls.close()
+
+    def test_disk_set(self):
+        with tempfile.TemporaryDirectory() as directory:
+            urls = url_set.DiskURLSet(directory)
+            try:
+                self.check_set(urls)
+            finally:
+                urls.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import tempfile
+import unittest
+
+import work_queue
+from work_queue import KIND_DOWNLOAD, KIND_PAGE, TASK_FAILED, TASK_LEASED, TASK_PENDING
+
+
+class SQLiteWorkQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.queue = work_queue.SQLiteWorkQueue(os.path.join(self.tmp.name, "queue.sqlite3"), max_attempts=2)
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def test_enqueue_is_idempotent_per_kind(self):
+        self.assertTrue(self.queue.enqueue(KIND_PAGE, "https://example.com/a", {"depth": 1}))
+        self.assertFalse(self.queue.enqueue(KIND_PAGE, "https://example.com/a", {"depth": 2}))
+        self.assertTrue(self.queue.enqueue(KIND_DOWNLOAD, "https://example.com/a"))
+        [task] = self.queue.claim(KIND_PAGE, "w1")
+        self.assertEqual(task.payload, {"depth": 1})
+        self.assertEqual(task.attempts, 1)
+
+    def test_a_leased_task_is_not_claimed_twice(self):
+        self.queue.enqueue(KIND_PAGE, "a")
+        self.assertEqual(len(self.queue.claim(KIND_PAGE, "w1")), 1)
+        self.assertEqual(self.queue.claim(KIND_PAGE, "w2"), [])
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_LEASED: 1})
+
+    def test_expired_lease_goes_to_another_worker(self):
+        self.queue.enqueue(KIND_PAGE, "a")
+        [first] = self.queue.claim(KIND_PAGE, "w1", lease=-1)
+        [second] = self.queue.claim(KIND_PAGE, "w2")
+        self.assertEqual(second.id, first.id)
+        self.assertEqual(second.attempts, 2)
+        # The worker presumed dead can no longer extend or fail it
+        self.assertEqual(self.queue.heartbeat([first.id], "w1"), 0)
+        self.queue.fail(first.id, "w1")
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_LEASED: 1})
+
+    def test_lease_expiring_max_attempts_times_fails_the_task(self):
+        self.queue.enqueue(KIND_PAGE, "a")
+        self.queue.claim(KIND_PAGE, "w1", lease=-1)
+        self.queue.claim(KIND_PAGE, "w2", lease=-1)
+        self.assertEqual(self.queue.claim(KIND_PAGE, "w3"), [])
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_FAILED: 1})
+
+    def test_fail_requeues_until_max_attempts(self):
+        self.queue.enqueue(KIND_PAGE, "a")
+        [task] = self.queue.claim(KIND_PAGE, "w1")
+        self.queue.fail(task.id, "w1", "timeout")
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_PENDING: 1})
+        [task] = self.queue.claim(KIND_PAGE, "w1")
+        self.queue.fail(task.id, "w1", "timeout")
+        self.assertEqual(self.queue.counts(KIND_PAGE), {TASK_FAILED: 1})
+        self.assertTrue(self.queue.finished(KIND_PAGE))
+
+    def test_complete_is_idempotent(self):
+        self.queue.enqueue(KIND_DOWNLOAD, "a")
+        [task] = self.queue.claim(KIND_DOWNLOAD, "w1", lease=-1)
+        self.assertTrue(self.queue.complete(task.id, "w1", "downloaded"))
+        self.assertFalse(self.queue.complete(task.id, "w2", "skipped"))
+        self.assertEqual(self.queue.results(KIND_DOWNLOAD), {"downloaded": 1})
+        self.assertEqual(self.queue.claim(KIND_DOWNLOAD, "w2"), [])
+        self.assertEqual(self.queue.active(KIND_DOWNLOAD), 0)
+
+    def test_lock_is_held_only_by_a_live_lease(self):
+        for key in ("a", "b"):
+            self.queue.enqueue(KIND_DOWNLOAD, key)
+        first, second = self.queue.claim(KIND_DOWNLOAD, "w1", limit=2)
+        self.assertTrue(self.queue.lock("host", first.id))
+        self.assertTrue(self.queue.lock("host", first.id))
+        self.assertFalse(self.queue.lock("host", second.id))
+        self.queue.unlock("host", first.id)
+        self.assertTrue(self.queue.lock("host", second.id))
+
+        self.queue.enqueue(KIND_DOWNLOAD, "c")
+        [third] = self.queue.claim(KIND_DOWNLOAD, "w2", lease=-1)
+        self.assertTrue(self.queue.lock("other", third.id))
+        self.assertTrue(self.queue.lock("other", second.id))  # The expired lease lost the lock
+
+    def test_finished_and_reset(self):
+        self.assertFalse(self.queue.finished(KIND_PAGE))
+        self.queue.enqueue(KIND_PAGE, "a")
+        self.queue.enqueue(KIND_DOWNLOAD, "b")
+        [task] = self.queue.claim(KIND_PAGE, "w1")
+        self.assertFalse(self.queue.finished(KIND_PAGE))
+        self.queue.complete(task.id, "w1")
+        self.assertTrue(self.queue.finished(KIND_PAGE))
+        self.assertFalse(self.queue.finished(KIND_DOWNLOAD))
+
+        self.queue.reset()
+        self.assertEqual(self.queue.counts(KIND_PAGE), {})
+        self.assertTrue(self.queue.enqueue(KIND_PAGE, "a"))
+
+    def test_keys_are_sorted(self):
+        for key in ("c", "a", "b"):
+            self.queue.enqueue(KIND_PAGE, key)
+        self.assertEqual(list(self.queue.keys(KIND_PAGE)), ["a", "b", "c"])
+
+
+class OpenWorkQueueTest(unittest.TestCase):
+    def test_unknown_scheme(self):
+        with self.assertRaises(ValueError):
+            work_queue.open_work_queue("redis://localhost/0")
+
+    def test_sqlite_locations(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "q.sqlite3")
+            for location in (path, "sqlite:///" + path):  # sqlite:////absolute/path
+                queue = work_queue.open_work_queue(location)
+                self.assertIsInstance(queue, work_queue.SQLiteWorkQueue)
+                self.assertEqual(queue.path, path)
+                queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
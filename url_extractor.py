@@ -0,0 +1,198 @@
+import re
+from urllib.parse import urljoin
+
+# Valid image extensions
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".avif", ".bmp", ".ico")
+
+# One pass over CSS text finds every reference we care about. Alternatives
+# are tried left to right, so "@import url(x.css)" is reported as an
+# import rather than as a url() candidate.
+CSS_TOKEN_RE = re.compile(
+    r"""
+      @import\s+(?:url\s*\(\s*)?["']?(?P<import>[^"')\s;]+)
+    | (?:-webkit-)?image-set\s*\((?P<imageset>(?:[^()]|\([^()]*\))*)\)
+    | url\s*\(\s*["']?(?P<url>[^"')\s]+)["']?\s*\)
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Tokens of one image-set() candidate: its image (url(...) or a bare string),
+# and the type(...) and resolution that may follow it
+IMAGE_SET_TOKEN_RE = re.compile(
+    r"""
+      (?P<type>type\s*\((?:[^()"']|"[^"]*"|'[^']*')*\))
+    | url\s*\(\s*(?P<quote>["']?)(?P<url>.*?)(?P=quote)\s*\)
+    | (?P<string>"[^"]*"|'[^']*')
+    | [^\s"'(]+
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Kinds of references yielded by scan_css()
+KIND_IMAGE = "image"
+KIND_IMPORT = "import"
+
+# Streaming: text after the last rule/declaration end is carried over to
+# the next chunk; past this size it is scanned anyway to bound memory
+MAX_CARRY = 1024 * 1024
+
+
+def has_image_extension(url):
+    """True if a URL's path ends with a known image extension.
+
+    Cheaper than a full urlparse(): only the query/fragment is cut off.
+    """
+    if not url:
+        return False
+
+    end = len(url)
+    for sep in "?#":
+        i = url.find(sep, 0, end)
+        if i != -1:
+            end = i
+
+    # "https://cdn.example.png" has no path at all
+    scheme = url.find("://", 0, end)
+    if scheme != -1 and url.find("/", scheme + 3, end) == -1:
+        return False
+
+    return url[:end].lower().endswith(IMAGE_EXTENSIONS)
+
+
+def resolve(raw, base_url):
+    """Resolve a reference against ``base_url``; None for data: URIs and blanks."""
+    raw = raw.strip()
+    if not raw or raw[:5].lower() == "data:":
+        return None
+    if raw.startswith(("https://", "http://")):
+        return raw
+    return urljoin(base_url, raw)
+
+
+def iter_image_candidates(values, base_url):
+    """Yield (raw, resolved) for raw attribute values that point at images."""
+    for raw in values:
+        if raw:
+            resolved = resolve(raw, base_url)
+            if resolved and has_image_extension(resolved):
+                yield raw, resolved
+
+
+def iter_srcset(value):
+    """Yield the URLs of a srcset attribute, following the HTML parsing rules."""
+    i, n = 0, len(value)
+    while i < n:
+        while i < n and (value[i].isspace() or value[i] == ","):
+            i += 1
+        start = i
+        while i < n and not value[i].isspace():
+            i += 1
+        url = value[start:i]
+        if url.endswith(","):
+            url = url.rstrip(",")
+        else:
+            # Skip the width/density descriptors up to the next candidate
+            while i < n and value[i] != ",":
+                i += 1
+        if url:
+            yield url
+
+
+def split_top_level(value, sep=","):
+    """Split on ``sep`` outside parentheses and quoted strings."""
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(value):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "\"'":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth = max(0, depth - 1)
+        elif char == sep and depth == 0:
+            parts.append(value[start:i])
+            start = i + 1
+    parts.append(value[start:])
+    return parts
+
+
+def iter_image_set(argument):
+    """Yield the raw image reference of each candidate of an image-set() argument.
+
+    A candidate is url(...) or a bare string, optionally followed by a
+    resolution and a type("image/...") that is never taken for an image.
+    """
+    for candidate in split_top_level(argument):
+        for token in IMAGE_SET_TOKEN_RE.finditer(candidate):
+            if token.group("url") is not None:
+                yield token.group("url").strip()
+                break
+            if token.group("string") is not None:
+                yield token.group("string")[1:-1].strip()
+                break
+
+
+def scan_css(text, base_url):
+    """Yield (kind, raw, resolved) for every image and @import in a CSS text.
+
+    ``kind`` is KIND_IMAGE or KIND_IMPORT. Images are already filtered by
+    extension; imports are the stylesheets to analyze next.
+    """
+    for match in CSS_TOKEN_RE.finditer(text):
+        raw = match.group("url")
+        if raw is not None:
+            resolved = resolve(raw, base_url)
+            if resolved and has_image_extension(resolved):
+                yield KIND_IMAGE, raw, resolved
+            continue
+
+        raw = match.group("import")
+        if raw is not None:
+            resolved = resolve(raw, base_url)
+            if resolved:
+                yield KIND_IMPORT, raw, resolved
+            continue
+
+        for raw in iter_image_set(match.group("imageset")):
+            resolved = resolve(raw, base_url)
+            if resolved and has_image_extension(resolved):
+                yield KIND_IMAGE, raw, resolved
+
+
+def iter_css_urls(text, base_url):
+    """Yield (raw, resolved) for every image referenced by a CSS text."""
+    for kind, raw, resolved in scan_css(text, base_url):
+        if kind == KIND_IMAGE:
+            yield raw, resolved
+
+
+def scan_css_chunks(chunks, base_url):
+    """Like scan_css(), over an iterable of text chunks (e.g. a streamed body).
+
+    Each chunk is scanned up to its last "}" (or ";"), and the remainder is
+    carried into the next one, so a url( token split across two chunks is
+    still seen whole.
+    """
+    carry = ""
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buffer = carry + chunk
+        cut = buffer.rfind("}")
+        if cut == -1:
+            cut = buffer.rfind(";")
+        if cut == -1 and len(buffer) < MAX_CARRY:
+            carry = buffer
+            continue
+        if cut == -1:
+            cut = len(buffer) - 1
+        yield from scan_css(buffer[:cut + 1], base_url)
+        carry = buffer[cut + 1:]
+
+    if carry:
+        yield from scan_css(carry, base_url)
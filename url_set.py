@@ -0,0 +1,277 @@
+import os
+import re
+import heapq
+import sqlite3
+import hashlib
+import weakref
+import tempfile
+from itertools import islice
+from urllib.parse import quote, unquote_plus, urlsplit, urlunsplit
+
+# Configuration
+# Query parameters that only bust caches: ?v=3 and ?_=1699999 name the same image
+CACHE_BUSTER_PARAMS = ("v", "ver", "version", "_", "t", "ts", "timestamp", "cb", "cachebuster",
+                       "nocache", "rand")
+SORT_RUN_SIZE = 100_000  # URLs sorted in memory at a time when writing the sorted list
+DISK_PAGE_SIZE = 1000    # URLs read per query when streaming an on-disk set
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+PERCENT_RE = re.compile(r"%([0-9A-Fa-f]{2})")
+PATH_SAFE = "/:@!$&'()*+,;=-._~%"
+QUERY_SAFE = PATH_SAFE + "?"
+
+
+def normalize_percent(component, safe):
+    """Decode escapes of unreserved characters, upper-case the rest, and escape what must be."""
+    def fix(match):
+        char = chr(int(match.group(1), 16))
+        return char if char in UNRESERVED else "%" + match.group(1).upper()
+    return quote(PERCENT_RE.sub(fix, component), safe=safe)
+
+
+def remove_dot_segments(path):
+    """Resolve "." and ".." path segments (RFC 3986, section 5.2.4)."""
+    if "." not in path:
+        return path
+    output = []
+    for segment in path.split("/"):
+        if segment == "..":
+            if len(output) > 1:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    result = "/".join(output)
+    if path.endswith(("/.", "/..")):
+        result += "/"
+    return result
+
+
+def normalize_netloc(parts):
+    """Netloc of a SplitResult with the host lower-cased and the scheme's default port dropped.
+
+    None if it is not an http(s) URL with a host. Raises ValueError for
+    an invalid port, like SplitResult.port.
+    """
+    scheme = parts.scheme.lower()
+    port = parts.port
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return None
+
+    netloc = parts.hostname  # Already lower-case
+    if ":" in netloc:
+        netloc = f"[{netloc}]"  # IPv6 literal
+    if parts.username is not None:
+        netloc = parts.netloc.rpartition("@")[0] + "@" + netloc
+    if port and port != DEFAULT_PORTS[scheme]:
+        netloc = f"{netloc}:{port}"
+    return netloc
+
+
+def host_of(url):
+    """The host a URL is fetched from, in the form URLNormalizer writes it (e.g. for per-host limits)."""
+    try:
+        parts = urlsplit(url.strip())
+        return normalize_netloc(parts) or parts.netloc
+    except ValueError:
+        return urlsplit(url.strip()).netloc
+
+
+class URLNormalizer:
+    """Rewrites trivially different URLs of one image to a single canonical form.
+
+    Lower-cases the scheme and host, drops default ports and the fragment,
+    resolves dot segments, normalizes percent-encoding and removes
+    cache-buster query parameters (``drop_params``, matched
+    case-insensitively). With ``sort_query`` the remaining parameters are
+    put in a fixed order too.
+    """
+
+    def __init__(self, drop_params=CACHE_BUSTER_PARAMS, sort_query=False, enabled=True):
+        self.drop_params = frozenset(name.lower() for name in drop_params)
+        self.sort_query = sort_query
+        self.enabled = enabled
+
+    def normalize_query(self, query):
+        params = []
+        for param in query.split("&"):
+            if not param:
+                continue
+            name = unquote_plus(param.split("=", 1)[0]).lower()
+            if name not in self.drop_params:
+                params.append(normalize_percent(param, QUERY_SAFE))
+        if self.sort_query:
+            params.sort()
+        return "&".join(params)
+
+    def normalize(self, url):
+        url = url.strip()
+        if not self.enabled:
+            return url
+        try:
+            parts = urlsplit(url)
+            netloc = normalize_netloc(parts)
+        except ValueError:
+            return url
+        if netloc is None:
+            return url
+
+        scheme = parts.scheme.lower()
+        path = normalize_percent(remove_dot_segments(parts.path) or "/", PATH_SAFE)
+        return urlunsplit((scheme, netloc, path, self.normalize_query(parts.query), ""))
+
+
+def url_key(url):
+    """64-bit hash standing in for a URL in the in-memory set.
+
+    The chance of two different URLs colliding is about n**2 / 2**65:
+    under one in a million even for ten million URLs.
+    """
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class CompactURLSet:
+    """Set of URLs that keeps only a 64-bit hash per URL in memory.
+
+    The URLs themselves are appended to an anonymous temporary file and
+    read back by iter_sorted(), which merges sorted runs of
+    SORT_RUN_SIZE, so the sorted list is never built in memory.
+    Callers serialize access with ``lock`` (ResultSet does).
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.spool = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+
+    def add(self, url):
+        key = url_key(url)
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        self.spool.write(url + "\n")
+        return True
+
+    def __len__(self):
+        return len(self.keys)
+
+    def iter_sorted(self, lock):
+        """Yield the URLs in sorted order; ``lock`` is held only while the runs are cut."""
+        with lock:
+            runs = self.sorted_runs()
+        try:
+            if len(runs) == 1 and isinstance(runs[0], list):
+                for line in runs[0]:
+                    yield line[:-1]
+            else:
+                for line in heapq.merge(*runs):
+                    yield line[:-1]
+        finally:
+            for run in runs:
+                if not isinstance(run, list):
+                    run.close()
+
+    def sorted_runs(self, run_size=None):
+        """Sort the spooled URLs into runs: one list if they all fit, else temporary files."""
+        run_size = run_size or SORT_RUN_SIZE
+        self.spool.seek(0)
+        runs = []
+        try:
+            while True:
+                lines = list(islice(self.spool, run_size))
+                if not lines:
+                    break
+                lines.sort()
+                if not runs and len(lines) < run_size:
+                    return [lines]  # Everything fit in a single run
+                run = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+                run.writelines(lines)
+                run.seek(0)
+                runs.append(run)
+        finally:
+            self.spool.seek(0, os.SEEK_END)  # Further adds append again
+        return runs
+
+    def close(self):
+        self.spool.close()
+
+
+class DiskURLSet:
+    """Set of URLs in a temporary SQLite file, for crawls too large for memory.
+
+    Sorted output comes straight from the primary-key index, a page of
+    DISK_PAGE_SIZE URLs at a time. Callers serialize access with
+    ``lock`` (ResultSet does).
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="urls-", suffix=".sqlite3", dir=directory)
+        os.close(fd)
+        self.count = 0
+        self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=OFF")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute("CREATE TABLE urls (url TEXT PRIMARY KEY) WITHOUT ROWID")
+        # The file is scratch space: remove it when the set goes away, at the latest at exit
+        self._finalizer = weakref.finalize(self, remove_database, self._db, self.path)
+
+    def add(self, url):
+        if self._db.execute("INSERT OR IGNORE INTO urls (url) VALUES (?)", (url,)).rowcount:
+            self.count += 1
+            return True
+        return False
+
+    def __len__(self):
+        return self.count
+
+    def iter_sorted(self, lock):
+        """Yield the URLs in sorted order; ``lock`` is held while each page is read."""
+        last = ""
+        while True:
+            with lock:
+                page = [url for (url,) in self._db.execute(
+                    "SELECT url FROM urls WHERE url > ? ORDER BY url LIMIT ?", (last, DISK_PAGE_SIZE))]
+            yield from page
+            if len(page) < DISK_PAGE_SIZE:
+                return
+            last = page[-1]
+
+    def close(self):
+        self._finalizer()
+
+
+def remove_database(db, path):
+    db.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Normalizer and storage shared by every ResultSet (set from the command line)
+normalizer = URLNormalizer()
+URL_SET_DIR = None  # Keep result sets in SQLite files under this folder instead of memory
+
+
+def add_arguments(parser):
+    """Add the URL normalization / storage options to a script's parser."""
+    parser.add_argument('--drop-param', action='append', default=[], metavar='NAME',
+                        help="also treat this query parameter as a cache-buster (repeatable)")
+    parser.add_argument('--keep-param', action='append', default=[], metavar='NAME',
+                        help=f"keep a default cache-buster parameter (repeatable; defaults: "
+                             f"{', '.join(CACHE_BUSTER_PARAMS)})")
+    parser.add_argument('--sort-query', action='store_true',
+                        help="treat URLs whose query parameters only differ in order as one")
+    parser.add_argument('--no-normalize', action='store_true',
+                        help="deduplicate image URLs exactly as found")
+    parser.add_argument('--url-set-dir', metavar='DIR',
+                        help="keep collected URLs in SQLite files under DIR instead of memory")
+
+
+def configure(args):
+    """Apply parsed normalization / storage options."""
+    global normalizer, URL_SET_DIR
+    keep = {name.lower() for name in args.keep_param}
+    drop = [name for name in CACHE_BUSTER_PARAMS if name not in keep] + args.drop_param
+    normalizer = URLNormalizer(drop, args.sort_query, enabled=not args.no_normalize)
+    URL_SET_DIR = args.url_set_dir
@@ -0,0 +1,348 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import namedtuple
+
+# Configuration
+WORK_QUEUE_FILE = ".work_queue.sqlite3"
+LEASE_SECONDS = 120     # A claimed task goes back to the queue if its worker is silent this long...
+MAX_ATTEMPTS = 3        # ...at most this many times, then it is marked failed
+CLAIM_BATCH = 16        # Pages a crawler claims at once
+POLL_SECONDS = 2.0      # Wait between claims while only other workers' tasks are left
+BUSY_TIMEOUT = 30       # Seconds to wait for another process's write lock
+
+# Kinds of task
+KIND_PAGE = "page"          # key: page URL, payload: {"depth": n}
+KIND_DOWNLOAD = "download"  # key: image URL
+
+# Task states
+TASK_PENDING = "pending"
+TASK_LEASED = "leased"
+TASK_DONE = "done"
+TASK_FAILED = "failed"
+
+Task = namedtuple("Task", "id kind key payload attempts")
+
+
+class WorkQueue(ABC):
+    """Interface of a work-queue backend shared by crawler and downloader processes.
+
+    Tasks are unique per (kind, key), so every worker may enqueue the
+    same seeds. claim() leases tasks to one worker for ``lease`` seconds;
+    heartbeat() extends the leases while the work is in progress. A task
+    whose lease runs out is handed to another worker, so the crash of
+    one worker loses nothing. complete() is idempotent: the first call
+    wins and any later one (e.g. from a worker presumed dead) is ignored.
+    """
+
+    @abstractmethod
+    def enqueue(self, kind, key, payload=None):
+        """Add a task unless it is already known; return True if it was new."""
+
+    @abstractmethod
+    def claim(self, kind, worker_id, limit=1, lease=LEASE_SECONDS):
+        """Lease up to ``limit`` pending (or abandoned) tasks; return them as Task tuples."""
+
+    @abstractmethod
+    def heartbeat(self, task_ids, worker_id, lease=LEASE_SECONDS):
+        """Extend the leases ``worker_id`` holds on ``task_ids``; return how many it still holds."""
+
+    @abstractmethod
+    def complete(self, task_id, worker_id, result=None):
+        """Mark a task done with ``result``; return False if it was already done."""
+
+    @abstractmethod
+    def fail(self, task_id, worker_id, error=None):
+        """Give a task back for a retry, or mark it failed after MAX_ATTEMPTS."""
+
+    @abstractmethod
+    def lock(self, name, task_id):
+        """Take the lock ``name`` for a leased task; return False while another live task holds it.
+
+        The lock lasts as long as the task's lease, so a crashed worker
+        cannot keep it.
+        """
+
+    @abstractmethod
+    def unlock(self, name, task_id):
+        """Release the lock ``name`` if ``task_id`` holds it."""
+
+    @abstractmethod
+    def active(self, kind):
+        """Tasks of ``kind`` still pending or leased."""
+
+    @abstractmethod
+    def counts(self, kind):
+        """{state: tasks} for ``kind``."""
+
+    @abstractmethod
+    def results(self, kind):
+        """{result: tasks} over the completed tasks of ``kind``, across all workers."""
+
+    @abstractmethod
+    def keys(self, kind):
+        """Yield the keys of every task of ``kind`` in sorted order."""
+
+    @abstractmethod
+    def reset(self):
+        """Forget every task and lock, so the next run starts from scratch."""
+
+    def finished(self, kind):
+        """True if there are tasks of ``kind`` and all of them are done or failed (an earlier run's)."""
+        counts = self.counts(kind)
+        return bool(counts) and not (counts.get(TASK_PENDING) or counts.get(TASK_LEASED))
+
+    def close(self):
+        pass
+
+
+class SQLiteWorkQueue(WorkQueue):
+    """WorkQueue in a SQLite file, for any number of worker processes on one machine.
+
+    Claims run in an IMMEDIATE transaction, so two processes never lease
+    the same task. Safe to share between threads.
+    """
+
+    def __init__(self, path=WORK_QUEUE_FILE, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                payload TEXT,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                updated_at REAL NOT NULL,
+                UNIQUE (kind, key)
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS tasks_by_state ON tasks (kind, state, id)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS locks (name TEXT PRIMARY KEY, task_id INTEGER NOT NULL)")
+
+    def enqueue(self, kind, key, payload=None):
+        with self._lock:
+            return self._db.execute(
+                "INSERT OR IGNORE INTO tasks (kind, key, payload, state, updated_at) VALUES (?, ?, ?, ?, ?)",
+                (kind, key, json.dumps(payload) if payload is not None else None, TASK_PENDING, time.time())
+            ).rowcount == 1
+
+    def claim(self, kind, worker_id, limit=1, lease=LEASE_SECONDS):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Tasks that keep outliving their lease probably crash their workers
+                self._db.execute(
+                    "UPDATE tasks SET state = ?, owner = NULL, error = 'lease expired', updated_at = ? "
+                    "WHERE kind = ? AND state = ? AND lease_until < ? AND attempts >= ?",
+                    (TASK_FAILED, now, kind, TASK_LEASED, now, self.max_attempts)
+                )
+                rows = self._db.execute(
+                    "SELECT id, key, payload, attempts FROM tasks "
+                    "WHERE kind = ? AND (state = ? OR (state = ? AND lease_until < ?)) ORDER BY id LIMIT ?",
+                    (kind, TASK_PENDING, TASK_LEASED, now, limit)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE tasks SET state = ?, owner = ?, lease_until = ?, attempts = attempts + 1, "
+                    "updated_at = ? WHERE id = ?",
+                    [(TASK_LEASED, worker_id, now + lease, now, row[0]) for row in rows]
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return [Task(task_id, kind, key, json.loads(payload) if payload else {}, attempts + 1)
+                for task_id, key, payload, attempts in rows]
+
+    def heartbeat(self, task_ids, worker_id, lease=LEASE_SECONDS):
+        task_ids = list(task_ids)
+        if not task_ids:
+            return 0
+        now = time.time()
+        with self._lock:
+            return self._db.execute(
+                f"UPDATE tasks SET lease_until = ?, updated_at = ? "
+                f"WHERE owner = ? AND state = ? AND id IN ({','.join('?' * len(task_ids))})",
+                (now + lease, now, worker_id, TASK_LEASED, *task_ids)
+            ).rowcount
+
+    def complete(self, task_id, worker_id, result=None):
+        with self._lock:
+            return self._db.execute(
+                "UPDATE tasks SET state = ?, owner = ?, result = ?, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND state != ?",
+                (TASK_DONE, worker_id, result, time.time(), task_id, TASK_DONE)
+            ).rowcount == 1
+
+    def fail(self, task_id, worker_id, error=None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE tasks SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, owner = NULL, "
+                "lease_until = NULL, error = ?, updated_at = ? WHERE id = ? AND owner = ? AND state = ?",
+                (self.max_attempts, TASK_FAILED, TASK_PENDING, error, time.time(), task_id, worker_id,
+                 TASK_LEASED)
+            )
+
+    def lock(self, name, task_id):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                holder = self._db.execute(
+                    "SELECT locks.task_id FROM locks JOIN tasks ON tasks.id = locks.task_id "
+                    "WHERE locks.name = ? AND tasks.state = ? AND tasks.lease_until >= ?",
+                    (name, TASK_LEASED, time.time())
+                ).fetchone()
+                if holder is not None and holder[0] != task_id:
+                    self._db.execute("ROLLBACK")
+                    return False
+                self._db.execute("INSERT OR REPLACE INTO locks (name, task_id) VALUES (?, ?)", (name, task_id))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return True
+
+    def unlock(self, name, task_id):
+        with self._lock:
+            self._db.execute("DELETE FROM locks WHERE name = ? AND task_id = ?", (name, task_id))
+
+    def active(self, kind):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM tasks WHERE kind = ? AND state IN (?, ?)", (kind, TASK_PENDING, TASK_LEASED)
+            ).fetchone()[0]
+
+    def counts(self, kind):
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE kind = ? GROUP BY state", (kind,)
+            ).fetchall())
+
+    def results(self, kind):
+        with self._lock:
+            return dict(self._db.execute(
+                "SELECT result, COUNT(*) FROM tasks WHERE kind = ? AND state = ? GROUP BY result",
+                (kind, TASK_DONE)
+            ).fetchall())
+
+    def keys(self, kind):
+        last = ""
+        while True:
+            with self._lock:
+                page = [key for (key,) in self._db.execute(
+                    "SELECT key FROM tasks WHERE kind = ? AND key > ? ORDER BY key LIMIT 1000", (kind, last))]
+            yield from page
+            if len(page) < 1000:
+                return
+            last = page[-1]
+
+    def reset(self):
+        with self._lock:
+            self._db.execute("DELETE FROM tasks")
+            self._db.execute("DELETE FROM locks")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class Heartbeat:
+    """Background thread renewing the leases a worker holds until they are released."""
+
+    def __init__(self, work_queue, worker_id, lease=LEASE_SECONDS):
+        self.work_queue = work_queue
+        self.worker_id = worker_id
+        self.lease = lease
+        self.held = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+
+    def hold(self, task_ids):
+        with self._lock:
+            self.held.update(task_ids)
+
+    def release(self, task_ids):
+        with self._lock:
+            self.held.difference_update(task_ids)
+
+    def _run(self):
+        while not self._stop.wait(self.lease / 3):
+            with self._lock:
+                held = list(self.held)
+            if held:
+                self.work_queue.heartbeat(held, self.worker_id, self.lease)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+# Backends by URL scheme; other stores register here (e.g. BACKENDS["redis"] = RedisWorkQueue)
+BACKENDS = {"sqlite": SQLiteWorkQueue}
+
+
+def open_work_queue(location):
+    """Open a work queue from a path (SQLite) or a ``scheme://...`` location of a registered backend."""
+    scheme, sep, rest = location.partition("://")
+    if not sep:
+        return SQLiteWorkQueue(location)
+    if scheme not in BACKENDS:
+        raise ValueError(f"no work-queue backend for {scheme}:// (known: {', '.join(sorted(BACKENDS))})")
+    if scheme == "sqlite":
+        return SQLiteWorkQueue(rest[1:] if rest.startswith("/") else rest)  # sqlite:///relative.db
+    return BACKENDS[scheme](location)
+
+
+def join_work_queue(args, kind):
+    """Open the work queue named by --work-queue, resetting it first with --reset-queue.
+
+    A queue whose ``kind`` tasks were all finished by an earlier run hands
+    out nothing and only reports the old results, so joining one without
+    --reset-queue warns.
+    """
+    shared_queue = open_work_queue(args.work_queue)
+    if args.reset_queue:
+        shared_queue.reset()
+        print(f"🧹 Work queue {args.work_queue} reset")
+    elif shared_queue.finished(kind):
+        print(f"⚠ Work queue {args.work_queue} holds a finished run: no {kind} task is left to claim "
+              f"and the old results are reported. Pass --reset-queue to start over.")
+    return shared_queue
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def add_arguments(parser):
+    """Add the shared work-queue options to a script's parser."""
+    parser.add_argument('--work-queue', nargs='?', const=WORK_QUEUE_FILE, metavar='LOCATION',
+                        help=f"join a shared work queue: any number of workers claim tasks from it and "
+                             f"the results are merged (default LOCATION: {WORK_QUEUE_FILE})")
+    parser.add_argument('--reset-queue', action='store_true',
+                        help="empty the work queue before joining it, to start a new run (give it to "
+                             "the first worker only)")
+    parser.add_argument('--worker-id', default=default_worker_id(),
+                        help="name this worker holds its leases under (default: host-pid)")
+    parser.add_argument('--lease', type=float, default=LEASE_SECONDS, metavar='SECONDS',
+                        help=f"seconds before a silent worker's tasks go to another worker "
+                             f"(default: {LEASE_SECONDS})")